@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import os
+import sys
+import shutil
+import pytest
+
+BASEDIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, BASEDIR)
+sys.path.insert(0, os.path.join(BASEDIR, "tools"))
+
+from tools.exputil.ana import Ana
+
+T0 = 1606818574.0
+NODES = ["nrf52dk-1", "nrf52dk-2", "nrf52dk-3"]
+
+
+def dumptext(lines, nodes=NODES, desc=None):
+    '''
+    Text of a dump holding the given (time, node, output) lines, with the
+    time given relative to T0
+    '''
+    head = [
+        "exp: name: test",
+        "exp: site: saclay",
+        "exp: used_nodes: [{}]".format(", ".join(f"'{n}'" for n in nodes)),
+    ]
+    head += [f'exp: {key}: {val}' for key, val in (desc or {}).items()]
+    body = ["{:.6f};{};{}".format(T0 + t, n, out) for t, n, out in lines]
+    return "\n".join(head + ["", "----", ""] + body) + "\n"
+
+
+@pytest.fixture
+def mkana(tmp_path):
+    '''
+    Create an Ana (or the given subclass) on a dump with the given lines, its
+    output goes to a plot directory that is removed afterwards
+    '''
+    anas = []
+
+    def mk(lines, nodes=NODES, desc=None, cls=Ana, **kwargs):
+        logfile = tmp_path / f'{tmp_path.name}.dump'
+        logfile.write_text(dumptext(lines, nodes, desc))
+        ana = cls(str(logfile), **kwargs)
+        anas.append(ana)
+        return ana
+
+    yield mk
+    for ana in anas:
+        ana.statfile.close()
+        shutil.rmtree(os.path.dirname(ana.plotbase), ignore_errors=True)
+
+
+def parse(ana, *analyzers):
+    '''
+    Feed the log of `ana` to the given analyzers
+    '''
+    for analyzer in analyzers:
+        ana.router.add(analyzer)
+    ana.parse_log_raw(ana.router.route_raw)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import gzip
+import pytest
+import tools.exputil.ana
+from tools.exputil.alive import Alive
+from tools.exputil.expstats import Expstats
+from tools.exputil.llstats import LLStats
+from tools.exputil.topo import Topo
+
+# two nodes with an address differing from nodes.yml, one per half of the log
+LINES = [(0.01, "nrf52dk-1", "Own Address: 11:22:33:44:55:66 -> [11:22]")]
+LINES += [(1 + i * 0.1, "nrf52dk-2", "buf30") for i in range(200)]
+LINES += [(30.0, "nrf52dk-3", "Own Address: 11:22:33:44:55:77 -> [11:23]")]
+LINES += [(31 + i * 0.1, "nrf52dk-2", "buf30") for i in range(200)]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_parallel_ownaddr(mkana, capsys, monkeypatch, compress):
+    monkeypatch.setattr(tools.exputil.ana, "PARALLEL_MIN_SIZE", 0)
+    monkeypatch.setattr(tools.exputil.ana, "PARALLEL_BLOCK", 2000)
+    out = []
+    for jobs in (1, 2):
+        ana = mkana(LINES)
+        if compress:
+            with open(ana.logfile, "rb") as f:
+                raw = f.read()
+            ana.logfile += ".gz"
+            with gzip.open(ana.logfile, "wb") as f:
+                f.write(raw)
+        capsys.readouterr()
+        ana.router.add(Alive(ana))
+        ana.parse_log_parallel(jobs)
+        out.append(capsys.readouterr().out)
+        assert ana.nodecfg["nrf52dk-3"]["addr_mac"] == "11:22:33:44:55:77"
+
+    # each warning shows up once, the same as when parsing serially
+    assert out[0].count("addr conf for nrf52dk-1 broken") == 1
+    assert out[0].count("addr conf for nrf52dk-3 broken") == 1
+    assert out[1] == out[0]
+
+
+# flows of two producers to the sink nrf52dk-2, each acked 0.35s after it was
+# sent and thus interleaved with the next ones, so that flows cross the chunk
+# boundaries. nrf52dk-3 moves from the sink to nrf52dk-1 halfway.
+MAC = {"nrf52dk-1": "c1:d4:80:83:11:cd", "nrf52dk-3": "f2:94:bf:4d:67:06"}
+FLOWS = [(0.2, "nrf52dk-2", f'ble: conn_s (0|{MAC["nrf52dk-1"]})'),
+         (0.3, "nrf52dk-2", f'ble: conn_s (1|{MAC["nrf52dk-3"]})')]
+for i in range(150):
+    for prod, node in ((1, "nrf52dk-1"), (3, "nrf52dk-3")):
+        t = 1 + i * 0.2 + prod * 0.01
+        FLOWS += [(t, node, f'~A_TX:{prod}>{i}'),
+                  (t + 0.1, "nrf52dk-2", f'~A_RX:{prod}>{i}'),
+                  (t + 0.15, "nrf52dk-2", "ll0," + "21" * 40),
+                  (t + 0.15, node, "ll,1000000,10,10000,20,20000,30"),
+                  (t + 0.15, node, "buf30")]
+        # every 7th flow is not acked
+        if i % 7 != 0:
+            FLOWS += [(t + 0.35, node, f'~A_ACK:{prod}<{i}')]
+FLOWS += [(15.0, "nrf52dk-2", f'ble: close_s (1|{MAC["nrf52dk-3"]})'),
+          (15.5, "nrf52dk-1", f'ble: conn_s (0|{MAC["nrf52dk-3"]})')]
+FLOWS.sort(key=lambda l: l[0])
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_parallel_merge(mkana, capsys, monkeypatch, compress):
+    monkeypatch.setattr(tools.exputil.ana, "PARALLEL_MIN_SIZE", 0)
+    monkeypatch.setattr(tools.exputil.ana, "PARALLEL_BLOCK", 2000)
+    res = []
+    for jobs in (1, 2):
+        ana = mkana(FLOWS)
+        if compress:
+            with open(ana.logfile, "rb") as f:
+                raw = f.read()
+            ana.logfile += ".gz"
+            with gzip.open(ana.logfile, "wb") as f:
+                f.write(raw)
+        analyzers = [Expstats(ana), LLStats(ana), Topo(ana)]
+        for analyzer in analyzers:
+            ana.router.add(analyzer)
+        ana.parse_log_parallel(jobs)
+        capsys.readouterr()
+        for analyzer in analyzers:
+            analyzer.finish()
+        for analyzer in analyzers:
+            analyzer.summary()
+        expstats, llstats, topo = analyzers
+        res.append({
+            "t": ana.t,
+            "flows_cnt": expstats.flows_cnt,
+            "stats": expstats.stats(),
+            "sums": llstats.sums,
+            "topo": topo.topo,
+            "summary": capsys.readouterr().out,
+        })
+
+    assert res[0]["flows_cnt"]["sum"]["ack"] > 0
+    assert res[0]["topo"]["nrf52dk-3"]["hops"] == 2
+    assert res[1] == res[0]
+
+
+def test_reset(mkana):
+    ana = mkana(LINES)
+    ana.alive = Alive(ana)
+    ana.router.add(ana.alive)
+    ana.parse_log_raw(ana.router.route_raw)
+    old = ana.alive
+
+    ana.reset()
+    assert ana.alive is not old
+    assert ana.router.analyzers == [ana.alive]
+    assert ana.ownaddr == []
+    assert ana.alive.cnt.sum() == 0
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import numpy as np
+import pytest
+from conftest import parse
+from tools.exputil.llstats import LLStats
+from tools.exputil.anchors import Anchors, TICKS, GAP_MAX
+
+WRAP = 2**32
+START = WRAP - 5000         # the anchors wrap around shortly after the start
+
+
+def anchorlines(node, conns, num):
+    '''
+    Anchor lines of the given connections as {conn: (offset, itvl)} in ticks,
+    the anchors are logged at their time
+    '''
+    lines = []
+    for conn, (offset, itvl) in conns.items():
+        for k in range(num):
+            tick = START + offset + k * itvl
+            lines.append((tick / TICKS - START / TICKS + 1.0, node,
+                          f'll{conn},{tick % WRAP}(0)'))
+    return sorted(lines)
+
+
+def anchors(mkana, lines):
+    ana = mkana(lines)
+    ana.llstats = LLStats(ana)
+    parse(ana, ana.llstats)
+    return Anchors(ana)
+
+
+def test_unwrap(mkana):
+    anch = anchors(mkana, anchorlines("nrf52dk-1", {0: (0, 2458), 1: (100, 2458)}, 10))
+    conns = anch.conns()
+    assert set(conns) == {("nrf52dk-1", 0), ("nrf52dk-1", 1)}
+    time, ticks, itvl = conns[("nrf52dk-1", 0)]
+    assert ticks.tolist() == [START + k * 2458 for k in range(10)]
+    assert itvl == 2458
+
+
+@pytest.mark.parametrize("offset, overlaps", [(40, True), (200, False)])
+def test_fixed_offset(mkana, offset, overlaps):
+    # same interval: 40 ticks (1.2ms) apart always overlap, 200 (6.1ms) never
+    anch = anchors(mkana, anchorlines("nrf52dk-1", {0: (0, 2458), 1: (offset, 2458)}, 50))
+    stats = anch.stats()["nrf52dk-1"]["0-1"]
+    assert stats["itvl"] == pytest.approx([2458 * 1000 / TICKS] * 2)
+    # the first event of 0 comes before any event of 1
+    assert stats["events"] == 99
+    assert stats["p_obs"] == (1.0 if overlaps else 0.0)
+    assert len(stats["periods"]) == (1 if overlaps else 0)
+    assert stats["p_exp"] == pytest.approx(2 * 2.5 * TICKS / 1000 / 2458)
+
+
+def test_drifting(mkana):
+    # 75ms and 76.25ms connection intervals: the events drift past each other
+    i0, i1 = 2458, 2499
+    anch = anchors(mkana, anchorlines("nrf52dk-1", {0: (0, i0), 1: (300, i1)}, 400))
+    stats = anch.stats()["nrf52dk-1"]["0-1"]
+
+    # brute force: distance of each event to the closest event of the other
+    # connection, both directions, while the other one is alive
+    t0 = np.arange(400) * i0
+    t1 = 300 + np.arange(400) * i1
+    evt = 2.5 * TICKS / 1000
+    ov = []
+    valid = []
+    for a, b in ((t0, t1), (t1, t0)):
+        itvl = b[1] - b[0]
+        ov.append(0)
+        valid.append(0)
+        for t in a:
+            prev = b[b <= t]
+            if len(prev) > 0 and t - prev[-1] < GAP_MAX * itvl:
+                since = t - prev[-1]
+                valid[-1] += 1
+                ov[-1] += min(since % itvl, itvl - since % itvl) < evt
+    assert stats["overlaps"] == sum(ov)
+    assert stats["events"] == sum(valid)
+    assert stats["p_obs"] == pytest.approx(sum(ov) / sum(valid))
+    # the phase moves by 41 ticks per event, so the 164 ticks (2 * 2.5ms)
+    # around each event of 1 hold 4 events of 0, once every 2499 / 41 = 61
+    assert [n for _, _, n in stats["periods"]] == [4] * 6
+    assert sum(n for _, _, n in stats["periods"]) == ov[0]
+    p_exp = (valid[0] * 2 * evt / i1 + valid[1] * 2 * evt / i0) / sum(valid)
+    assert stats["p_exp"] == pytest.approx(p_exp)
+
+
+def test_single_connection(mkana):
+    lines = anchorlines("nrf52dk-1", {0: (0, 2458)}, 10)
+    lines += anchorlines("nrf52dk-2", {0: (0, 2458), 1: (10, 2458)}, 1)
+    anch = anchors(mkana, lines)
+    # nrf52dk-2 has a single anchor per connection
+    assert list(anch.conns()) == [("nrf52dk-1", 0)]
+    assert anch.pairs() == []
+    assert anch.stats() == {}
+
+
+def test_no_anchors(mkana, capsys):
+    anch = anchors(mkana, [(1.0, "nrf52dk-1", "buf30")])
+    assert anch.conns() == {}
+    assert anch.stats() == {}
+    anch.summary()
+    anch.plot_anchors()
+    anch.plot_conn_offset()
+    anch.plot_collision_prob()
+    out = capsys.readouterr().out
+    assert "Anchors: connection event overlaps" not in out
+    assert "skipping plot_conn_offset()" in out
+    assert "skipping plot_collision_prob()" in out
+
+
+def test_cache(mkana):
+    anch = anchors(mkana, anchorlines("nrf52dk-1", {0: (0, 2458), 1: (100, 2458)}, 10))
+    llstats = anch.ana.llstats
+    other = LLStats(anch.ana)
+    other.readcols(llstats.getcols())
+    assert other.anchor.array().tolist() == llstats.anchor.array().tolist()
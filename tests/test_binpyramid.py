@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import numpy as np
+import pytest
+from tools.exputil.binpyramid import Binpyramid, LEVELS
+
+SHAPE = (3, 2)
+ORIGIN = 100.0
+
+
+def records(num, span, seed=1):
+    rng = np.random.default_rng(seed)
+    time = ORIGIN - 5 + rng.random(num) * span
+    node = rng.integers(-1, SHAPE[0], num)
+    chan = rng.integers(0, SHAPE[1], num)
+    return time, node, chan, rng.random(num)
+
+
+def brute(time, node, chan, value, first, last, size):
+    # bins of the records counted one by one
+    num = int(np.floor((last - first) / size)) + 1
+    res = {"cnt": np.zeros(SHAPE + (num,), dtype=np.int64),
+           "sum": np.zeros(SHAPE + (num,)),
+           "min": np.full(SHAPE + (num,), np.inf),
+           "max": np.full(SHAPE + (num,), -np.inf)}
+    for t, n, c, v in zip(time, node, chan, value):
+        if n < 0 or t < ORIGIN or not first <= t <= last:
+            continue
+        i = min(int(np.floor((t - first) / size)), num - 1)
+        res["cnt"][n, c, i] += 1
+        res["sum"][n, c, i] += v
+        res["min"][n, c, i] = min(res["min"][n, c, i], v)
+        res["max"][n, c, i] = max(res["max"][n, c, i], v)
+    return res
+
+
+@pytest.mark.parametrize("first, last, size", [
+    (ORIGIN, ORIGIN + 1999, 1),         # base bins
+    (ORIGIN + 60, ORIGIN + 1260, 60),   # a coarse level
+    (ORIGIN + 20, ORIGIN + 1234.5, 30), # several bins of a level, cut end
+    (ORIGIN, ORIGIN + 5000, 600),       # beyond the last record
+    (ORIGIN + 3.5, ORIGIN + 700, 7),    # not on the base grid
+    (ORIGIN + 10, ORIGIN + 5, 10),      # empty span
+])
+def test_bins(first, last, size):
+    rec = records(5000, 2000)
+    pyramid = Binpyramid(ORIGIN, *rec[:3], SHAPE, rec[3])
+    res = pyramid.bins(first, last, size)
+    ref = brute(*rec, first, last, size)
+    assert res["cnt"].tolist() == ref["cnt"].tolist()
+    for key in ("sum", "min", "max"):
+        assert res[key] == pytest.approx(ref[key])
+
+
+def test_sparse():
+    # a few records spread over a day only occupy a few bins per level
+    time, node, chan, _ = records(100, 24 * 3600)
+    pyramid = Binpyramid(ORIGIN, time, node, chan, SHAPE)
+    for size in LEVELS[1:]:
+        assert len(pyramid.levels[size]["key"]) <= 100
+        assert pyramid.levels[size]["cnt"].sum() == ((node >= 0) & (time >= ORIGIN)).sum()
+    assert "sum" not in pyramid.bins(ORIGIN, ORIGIN + 3600, 60)
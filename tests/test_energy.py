@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import pytest
+from conftest import parse
+from tools.exputil.expstats import Expstats
+from tools.exputil.llstats import LLStats
+from tools.exputil.energy import Energy
+
+NODES = ["nrf52dk-1", "nrf52dk-2", "nrf52840dk-6"]
+
+# two acked flows of nrf52dk-1 span the experiment runtime (1s - 8.5s)
+FLOWS = [
+    (1.0, "nrf52dk-1", "~A_TX:1>1"),
+    (1.2, "nrf52dk-2", "~A_RX:1>1"),
+    (1.5, "nrf52dk-1", "~A_ACK:1<1"),
+    (8.0, "nrf52dk-1", "~A_TX:1>2"),
+    (8.2, "nrf52dk-2", "~A_RX:1>2"),
+    (8.5, "nrf52dk-1", "~A_ACK:1<2"),
+]
+# ll,<dur>,<rx_cnt>,<rx_tim>,<tx_cnt>,<tx_tim>,<free> with times in us
+PHY = [
+    (2.0, "nrf52dk-1", "ll,1000000,10,10000,20,20000,30"),
+    (7.0, "nrf52dk-1", "ll,1000000,10,10000,20,20000,30"),
+    (5.0, "nrf52840dk-6", "ll,2000000,50,100000,0,0,30"),
+    # after the experiment runtime
+    (9.5, "nrf52dk-1", "ll,1000000,500,500000,0,0,30"),
+]
+
+# energy [mJ] of the samples: V * (rx + tx + idle current [mA] * time [us])
+E_DK = 3.0 * (5.4 * 10000 + 5.3 * 20000 + 0.0019 * 970000) / 1e6
+E_840 = 3.0 * (4.6 * 100000 + 0.0032 * 1900000) / 1e6
+
+
+def energy(mkana, lines, **kwargs):
+    ana = mkana(lines, nodes=NODES)
+    ana.expstats = Expstats(ana)
+    ana.llstats = LLStats(ana)
+    parse(ana, ana.expstats, ana.llstats)
+    ana.expstats.finish()
+    ana.llstats.finish()
+    return Energy(ana, **kwargs)
+
+
+def test_stats(mkana):
+    stats = energy(mkana, FLOWS + PHY).stats()
+    assert set(stats) == {"nrf52dk-1", "nrf52840dk-6", "sum"}
+
+    dk = stats["nrf52dk-1"]
+    assert dk["duration"] == pytest.approx(2.0)
+    assert dk["duty_rx"] == pytest.approx(1.0)
+    assert dk["duty_tx"] == pytest.approx(2.0)
+    assert dk["duty"] == pytest.approx(3.0)
+    assert dk["energy"] == pytest.approx(2 * E_DK)
+    assert dk["power"] == pytest.approx(E_DK)
+    assert dk["acked"] == 2
+    assert dk["energy_per_pkt"] == pytest.approx(E_DK)
+
+    other = stats["nrf52840dk-6"]
+    assert other["duty"] == pytest.approx(5.0)
+    assert other["energy"] == pytest.approx(E_840)
+    assert other["acked"] == 0
+    assert other["energy_per_pkt"] is None
+
+    total = stats["sum"]
+    assert total["duty"] == pytest.approx(4.0)
+    assert total["power"] == pytest.approx((2 * E_DK + E_840) / 4)
+    assert total["energy_per_pkt"] == pytest.approx((2 * E_DK + E_840) / 2)
+
+
+def test_profiles(mkana, capsys):
+    ana_energy = energy(mkana, FLOWS + PHY, profiles={"nrf52dk": {"voltage": 1.8}})
+    assert ana_energy.stats()["nrf52dk-1"]["energy"] == pytest.approx(2 * E_DK * 0.6)
+    assert ana_energy.profile("foo-1") == ana_energy.profiles["nrf52dk"]
+    ana_energy.profile("foo-2")
+    assert capsys.readouterr().out.count("no current profile for foo") == 1
+
+
+def test_board(mkana):
+    ana_energy = energy(mkana, FLOWS + PHY)
+    # the board is taken from nodes.yml, not from the node name
+    ana_energy.ana.nodecfg["nrf52dk-1"]["board"] = "nrf52840dk"
+    assert ana_energy.profile("nrf52dk-1") == ana_energy.profiles["nrf52840dk"]
+
+
+def test_series(mkana):
+    series = energy(mkana, FLOWS + PHY).series(binsize=5.0)
+    assert series["x"] == [0.0, 5.0]
+    # bins start at 1s: the samples at 2s and 5s go into the first bin, the
+    # one at 7s into the second one
+    assert series["duty"] == pytest.approx([(3 * 1 + 5 * 2) / 3, 3.0])
+    assert series["power"] == pytest.approx([(E_DK + E_840) / 3, E_DK])
+
+
+def test_no_phy_stats(mkana, capsys):
+    ana_energy = energy(mkana, FLOWS)
+    assert ana_energy.stats() == {}
+    assert "duty" not in ana_energy.overview()
+    ana_energy.summary()
+    ana_energy.plot_duty_cycle_pn()
+    assert "skipping plot_duty_cycle_pn()" in capsys.readouterr().out
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import os
+import shutil
+from tools.exputil.evtcache import Evtcache
+
+LINES = [(1.0 + i, "nrf52dk-2", "buf30") for i in range(10)]
+
+
+def cache(ana, logfile, tmp_path):
+    '''
+    Event cache of the given dump, kept in tmp_path
+    '''
+    ana.logfile = logfile
+    cache = Evtcache(ana)
+    cache.dir = str(tmp_path / "evtcache")
+    cache.index = os.path.join(cache.dir, "index.json")
+    return cache
+
+
+def test_appended(mkana, tmp_path):
+    ana = mkana(LINES)
+    logfile = ana.logfile
+    copy = str(tmp_path / "copy.dump")
+    shutil.copy(logfile, copy)
+
+    first = cache(ana, logfile, tmp_path)
+    old = os.path.dirname(first.file("meta"))
+    os.makedirs(old)
+    assert cache(ana, copy, tmp_path).key() == first.key()
+
+    # the copy still has the old content, so its entry stays
+    with open(logfile, "a") as f:
+        f.write("1606818600.000000;nrf52dk-2;buf30\n")
+    second = cache(ana, logfile, tmp_path)
+    assert second.key() != first.key()
+    assert os.path.isdir(old)
+
+    # once no dump has that content anymore, the entry is removed
+    with open(copy, "a") as f:
+        f.write("1606818600.000000;nrf52dk-2;buf30\n")
+    assert cache(ana, copy, tmp_path).key() == second.key()
+    assert not os.path.exists(old)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import pytest
+from conftest import parse
+from tools.exputil import evttypes
+from tools.exputil.expstats import Expstats
+
+
+def test_in_line_with_firmware():
+    # fails if expstats.c/.h changed, run python -m tools.exputil.evttypes
+    assert evttypes.parse() == evttypes.TYPES
+
+
+def test_lookup():
+    code, name = evttypes.lookup("A_ACK")
+    assert evttypes.NAMES[code] == name == "A_ACK"
+    assert evttypes.category("A_ACK") == "app"
+    assert evttypes.category("N_TX_NC") == "drop"
+
+
+def test_unknown_type(mkana, capsys):
+    # types of newer firmware are categorized by their prefix
+    assert evttypes.category("A_NEW") == "app"
+    assert evttypes.category("XYZ") == "unknown"
+
+    ana = mkana([(0.1, "nrf52dk-1", "~R_TX"),
+                 (0.5, "nrf52dk-1", "~A_NEW"),
+                 (1.0, "nrf52dk-1", "~A_TX:1>1"),
+                 (2.0, "nrf52dk-1", "~R_TX")])
+    ana.expstats = Expstats(ana)
+    parse(ana, ana.expstats)
+    ana.expstats.finish()
+    assert "unknown event type ~A_NEW" in capsys.readouterr().out
+    # unknown app events still count toward the experiment runtime
+    assert ana.t["start"] - ana.t["prep"] == pytest.approx(0.4)
+    assert ana.t["end"] - ana.t["prep"] == pytest.approx(0.9)
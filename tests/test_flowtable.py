@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import types
+from conftest import parse
+from tools.exputil.expstats import Expstats
+from tools.exputil.flowtable import Flowtable, parseseq
+
+
+def evt(node, time, etype, seq):
+    return {"node": node, "time": time, "type": etype, "seq": seq}
+
+
+def table(events):
+    flows = Flowtable(types.SimpleNamespace(evt=events), ["nrf52dk-1", "nrf52dk-2"])
+    for e in events:
+        prod, seqno, _ = parseseq(e["seq"])
+        flows.row(int(prod), int(seqno), e["time"], (len(prod), len(seqno)))
+    return flows
+
+
+def test_seq_keeps_leading_zeros():
+    flows = table([evt("nrf52dk-1", 1.0, "A_TX", "01>007"),
+                   evt("nrf52dk-1", 2.0, "A_TX", "1>12")])
+    assert flows.seq(0) == "01-007"
+    assert flows.seq(1) == "1-12"
+    assert flows[0]["seq"] == "01-007"
+
+    other = Flowtable(types.SimpleNamespace(evt=[]))
+    other.fromdict(flows.todict(0))
+    assert other.seq(0) == "01-007"
+
+
+def test_events_grouped_once():
+    events = [evt("nrf52dk-1", 1.0, "A_TX", "1>1"),
+              evt("nrf52dk-1", 1.1, "A_TX", "1>2"),
+              evt("nrf52dk-2", 1.2, "A_RX", "1>1"),
+              evt("nrf52dk-2", 1.3, "N_TX", "1<2")]
+    flows = table(events)
+    assert flows.events(0) == [events[0], events[2]]
+    groups = flows.groups()
+    assert flows.events(1) == [events[1], events[3]]
+    assert flows[1]["path"] == ["nrf52dk-1", "nrf52dk-2"]
+    assert flows.groups() is groups
+
+    # new events are picked up
+    events.append(evt("nrf52dk-1", 1.4, "A_ACK", "1<2"))
+    assert flows.groups() is not groups
+    assert flows.events(1)[-1] is events[-1]
+    assert [len(f["events"]) for f in flows.todicts()] == [2, 3]
+
+
+def test_malformed_seq(mkana, capsys):
+    ana = mkana([(1.0, "nrf52dk-1", "~A_TX:1>12x"),
+                 (1.1, "nrf52dk-1", "~A_TX:1-2<"),
+                 (1.2, "nrf52dk-1", "~A_TX:1>>3"),
+                 (1.3, "nrf52dk-1", "~A_TX:1>3"),
+                 (1.4, "nrf52dk-2", "~A_RX:1>3")])
+    ana.expstats = Expstats(ana)
+    parse(ana, ana.expstats)
+    ana.expstats.finish()
+
+    # the malformed events are skipped for the flows, but still counted
+    out = capsys.readouterr().out
+    assert out.count("Warning: skipping flow event with malformed seq") == 3
+    assert "nrf52dk-1 ~A_TX:1>12x" in out
+    flows = ana.expstats.flows
+    assert len(flows) == 1
+    assert flows[0]["seq"] == "1-3"
+    assert [e["type"] for e in flows.events(0)] == ["A_TX", "A_RX"]
+    assert ana.expstats.flows_cnt["sum"]["rx"] == 1
+    assert len(ana.expstats.evt) == 5
+
+    other = Flowtable(types.SimpleNamespace(evt=[]))
+    other.fromdict(dict(flows.todict(0), seq="1-3x"))
+    assert len(other) == 0
+    assert "Warning: skipping flow with malformed seq: 1-3x" in capsys.readouterr().out
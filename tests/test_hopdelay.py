@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import pytest
+from conftest import parse
+from tools.exputil.expstats import Expstats
+from tools.exputil.hopdelay import Hopdelay
+
+# request nrf52dk-1 -> 2 -> 3 and its response back, plus a request whose
+# N_RX is missing from the log
+LINES = [
+    (1.000, "nrf52dk-1", "~A_TX:1>1"),
+    (1.010, "nrf52dk-1", "~N_TX:1>1"),
+    (1.030, "nrf52dk-2", "~N_RX:1>1"),
+    (1.035, "nrf52dk-2", "~N_TX:1>1"),
+    (1.060, "nrf52dk-3", "~N_RX:1>1"),
+    (1.062, "nrf52dk-3", "~A_RX:1>1"),
+    (1.070, "nrf52dk-3", "~N_TX:1<1"),
+    (1.100, "nrf52dk-2", "~N_RX:1<1"),
+    (1.104, "nrf52dk-2", "~N_TX:1<1"),
+    (1.120, "nrf52dk-1", "~N_RX:1<1"),
+    (1.121, "nrf52dk-1", "~A_ACK:1<1"),
+    (2.000, "nrf52dk-1", "~A_TX:1>2"),
+    (2.003, "nrf52dk-1", "~N_TX:1>2"),
+    (2.050, "nrf52dk-2", "~N_TX:1>2"),
+]
+
+
+def hopdelay(mkana, lines):
+    ana = mkana(lines)
+    ana.expstats = Expstats(ana)
+    parse(ana, ana.expstats)
+    return Hopdelay(ana)
+
+
+def test_delays(mkana):
+    stats = hopdelay(mkana, LINES).stats()
+    # log times have a resolution of 1us
+    ms = lambda by, key: [stats[by][key][k] for k in ("cnt", "mean", "max")]
+    # nrf52dk-1: 10ms request, 1ms response and 3ms for the second request
+    assert ms("node", "nrf52dk-1") == pytest.approx([3, 14 / 3, 10], abs=1e-3)
+    assert ms("node", "nrf52dk-2") == pytest.approx([2, 4.5, 5], abs=1e-3)
+    assert ms("node", "nrf52dk-3") == pytest.approx([1, 2, 2], abs=1e-3)
+    assert ms("link", "nrf52dk-1->nrf52dk-2") == pytest.approx([1, 20, 20], abs=1e-3)
+    assert ms("link", "nrf52dk-2->nrf52dk-3") == pytest.approx([1, 25, 25], abs=1e-3)
+    assert ms("link", "nrf52dk-3->nrf52dk-2") == pytest.approx([1, 30, 30], abs=1e-3)
+    assert ms("link", "nrf52dk-2->nrf52dk-1") == pytest.approx([1, 16, 16], abs=1e-3)
+    assert len(stats["link"]) == 4
+
+
+def test_no_events(mkana, capsys):
+    hop = hopdelay(mkana, [(1.0, "nrf52dk-1", "ALIVE-1")])
+    assert hop.stats() == {"node": {}, "link": {}}
+    hop.summary()
+    hop.plot_hop_box()
+    hop.plot_hop_delay_pn()
+    out = capsys.readouterr().out
+    assert "slowest" not in out
+    assert "skipping plot_hop_box(node)" in out
+    assert "skipping plot_hop_delay_pn()" in out
+
+
+def test_malformed_seq(mkana, capsys):
+    # events with a malformed sequence number are no part of any packet
+    lines = LINES + [(1.020, "nrf52dk-1", "~N_TX:1>1x"),
+                     (1.040, "nrf52dk-2", "~N_RX:1-1<"),
+                     (1.050, "nrf52dk-2", "~N_TX:>1")]
+    stats = hopdelay(mkana, sorted(lines)).stats()
+    assert stats == hopdelay(mkana, LINES).stats()
+    assert capsys.readouterr().out.count("malformed seq") == 3
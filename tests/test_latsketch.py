@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import math
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from tools.exputil.latsketch import Latsketch
+
+
+def test_empty_boxstats_plot():
+    sketch = Latsketch()
+    sketch.add([0.005, 0.008])
+    sketch.trim(0.01)
+    assert sketch.cnt == 0
+    stats = sketch.boxstats()
+    assert all(math.isnan(stats[k]) for k in ("whislo", "q1", "med", "q3", "whishi"))
+
+    full = Latsketch()
+    full.add([0.02, 0.03, 0.04])
+    fig, ax = plt.subplots()
+    ax.bxp([stats, full.boxstats()])
+    plt.close(fig)
+
+
+def test_trim_bound():
+    low = 0.01
+    vals = [0.005, 0.0099, 0.00995, 0.02, 0.05]
+    sketch = Latsketch()
+    sketch.add(vals)
+    sketch.trim(low)
+    # values >= low are kept, values more than a bucket (~2 alpha) below are
+    # dropped, the ones in between may be kept
+    assert sum(v >= low for v in vals) <= sketch.cnt <= sum(v > low / sketch.gamma for v in vals)
+    assert sketch.min == low
+    assert sketch.max == 0.05
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+
+import numpy as np
+from tools.exputil.noderegistry import NodeRegistry
+from tools.exputil.samples import Samples
+
+
+def test_order():
+    nodes = NodeRegistry(["nrf52dk-10", "nrf52dk-2", "nrf52840dk-6", "nrf52dk-2"])
+    assert list(nodes) == ["nrf52dk-2", "nrf52dk-10", "nrf52840dk-6"]
+    assert nodes.sort(["sum", "nrf52dk-10", "nrf52dk-2"]) == ["nrf52dk-2", "nrf52dk-10", "sum"]
+
+
+def test_bulk():
+    nodes = NodeRegistry(["nrf52dk-1", "nrf52dk-2"])
+    ids = nodes.idarray(["nrf52dk-2", "m3-1", None, "nrf52dk-1"])
+    assert ids.tolist() == [1, -1, -1, 0]
+    assert nodes.idarray([]).tolist() == []
+    assert nodes.namelist(np.array([1, 0]).tolist()) == ["nrf52dk-2", "nrf52dk-1"]
+
+
+def test_samples_select():
+    nodes = NodeRegistry(["nrf52dk-1", "nrf52dk-2"])
+    smp = Samples(nodes, [("val", np.int32)])
+    for t, n in [(1.0, "nrf52dk-2"), (2.0, "nrf52dk-1"), (3.0, "nrf52dk-2")]:
+        smp.add(t, n, int(t))
+    # unknown nodes select nothing
+    assert smp.select(["m3-1"])["val"].tolist() == []
+    assert smp.select(["nrf52dk-2", "m3-1"])["val"].tolist() == [1, 3]
+    assert smp.todict()["node"] == ["nrf52dk-2", "nrf52dk-1", "nrf52dk-2"]
+
+    other = Samples(nodes, [("val", np.int32)])
+    other.readcols(smp.getcols("x_"), "x_")
+    assert other.array().tolist() == smp.array().tolist()
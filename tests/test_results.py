@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import os
+import json
+import results
+import tools.exputil.ana
+
+
+class Once(results.Results):
+    '''
+    Results following its log for a single snapshot, the log is removed
+    afterwards as if the experiment finished
+    '''
+
+    def snapshot(self):
+        super().snapshot()
+        with open(f'{self.plotbase}_overview.json', encoding="utf-8") as f:
+            self.overview = json.load(f)
+        os.remove(self.logfile)
+
+
+def test_follow_response_only_flow(mkana, monkeypatch):
+    monkeypatch.setattr(tools.exputil.ana, "FOLLOW_POLL", 0)
+    lines = [
+        # the request of this flow was sent before the log was cut
+        (0.5, "nrf52dk-2", "~N_TX:1<3"),
+        (0.6, "nrf52dk-1", "~N_RX:1<3"),
+        (1.0, "nrf52dk-1", "~A_TX:1>4"),
+        (1.1, "nrf52dk-1", "~N_TX:1>4"),
+        (1.2, "nrf52dk-2", "~N_RX:1>4"),
+        (1.3, "nrf52dk-2", "~A_RX:1>4"),
+        (1.4, "nrf52dk-2", "~N_TX:1<4"),
+        (1.5, "nrf52dk-1", "~N_RX:1<4"),
+        (1.6, "nrf52dk-1", "~A_ACK:1<4"),
+    ]
+    res = mkana(lines, cls=Once, follow=0.001)
+    assert abs(res.overview["latency"]["latency_max"] - 0.6) < 1e-6
+    # same schema as the overview of the final run
+    assert "energy" in res.overview
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import numpy as np
+import pytest
+from tools.exputil.seqgaps import Seqgaps
+
+# producer 1 sends every second with +-50ms jitter: seq 5 is never sent, seq
+# 7 has a send error, seq 8 is not received and seq 9 is sent after a stall
+SEQ = [1, 2, 3, 4, 6, 7, 8, 9, 10]
+T_TX = [1.0, 2.05, 2.95, 4.0, 6.05, np.nan, 7.95, 12.0, 13.0]
+SENT = [True] * 5 + [False] + [True] * 3
+ERR = [False] * 5 + [True] + [False] * 3
+RCVD = [True] * 6 + [False] + [True] * 2
+
+
+def add(gaps, rows):
+    num = len(SEQ[rows])
+    gaps.add([1] * num, np.array(SEQ)[rows], ["nrf52dk-1"] * num,
+             np.array(T_TX)[rows], np.array(SENT)[rows], np.array(ERR)[rows],
+             np.array(RCVD)[rows])
+
+
+def test_report():
+    gaps = Seqgaps(1.0)
+    add(gaps, slice(None))
+    rep = gaps.report(t_ref=1.0)[1]
+    assert rep["node"] == "nrf52dk-1"
+    assert (rep["first"], rep["last"], rep["sent"]) == (1, 10, 8)
+    assert rep["missing"] == [[5, 5], [7, 7]]
+    assert rep["err"] == [[7, 7]]
+    assert rep["lost"] == [[8, 8]]
+    # intervals within runs: 1.05, 0.9, 1.05, 4.05, 1.0
+    dt = np.array([1.05, 0.9, 1.05, 4.05, 1.0])
+    assert rep["jitter"]["itvl"] == pytest.approx(1000)
+    assert rep["jitter"]["mean"] == pytest.approx((dt.mean() - 1) * 1000)
+    assert rep["jitter"]["std"] == pytest.approx(dt.std() * 1000)
+    assert rep["jitter"]["max"] == pytest.approx(3050)
+    assert rep["stalls"] == [pytest.approx([6.95, 11.0])]
+
+
+def test_merge():
+    whole = Seqgaps(1.0)
+    add(whole, slice(None))
+    parts = [Seqgaps(1.0), Seqgaps(1.0)]
+    add(parts[0], slice(0, 3))
+    add(parts[1], slice(3, None))
+    parts[0].merge(parts[1])
+    merged, rep = parts[0].report()[1], whole.report()[1]
+    assert merged["jitter"] == pytest.approx(rep["jitter"])
+    assert merged["stalls"] == [pytest.approx(s) for s in rep["stalls"]]
+    for key in ("first", "last", "sent", "missing", "err", "lost"):
+        assert merged[key] == rep[key]
+
+
+def test_unknown_itvl():
+    gaps = Seqgaps()
+    add(gaps, slice(0, 5))
+    jitter = gaps.report()[1]["jitter"]
+    # without a configured interval there is nothing to measure jitter against
+    assert jitter["itvl"] == pytest.approx(1000)
+    assert jitter["mean"] is None and jitter["max"] is None
+    assert jitter["std"] > 0
+
+
+def test_unknown_itvl_stalls():
+    # without folding, and folded in batches with a different median interval
+    whole = Seqgaps()
+    add(whole, slice(None))
+    parts = [Seqgaps(), Seqgaps(), Seqgaps()]
+    add(parts[0], slice(0, 4))
+    add(parts[1], slice(4, 8))
+    add(parts[2], slice(8, None))
+    parts[0].merge(parts[1])
+    parts[0].merge(parts[2])
+    # the mean interval is 1.61s, so only the 4.05s send gap is a stall
+    rep = whole.report(t_ref=1.0)[1]
+    assert rep["stalls"] == [pytest.approx([6.95, 11.0])]
+    assert parts[0].report(t_ref=1.0)[1]["stalls"] == rep["stalls"]
+
+
+def test_no_flows():
+    gaps = Seqgaps(1.0)
+    gaps.add([], [], [], np.array([]), np.array([], dtype=bool),
+             np.array([], dtype=bool), np.array([], dtype=bool))
+    assert gaps.report() == {}
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+'''
+Cost of the Linerouter compared to handing every line to every analyzer, as
+results.py did before:
+
+- dispatch: decoding and dispatching the lines to callbacks doing nothing
+- analyzers: parsing the lines with the analyzers behind the router, and the
+  regex searches the analyzers would have run on the lines not routed to them
+
+Usage:
+
+    python tools/bench_linerouter.py LOGFILE
+'''
+
+import os
+import sys
+from pathlib import Path
+sys.path.append(str(Path(os.path.abspath(__file__)).parent.parent))
+
+import io
+import time
+import contextlib
+from tools.exputil.ana import Ana
+from tools.exputil.alive import Alive
+from tools.exputil.connitvl import Connitvl
+from tools.exputil.expstats import Expstats
+from tools.exputil.topo import Topo
+from tools.exputil.llstats import LLStats
+from tools.exputil.ipaddr import Ipaddr
+from tools.exputil.linerouter import Linerouter
+from tools.exputil.dumpreader import Dumpreader
+
+TYPES = [Alive, Connitvl, Expstats, Topo, LLStats, Ipaddr]
+
+
+def run(lines, cb):
+    start = time.perf_counter()
+    for line in lines:
+        cb(*line)
+    return time.perf_counter() - start
+
+
+def main(logfile):
+    with contextlib.redirect_stdout(io.StringIO()):
+        ana = Ana(logfile)
+    reader = Dumpreader(ana.logfile, ana.nodes)
+    lines = [(t, reader.nodes[n], payload) for t, n, payload in reader.lines()]
+    print(f'{len(lines)} lines')
+
+    def noop(time, node, output):
+        pass
+
+    # dispatch alone, the callbacks do nothing
+    router = Linerouter()
+    for cls in TYPES:
+        router.register(cls.PREFIXES, noop)
+    t_all = run(lines, lambda t, n, p: [noop(t, n, p.decode("utf-8")) for _ in TYPES])
+    t_route = run(lines, router.route_raw)
+    print(f'dispatch:        all {t_all:.3f}s  routed {t_route:.3f}s  '
+          f'({t_all / t_route:.1f}x)')
+
+    # parsing with the analyzers behind the router
+    router = Linerouter()
+    for cls in TYPES:
+        router.add(cls(ana))
+    with contextlib.redirect_stdout(io.StringIO()):
+        t_parse = run(lines, router.route_raw)
+
+    # regex searches the router saves: those of each analyzer on the lines
+    # that are not routed to it
+    regexes = {a: [v for v in vars(a).values() if hasattr(v, "search")]
+               for a in router.analyzers}
+    work = []
+    for _, _, payload in lines:
+        line = payload.lstrip(b"> \t")
+        output = payload.decode("utf-8")
+        for a, res in regexes.items():
+            if not any(line.startswith(x.encode()) for x in a.PREFIXES):
+                work.extend((r, output) for r in res)
+    start = time.perf_counter()
+    for r, output in work:
+        r.search(output)
+    t_skip = time.perf_counter() - start
+    print(f'analyzers:       routed {t_parse:.3f}s  skipped regex searches {t_skip:.3f}s  '
+          f'({(t_parse + t_skip) / t_parse:.2f}x)')
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(f'usage: {sys.argv[0]} LOGFILE')
+    main(sys.argv[1])
@@ -21,21 +21,28 @@
 import os
 import re
 import sys
+import numpy as np
 
 
 class Alive:
 
+    PREFIXES = ["ALIVE-"]
+    VERSION = 2
+
     def __init__(self, ana):
         self.ana = ana
         self.used = False
-        self.data = {}
-        for n in self.ana.desc["used_nodes"]:
-            self.data[n] = {
-                "max": -1,      # maximum alive counter seen in log
-                "cnt": 0,       # number of alive message per node seen
-                "lost": [],     # lost sequence numbers
-                "dups": [],     # duplicate sequence numbers
-            }
+
+        # per node state, indexed by node id (see NodeRegistry)
+        self.nodes = ana.nodes
+        num = len(self.nodes)
+        self.seq_max = np.full(num, -1, dtype=np.int64)     # maximum alive counter seen in log
+        self.cnt = np.zeros(num, dtype=np.int64)            # number of alive message per node seen
+        self.lost = [[] for _ in range(num)]                # lost sequence numbers
+        self.dups = [[] for _ in range(num)]                # duplicate sequence numbers
+
+        # first sequence number seen per node, needed to merge partial states
+        self.first = np.full(num, -1, dtype=np.int64)
 
         self.re_alive = re.compile(r'ALIVE-(?P<seq>[0-9]+)')
 
@@ -46,14 +53,68 @@ class Alive:
             self.used = True
             seq = int(m.group('seq'))
             prior = seq - 1
-
-            if seq == self.data[node]["max"]:
-                self.data[node]["dups"].append(seq)
-            elif prior != self.data[node]["max"]:
-                self.data[node]["lost"].append(seq - 1)
-
-            self.data[node]["max"] = seq
-            self.data[node]["cnt"] += 1
+            i = self.nodes.id(node)
+            if self.first[i] < 0:
+                self.first[i] = seq
+
+            if seq == self.seq_max[i]:
+                self.dups[i].append(seq)
+            elif prior != self.seq_max[i]:
+                self.lost[i].append(seq - 1)
+
+            self.seq_max[i] = seq
+            self.cnt[i] += 1
+
+
+    def getpart(self):
+        return {"seq_max": self.seq_max, "cnt": self.cnt, "first": self.first,
+                "lost": self.lost, "dups": self.dups}
+
+
+    def merge(self, part):
+        for i in np.flatnonzero(part["first"] >= 0).tolist():
+            seq = int(part["first"][i])
+            lost = part["lost"][i]
+            # the chunk parser saw the first ALIVE without knowing the prior
+            # max, so redo its check with the real state
+            if seq != 0:
+                lost.pop(0)
+            if seq == self.seq_max[i]:
+                self.dups[i].append(seq)
+            elif seq - 1 != self.seq_max[i]:
+                self.lost[i].append(seq - 1)
+            self.lost[i] += lost
+            self.dups[i] += part["dups"][i]
+            self.seq_max[i] = part["seq_max"][i]
+            if self.first[i] < 0:
+                self.first[i] = seq
+            self.used = True
+        self.cnt += part["cnt"]
+
+
+    def getcols(self):
+        cols = {
+            "used": np.array(self.used),
+            "max": self.seq_max,
+            "cnt": self.cnt,
+            "first": self.first,
+        }
+        for key in ("lost", "dups"):
+            seqs = getattr(self, key)
+            cols[key] = np.array([s for i in range(len(seqs)) for s in seqs[i]], dtype=np.int64)
+            cols[f'{key}_node'] = np.repeat(np.arange(len(seqs)), [len(l) for l in seqs])
+        return cols
+
+
+    def readcols(self, cols):
+        self.used = bool(cols["used"])
+        self.seq_max = cols["max"]
+        self.cnt = cols["cnt"]
+        self.first = cols["first"]
+        for key in ("lost", "dups"):
+            seqs = getattr(self, key)
+            for i, seq in zip(cols[f'{key}_node'].tolist(), cols[key].tolist()):
+                seqs[i].append(seq)
 
 
     def summary(self):
@@ -63,24 +124,31 @@ class Alive:
 
         self.ana.statwrite("ALIVE signal summary:")
 
-        for n in self.ana.nsort(self.data):
-            a = self.data[n]
-
-            self.ana.statwrite("{:>15}: max:{:>5} cnt:{:>5} dups:{} lost:{}".format(n, a["max"], a["cnt"], a["dups"], a["lost"]))
-
-        broken = []
-
-        for n in self.data:
-            if self.data[n]["cnt"] < 10:
-                broken.append(n)
+        for i, n in enumerate(self.nodes):
+            self.ana.statwrite("{:>15}: max:{:>5} cnt:{:>5} dups:{} lost:{}".format(
+                               n, self.seq_max[i], self.cnt[i], self.dups[i], self.lost[i]))
 
+        broken = [self.nodes.name(i) for i in np.flatnonzero(self.cnt < 10)]
         if len(broken) > 0:
             self.ana.warn_blocking("ALIVE: nodes {} seems to be broken, bad ALIVE count!".format(broken))
 
 
     def getraw(self):
-        return {"data": self.data}
+        data = {}
+        for i, n in enumerate(self.nodes):
+            data[n] = {
+                "max": int(self.seq_max[i]),
+                "cnt": int(self.cnt[i]),
+                "lost": self.lost[i],
+                "dups": self.dups[i],
+            }
+        return {"data": data}
 
 
     def readraw(self, raw):
-        self.data = raw["data"]
+        for n, a in raw["data"].items():
+            i = self.nodes.id(n)
+            self.seq_max[i] = a["max"]
+            self.cnt[i] = a["cnt"]
+            self.lost[i] = a["lost"]
+            self.dups[i] = a["dups"]
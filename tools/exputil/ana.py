@@ -18,18 +18,77 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301 USA
 
+import io
 import os
 import re
 import sys
 import yaml
 import json
 import math
+import time
+import contextlib
+import collections
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from tools.exputil.plotter import Plotter
+from tools.exputil.linerouter import Linerouter
+from tools.exputil.dumpreader import Dumpreader, dumpopen
+from tools.exputil.evtcache import Evtcache
+from tools.exputil.dumpindex import Dumpindex
+from tools.exputil.noderegistry import NodeRegistry
+from tools.exputil.timeindex import Timeindex
 from tools.exputil.expbase import Expbase
 
 CFG_DFLT_SITE = "saclay"
 
+PARALLEL_MIN_SIZE = 32 * 1024 * 1024    # parse smaller logs serially
+PARALLEL_CHUNKS = 4                     # chunks per worker process
+PARALLEL_BLOCK = 16 * 1024 * 1024       # block size for compressed logs
+
+FOLLOW_POLL = 1                         # poll interval of a followed log [s]
+
+# Ana instance and router used by the chunk parsers, handed to the workers
+# through fork()
+_chunk_ana = None
+_chunk_router = None
+
+
+def _parse_chunk(chunk):
+    '''
+    Parse a (start, end) byte range of the log, or a given block of data
+    together with the node addresses fixed up so far. The address fixups are
+    checked (and warned about) by the parent only.
+    '''
+    start, end, data, addrs = chunk
+    ana = _chunk_ana
+    if addrs:
+        for node, cfg in addrs.items():
+            ana.nodedb.update(node, cfg)
+    router = Linerouter()
+    for analyzer in _chunk_router.analyzers:
+        router.add(ana.spawn(analyzer))
+
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        t = ana.parse_range(Dumpreader(ana.logfile, ana.nodes), router.route_raw,
+                            start, end, data, ownaddr=False)
+    return t, [a.getpart() for a in router.analyzers], out.getvalue()
+
+
+def _map_bounded(pool, fn, tasks, window):
+    '''
+    Same as pool.map(), but with at most `window` tasks in flight
+    '''
+    pending = collections.deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
 class Ana(Expbase):
 
     def __init__(self, logfile):
@@ -59,9 +118,24 @@ class Ana(Expbase):
         # setup the plotter
         self.plotter = Plotter(self.plotbase)
 
+        # dispatcher for log lines, analyzers register themselves with it
+        self.router = Linerouter()
+        self.evtcache = Evtcache(self)
+        self.ownaddr = []       # (node, output) of all 'Own Address' lines
+        self.indexes = {}       # (list id, node, time) -> (records, length, Timeindex)
+
+        # time window and corresponding byte range to parse, see set_window()
+        self.window = None
+        self.window_range = (None, None)
+
         # parse experiment description
         self.desc = {}
         self.parse_desc()
+        self.nodes = NodeRegistry(self.desc.get("used_nodes", []))
+
+
+    def nsort(self, obj):
+        return self.nodes.sort(obj)
 
 
     def reltime(self, timestamp):
@@ -76,19 +150,14 @@ class Ana(Expbase):
 
 
     def nodename_from_mac2(self, mac):
-        mac = mac.lower()
-        for n in sorted(self.nodecfg):
-            if 'addr_mac' in self.nodecfg[n] and self.nodecfg[n]['addr_mac'] == mac:
-                return n
-        return None
+        return self.nodedb.lookup('addr_mac', mac.lower())
 
 
     def nodename_from_l2addr(self, l2addr):
-        l2addr = l2addr.lower()
-        for node in sorted(self.nodecfg):
-            if 'addr_l2' in self.nodecfg[node] and self.nodecfg[node]['addr_l2'] == l2addr:
-                return node
-        sys.exit("error: unable to find node with addr {}".format(l2addr))
+        node = self.nodedb.lookup('addr_l2', l2addr.lower())
+        if node == None:
+            sys.exit("error: unable to find node with addr {}".format(l2addr))
+        return node
 
 
     def nodes_mac(self, node):
@@ -96,9 +165,9 @@ class Ana(Expbase):
 
 
     def parse_desc(self):
-        with open(self.logfile, "r", encoding="utf-8") as f:
+        with io.TextIOWrapper(dumpopen(self.logfile), encoding="utf-8") as f:
             for line in f:
-                if line == "----\n":
+                if line.startswith("----"):
                     return;
                 m = self.re_desc.match(line)
                 if m:
@@ -159,6 +228,46 @@ class Ana(Expbase):
         return time - self.t["start"]
 
 
+    def select(self, records, nodes=None, first=None, last=None, node="node", time="time"):
+        '''
+        Get the records of the given nodes (all if None) with
+        first <= time <= last, in their original order. `records` is a list
+        of dicts, its time index is built on first use and rebuilt once the
+        list changed its length.
+        '''
+        key = (id(records), node, time)
+        entry = self.indexes.get(key)
+        if entry is None or entry[0] is not records or entry[1] != len(records):
+            entry = (records, len(records), Timeindex.fromrecords(records, node, time))
+            self.indexes[key] = entry
+        return [records[i] for i in entry[2].positions(nodes, first, last)]
+
+
+    def spawn(self, analyzer):
+        '''
+        Create a new, empty analyzer of the same type, passing on the keyword
+        arguments it was configured with (its `config`, if any)
+        '''
+        return type(analyzer)(self, **getattr(analyzer, "config", {}))
+
+
+    def reset(self):
+        '''
+        Replace the analyzers registered with the router by new, empty ones
+        (see spawn()), attributes referring to the old analyzers are updated
+        '''
+        router = Linerouter()
+        for analyzer in self.router.analyzers:
+            new = self.spawn(analyzer)
+            for name, val in list(vars(self).items()):
+                if val is analyzer:
+                    setattr(self, name, new)
+            router.add(new)
+        self.router = router
+        self.ownaddr = []
+        self.indexes = {}
+
+
     def t_init(self, t_first, t_last):
         self.t["prep"] = t_first
         self.t["start"] = t_first
@@ -167,38 +276,245 @@ class Ana(Expbase):
         self.t["duration"] = t_last - t_first
 
 
+    def check_ownaddr(self, node, output):
+        self.ownaddr.append((node, output))
+        m = self.re_ownaddr.search(output)
+        if m:
+            mac = m.group('mac').lower()
+            l2addr = m.group('l2addr').lower()
+            if self.nodecfg[node]['addr_mac'] != mac:
+                print("Warning: addr conf for {} broken "
+                      "(cfg {} but is {})".format(node,
+                                          self.nodecfg[node]['addr_mac'],
+                                          mac))
+                self.nodedb.setval(node, 'addr_mac', mac)
+                self.nodedb.setval(node, 'addr_l2', l2addr)
+
+
     def parse_log(self, cb):
+        self.parse_log_raw(lambda t, node, payload:
+                           cb(t, node, payload.decode("utf-8")))
+
+
+    def set_window(self, first, last):
+        '''
+        Only parse log lines with a timestamp in [first, last], given in seconds
+        relative to the first log line and None for an open end. The sidecar
+        index of the dump is used to read only the part of the log covering
+        the window.
+        '''
+        reader = Dumpreader(self.logfile, self.nodes)
+        if reader.compressed:
+            lines = reader.lines()
+            t0 = next(lines, (0,))[0]
+            lines.close()
+        else:
+            index = Dumpindex(self.logfile)
+            t0 = index.load()["t_first"]
+            self.window_range = index.range(first, last)
+            # address fixups happen at boot, most likely outside the window
+            for node, output in index.load()["ownaddr"]:
+                self.check_ownaddr(node, output)
+
+        self.window = (t0 + first if first != None else -math.inf,
+                       t0 + last if last != None else math.inf)
+
+
+    def parse_log_raw(self, cb):
+        '''
+        Same as parse_log(), but the output is passed to `cb` as raw bytes
+        '''
+        self.t_init(*self.parse_range(Dumpreader(self.logfile, self.nodes), cb,
+                                      *self.window_range))
+
+
+    def parse_range(self, reader, cb, start=None, end=None, data=None, ownaddr=True):
         t_first = 0
         t_last = 0
 
-        with open(self.logfile, "r", encoding="utf-8") as f:
-            for line in f:
-                m = self.re_logline.match(line)
-                if m:
-                    time = float(m.group('time'))
-                    node = m.group("node")
-                    output = m.group("output")
+        nodes = reader.nodes
+        window = self.window
+        for t, node_id, payload in reader.lines(start, end, data):
+            node = nodes[node_id]
+            if ownaddr and b"Own Address: " in payload:
+                self.check_ownaddr(node, payload.decode("utf-8"))
+
+            if window and not window[0] <= t <= window[1]:
+                continue
+
+            if t_first == 0:
+                t_first = t
+            if t > t_last:
+                t_last = t
 
+            cb(t, node, payload)
+
+        return t_first, t_last
+
+
+    def parse_log_parallel(self, jobs=None, router=None):
+        '''
+        Feed the log to the analyzers registered with `router` (default: the
+        Ana's router), using a pool of `jobs` worker processes (default: one
+        per core).
+
+        The log body is split into newline aligned chunks, each chunk is parsed
+        by fresh instances of the analyzers and the resulting partial states
+        are merged in log order using the analyzers' merge(). Compressed logs
+        are decompressed here and handed to the workers block by block. Small
+        logs, a single job, or callbacks without merge support are parsed
+        serially.
+        '''
+        global _chunk_ana, _chunk_router
+
+        if router == None:
+            router = self.router
+        if jobs == None:
+            jobs = os.cpu_count() or 1
+        start, end = self.window_range
+        size = os.path.getsize(self.logfile) if end is None else end - start
+        if (jobs < 2 or size < PARALLEL_MIN_SIZE
+                or not router.supports("getpart", "merge")
+                or "fork" not in multiprocessing.get_all_start_methods()):
+            self.parse_log_raw(router.route_raw)
+            return
+
+        reader = Dumpreader(self.logfile, self.nodes)
+        if reader.compressed:
+            chunks = self.stream_chunks(reader)
+        else:
+            # chunks need the correct addresses right from their start, so
+            # apply the address fixups for the whole log before splitting it
+            # (set_window() already did so from the index)
+            if self.window == None:
+                for _, node_id, payload in reader.grep(b"Own Address: "):
+                    self.check_ownaddr(reader.nodes[node_id], payload.decode("utf-8"))
+            chunks = [(a, b, None, None) for a, b
+                      in reader.chunks(jobs * PARALLEL_CHUNKS, start, end)]
+
+        t_first = 0
+        t_last = 0
+
+        sys.stdout.flush()
+        _chunk_ana = self
+        _chunk_router = router
+        try:
+            ctx = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(jobs, mp_context=ctx) as pool:
+                for t, parts, out in _map_bounded(pool, _parse_chunk, chunks, jobs * 2):
+                    print(out, end="")
                     if t_first == 0:
-                        t_first = time
-                    if time > t_last:
-                        t_last = time
-
-                    m = self.re_ownaddr.search(output)
-                    if m:
-                        mac = m.group('mac').lower()
-                        l2addr = m.group('l2addr').lower()
-                        if self.nodecfg[node]['addr_mac'] != mac:
-                            print("Warning: addr conf for {} broken "
-                                  "(cfg {} but is {})".format(node,
-                                                      self.nodecfg[node]['addr_mac'],
-                                                      mac))
-                            self.nodecfg[node]['addr_mac'] = mac
-                            self.nodecfg[node]['addr_l2'] = l2addr
-
-                    cb(time, node, output)
+                        t_first = t[0]
+                    t_last = max(t_last, t[1])
+                    for analyzer, part in zip(router.analyzers, parts):
+                        analyzer.merge(part)
+        finally:
+            _chunk_ana = None
+            _chunk_router = None
+
+        self.t_init(t_first, t_last)
+
+
+    def stream_chunks(self, reader):
+        '''
+        Generator yielding the blocks of a compressed log as chunks, the
+        address fixups found in a block are applied before it is handed out
+        '''
+        for block in reader.blocks(PARALLEL_BLOCK):
+            for _, node_id, payload in reader.grep(b"Own Address: ", block):
+                self.check_ownaddr(reader.nodes[node_id], payload.decode("utf-8"))
+            addrs = {n: dict(self.nodecfg[n]) for n, _ in self.ownaddr}
+            yield None, None, block, addrs
+
+
+    def parse_log_cached(self, jobs=None):
+        '''
+        Rebuild the state of the analyzers registered with the router from the
+        event cache of the log. The log is only parsed for analyzers without a
+        valid cache entry, their cache entries are written afterwards. The
+        cache only covers complete logs, so it is not used if a window is set.
+        '''
+        if self.window or not self.router.supports("getcols", "readcols"):
+            self.parse_log_parallel(jobs)
+            return
+
+        stale = self.evtcache.load(self.router.analyzers)
+        if len(stale) == 0:
+            return
+
+        router = self.router
+        if len(stale) < len(self.router.analyzers):
+            router = Linerouter()
+            for analyzer in stale:
+                router.add(analyzer)
+        self.parse_log_parallel(jobs, router)
+        self.evtcache.save(stale)
+
+
+    def parse_log_follow(self, snapshot, interval):
+        '''
+        Parse the log while it is written, e.g. the tmp log of a running
+        experiment, feeding the analyzers registered with the router.
+
+        `snapshot` is called every `interval` seconds with the state parsed so
+        far. Following ends once the log was moved to its final location (see
+        Expbase.logfile_finalize()) and was read completely, or on Ctrl-C. If
+        the experiment is restarted (the log is truncated), all analyzers are
+        replaced by new ones (see reset()). When the final log exists, the
+        event cache is written for it, so that later runs do not need to parse
+        it again.
+        '''
+        final = os.path.join(self.logdir, self.expname, f'{self.outname}.dump')
+        reader = Dumpreader(self.logfile, self.nodes)
+        t_first = 0
+        t_last = 0
+        body = False
+        buf = b""
+        next_snapshot = time.monotonic() + interval
+
+        with open(self.logfile, "rb") as f:
+            try:
+                while True:
+                    moved = not os.path.exists(self.logfile)
+                    if os.fstat(f.fileno()).st_size < f.tell():
+                        # experiment was restarted, see exp.py:cleanlog()
+                        f.seek(0)
+                        self.reset()
+                        t_first = 0
+                        t_last = 0
+                        body = False
+                        buf = b""
+
+                    buf += f.read()
+                    if not body:
+                        m = re.search(rb'^----.*\n', buf, re.MULTILINE)
+                        if m:
+                            body = True
+                            buf = buf[m.end():]
+                    if body:
+                        cut = buf.rfind(b"\n") + 1
+                        if cut > 0:
+                            first, last = self.parse_range(reader, self.router.route_raw,
+                                                           data=buf[:cut])
+                            buf = buf[cut:]
+                            if t_first == 0:
+                                t_first = first
+                            t_last = max(t_last, last)
+
+                    if moved:
+                        break
+                    if time.monotonic() >= next_snapshot and t_first != 0:
+                        self.t_init(t_first, t_last)
+                        snapshot()
+                        next_snapshot += interval
+                    time.sleep(FOLLOW_POLL)
+            except KeyboardInterrupt:
+                print("Stopped following {}".format(self.logfile))
 
         self.t_init(t_first, t_last)
+        if os.path.isfile(final) and self.router.supports("getcols", "readcols"):
+            self.logfile = final
+            self.evtcache.save(self.router.analyzers)
 
 
     def parse_log_pyterm(self, cb):
@@ -208,7 +524,7 @@ class Ana(Expbase):
         if not self.node:
             self.node = "local-0"
 
-        with open(self.logfile, "r", encoding="utf-8") as f:
+        with io.TextIOWrapper(dumpopen(self.logfile), encoding="utf-8") as f:
             for line in f:
                 m = self.re_logline_pyterm.match(line)
                 if m:
@@ -240,7 +556,7 @@ class Ana(Expbase):
         sys.stdin.read(1)
 
 
-    def write_overview(self, llstats, expstats, topo):
+    def write_overview(self, llstats, expstats, topo, energy=None):
         outfile = f'{self.plotbase}_overview.json'
         stats = {
             "name": self.outname,
@@ -252,10 +568,16 @@ class Ana(Expbase):
             #   {"latency_avg": x,
             #    "latency_min": x,
             #    "latency_max": x,
-            #    "latency_all": []
+            #    "latency_sketch": {}, see Latsketch.todict()
             #   }
         }
-        with open(outfile, "w", encoding="utf-8") as f:
+        if energy != None:
+            # see Energy.overview()
+            stats["energy"] = energy.overview()
+        # replace the file at once, it is rewritten while following a log
+        tmp = f'{outfile}.{os.getpid()}'
+        with open(tmp, "w", encoding="utf-8") as f:
             json.dump(stats, f)
+        os.replace(tmp, outfile)
 
 
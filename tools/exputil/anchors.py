@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import numpy as np
+
+TICKS = 32768       # anchors are given in ticks of the 32768Hz cputime
+EVT_LEN = 2.5       # time taken by a connection event [ms], 4 BLE slots
+GAP_MAX = 4         # intervals without anchor after which a connection is gone
+
+
+class Anchors:
+    '''
+    Connection event collisions on nodes with multiple connections.
+
+    The anchors of all connections of a node are taken from the same clock,
+    so for each connection event of one connection the offset to the last
+    event of another connection of that node, modulo that connections
+    interval, tells how far apart their events are. Two events closer than
+    `evt_len` [ms] overlap. Consecutive overlapping events form a collision
+    period. The interval of each connection is the median spacing of its
+    anchors.
+
+    The expected collision probability assumes the offset between the two
+    connections to drift over time, which is what randomized connection
+    intervals are for. For equal intervals the offset stays put, and so
+    do collisions.
+
+    Works on the anchors parsed by LLStats (ana.llstats.anchor).
+    '''
+
+    def __init__(self, ana, evt_len=EVT_LEN):
+        self.ana = ana
+        self.evt_len = evt_len
+        self._conns = None
+
+
+    def conns(self):
+        '''
+        Get the anchors of each connection as dict (node, conn) -> (time,
+        ticks, itvl), with the log times and the unwrapped anchors [ticks] in
+        anchor order and the interval [ticks]. Connections with less than two
+        anchors are left out.
+        '''
+        anchor = self.ana.llstats.anchor
+        if self._conns != None and self._conns[0] == len(anchor):
+            return self._conns[1]
+
+        smp = anchor.array()
+        order = np.argsort(smp["node"], kind="stable")
+        node = smp["node"][order]
+        raw = smp["anchor"][order].astype(np.int64)
+
+        # unwrap the 32 bit anchors along the anchors of each node in log
+        # order, allowing for small steps back as an anchor may lie ahead
+        first = np.r_[True, node[1:] != node[:-1]] if len(node) > 0 else np.empty(0, dtype=bool)
+        step = (np.diff(raw, prepend=raw[:1]) + 2**31) % 2**32 - 2**31
+        step[first] = 0
+        total = np.cumsum(step)
+        start = np.flatnonzero(first)[np.cumsum(first) - 1]
+        ticks = raw[start] + total - total[start]
+
+        conn = smp["conn"][order]
+        time = smp["time"][order]
+        order = np.lexsort((ticks, conn, node))
+        key = node[order].astype(np.int64) << 16 | conn[order]
+        bounds = np.flatnonzero(np.r_[True, key[1:] != key[:-1], True]) if len(key) > 0 else []
+
+        res = {}
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            if b - a < 2:
+                continue
+            rows = order[a:b]
+            name = self.ana.nodes.name(int(node[rows[0]]))
+            res[(name, int(conn[rows[0]]))] = (time[rows], ticks[rows],
+                                               float(np.median(np.diff(ticks[rows]))))
+        self._conns = (len(anchor), res)
+        return res
+
+
+    def _offsets(self, this, other):
+        '''
+        Offset [ticks] of each anchor of connection `this` to the last anchor of
+        connection `other`, modulo the interval of `other`. Returns the offsets
+        and a mask of the anchors for which `other` was alive.
+        '''
+        _, ticks, _ = this
+        _, o_ticks, o_itvl = other
+        last = np.searchsorted(o_ticks, ticks, side="right") - 1
+        since = ticks - o_ticks[np.maximum(last, 0)]
+        valid = (last >= 0) & (since < GAP_MAX * o_itvl)
+        return np.mod(since, o_itvl), valid
+
+
+    def _overlaps(self, this, other):
+        offset, valid = self._offsets(this, other)
+        dist = np.minimum(offset, other[2] - offset)
+        return valid & (dist < self.evt_len * TICKS / 1000), valid
+
+
+    def pairs(self, nodes=None):
+        '''
+        Get the connection pairs of the given nodes (all if None) as list of
+        (node, conn, other conn)
+        '''
+        conns = self.conns()
+        res = []
+        for n in self.ana.nsort(nodes if nodes != None else self.ana.nodes):
+            handles = sorted(c for node, c in conns if node == n)
+            for i, a in enumerate(handles):
+                res.extend((n, a, b) for b in handles[i + 1:])
+        return res
+
+
+    def stats(self, nodes=None):
+        '''
+        Per node and connection pair ("a-b"): intervals [ms], events, overlapping
+        events, observed and expected collision probability and the collision
+        periods (start, end, events) in experiment time
+        '''
+        conns = self.conns()
+        res = {}
+        evt = self.evt_len * TICKS / 1000
+        for n, a, b in self.pairs(nodes):
+            ca, cb = conns[(n, a)], conns[(n, b)]
+            ov_a, valid_a = self._overlaps(ca, cb)
+            ov_b, valid_b = self._overlaps(cb, ca)
+            events = int(valid_a.sum() + valid_b.sum())
+            if events == 0:
+                continue
+
+            # collision periods as seen from the events of `a`
+            runs = np.diff(np.r_[0, ov_a.astype(np.int8), 0])
+            starts = np.flatnonzero(runs == 1)
+            ends = np.flatnonzero(runs == -1) - 1
+            time = ca[0] - self.ana.t["start"]
+            periods = list(zip(time[starts].tolist(), time[ends].tolist(),
+                               (ends - starts + 1).tolist()))
+
+            p_exp = (valid_a.sum() * min(1.0, 2 * evt / cb[2]) +
+                     valid_b.sum() * min(1.0, 2 * evt / ca[2])) / events
+            res.setdefault(n, {})[f'{a}-{b}'] = {
+                "itvl": [ca[2] * 1000 / TICKS, cb[2] * 1000 / TICKS],
+                "events": events,
+                "overlaps": int(ov_a.sum() + ov_b.sum()),
+                "p_obs": float((ov_a.sum() + ov_b.sum()) / events),
+                "p_exp": float(p_exp),
+                "periods": periods,
+                "overlap_time": float(sum(e - s for s, e, _ in periods)),
+            }
+        return res
+
+
+    def summary(self):
+        stats = self.stats()
+        if len(stats) == 0:
+            return
+        self.ana.statwrite(f'\nAnchors: connection event overlaps (event length {self.evt_len}ms)')
+        self.ana.statwrite(f'{"node":>15} {"pair":>5} {"itvl[ms]":>15} {"events":>8} '
+                           f'{"overlaps":>8} {"p_obs":>7} {"p_exp":>7} {"periods":>7} {"longest[s]":>10}')
+        for n in self.ana.nsort(stats):
+            for pair, s in stats[n].items():
+                itvl = "{:.2f}/{:.2f}".format(*s["itvl"])
+                longest = max([e - st for st, e, _ in s["periods"]], default=0.0)
+                self.ana.statwrite(f'{n:>15} {pair:>5} {itvl:>15} {s["events"]:>8} '
+                                   f'{s["overlaps"]:>8} {s["p_obs"]:>7.4f} {s["p_exp"]:>7.4f} '
+                                   f'{len(s["periods"]):>7} {longest:>10.1f}')
+
+
+    def plot_anchors(self, nodes=None, timespan=None):
+        '''
+        Spacing of consecutive anchors [ms] of each connection
+        '''
+        cfg = self.ana.plotsetup(nodes, None, timespan)
+        data = []
+        for (n, conn), (time, ticks, _) in sorted(self.conns().items()):
+            if n not in cfg["nodes"]:
+                continue
+            sel = (time[1:] >= cfg["first"]) & (time[1:] <= cfg["last"])
+            if not sel.any():
+                continue
+            data.append({
+                "x": (time[1:][sel] - self.ana.t["start"]).tolist(),
+                "y": (np.diff(ticks)[sel] * 1000 / TICKS).tolist(),
+                "label": "{}_conn-{}".format(n, conn),
+            })
+
+        if len(data) == 0:
+            print("Warning: not printing anchors: no exp output found")
+            return
+
+        ymax = max(max(l["y"]) for l in data)
+        info = {
+            "title": "RAW anchors for connection events",
+            "xlabel": "Experiment Runtime [s]",
+            "ylabel": "Time between anchors [ms]",
+            "suffix": "anchors_raw_mul",
+            "dim": [len(data), 1],
+            "xlim": [min(l["x"][0] for l in data), max(l["x"][-1] for l in data)],
+            "ylim": [0.0, ymax * 1.1],
+            "yticks": np.arange(0, ymax * 1.1, 50)
+        }
+        self.ana.plotter.step_multi(info, data)
+
+
+    def plot_conn_offset(self, nodes=None, fulltime=False, ylim=None):
+        '''
+        Offset [ms] of the events of each connection to the last event of the
+        other connections of the same node
+        '''
+        cfg = self.ana.plotsetup(nodes, None, [None, None] if fulltime else None)
+        conns = self.conns()
+        styles = ["-", ":", "--"]
+
+        data = []
+        style = None
+        for n, a, b in self.pairs(cfg["nodes"]):
+            if style == None or data[-1]["label"].split(":")[0] != n:
+                style = styles.pop(0)
+                styles.append(style)
+            offset, valid = self._offsets(conns[(n, b)], conns[(n, a)])
+            time = conns[(n, b)][0]
+            sel = valid & (time >= cfg["first"]) & (time <= cfg["last"])
+            data.append({
+                "x": (time[sel] - self.ana.t["start"]).tolist(),
+                "y": (offset[sel] * 1000 / TICKS).tolist(),
+                "style": style,
+                "label": "{}: h{} to h{}".format(n, b, a),
+            })
+
+        data = [l for l in data if len(l["x"]) > 0]
+        if len(data) == 0:
+            print("Anchors: skipping plot_conn_offset(), no nodes with multiple connections")
+            return
+
+        xt = self.ana.plotter.get_ticks([l["x"] for l in data], None)
+        info = {
+            "title": "Connection event anchor offset for {}".format(cfg["nodes"]),
+            "xlabel": "Experiment runtime [s]",
+            "ylabel": "Offset between anchors [in ms]",
+            "suffix": "connevt_offset_{}".format("".join([n[-1] for n in cfg["nodes"]])),
+            "xlim": xt["lim"],
+            "xticks": xt["ticks"],
+            "xtick_lbl": xt["ticks"],
+            "xtick_lbl_rot": {"rotation": 45, "ha": "right"},
+            "ylim": ylim,
+            "plotter": "line",
+        }
+        self.ana.plotter.linechart4(info, data)
+
+
+    def plot_collision_prob(self, nodes=None):
+        '''
+        Observed and expected collision probability per node and connection
+        pair
+        '''
+        stats = self.stats(nodes)
+        keys = [(n, pair) for n in self.ana.nsort(stats) for pair in stats[n]]
+        if len(keys) == 0:
+            print("Anchors: skipping plot_collision_prob(), no nodes with multiple connections")
+            return
+
+        data = {
+            "x": [f'{n} {pair}' for n, pair in keys],
+            "y": [[stats[n][pair]["p_obs"] for n, pair in keys],
+                  [stats[n][pair]["p_exp"] for n, pair in keys]],
+            "label": ["observed", "expected"],
+        }
+        info = {
+            "title": "Connection event collision probability (event length {}ms)".format(self.evt_len),
+            "xlabel": "Node and connection pair",
+            "ylabel": "Collision probability [0-1]",
+            "suffix": "connevt_collision",
+            "xtick_lbl": data["x"],
+            "xtick_lbl_rot": {"rotation": 45, "ha": "right"},
+            "plotter": "barchart",
+        }
+        self.ana.plotter.barchart2(info, data)
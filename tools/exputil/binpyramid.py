@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import math
+import numpy as np
+
+BASE = 1.0                  # size of the finest bins, in seconds
+LEVELS = [1, 10, 60, 600]   # bin sizes of the levels in multiples of BASE, each a
+                            # multiple of the one before
+
+
+class Binpyramid:
+    '''
+    Multi resolution histogram of timestamped records (events, flows).
+
+    Records are counted per node, channel (e.g. the event type) and bin of
+    BASE seconds, with bin 0 starting `origin`. Each further level holds the
+    same counts for bins of LEVELS[i] * BASE seconds. bins() aggregates these
+    to any multiple of BASE from the coarsest level that fits, so a time
+    series costs O(occupied bins) instead of a pass over all records. If
+    records carry a value (e.g. a latency), its sum, min and max are kept per
+    bin as well.
+
+    The records themselves are kept ordered by bin. They serve the base level,
+    cut the bin holding the end of a time span exactly, and bin spans not
+    aligned to BASE directly. The coarser levels are sparse: they only hold
+    the occupied bins, keyed by bin and node/channel, so their size is bound
+    by the number of records and not by the length of the run times the
+    nodes and channels. Only the bins of a query are dense.
+    '''
+
+    def __init__(self, origin, time, node, chan, shape, value=None):
+        '''
+        origin: start of bin 0, records before it are not counted
+        time, node, chan: time, node id and channel of each record
+        shape: (number of nodes, number of channels)
+        value: optional value of each record
+        '''
+        self.origin = origin
+        self.shape = tuple(shape)
+
+        sel = (time >= origin) & (node >= 0)
+        idx = np.floor((time[sel] - origin) / BASE).astype(np.int32)
+        order = np.argsort(idx, kind="stable")
+        self.idx = idx[order]
+        self.time = time[sel][order]
+        self.flat = (node[sel].astype(np.int32) * shape[1] + chan[sel].astype(np.int32))[order]
+        self.value = value[sel][order] if value is not None else None
+
+        # the sparse levels: key (bin * cells + node/channel) and aggregates
+        # of each occupied bin, ordered by key. Each level is built from the
+        # one below, the first from the records.
+        self.cells = self.shape[0] * self.shape[1]
+        parts = self._parts(slice(None))
+        self.aggs = list(parts)
+        self.levels = {}
+        idx, flat, below = self.idx, self.flat, LEVELS[0]
+        for size in LEVELS[1:]:
+            key = (idx // (size // below)).astype(np.int64) * self.cells + flat
+            key, pos = np.unique(key, return_inverse=True)
+            level = self._reduce(pos.reshape(-1), parts, len(key))
+            level["cnt"] = level["cnt"].astype(np.int32)
+            level["key"] = key
+            self.levels[size] = level
+            idx, flat = np.divmod(key, self.cells)
+            parts = {k: level[k] for k in self.aggs}
+            below = size
+
+
+    def _parts(self, sel):
+        # per record aggregates of the selected records, cnt None counts each
+        parts = {"cnt": None}
+        if self.value is not None:
+            value = self.value[sel]
+            parts.update({"sum": value, "min": value, "max": value})
+        return parts
+
+
+    def _reduce(self, pos, parts, size):
+        # aggregate records (or bins) by their position in [0, size)
+        res = {}
+        for key, val in parts.items():
+            if key == "cnt":
+                cnt = np.bincount(pos, weights=val, minlength=size)
+                res[key] = cnt if val is None else np.rint(cnt).astype(np.int64)
+            elif key == "sum":
+                res[key] = np.bincount(pos, weights=val, minlength=size)
+            else:
+                res[key] = np.full(size, np.inf if key == "min" else -np.inf)
+                ufunc = np.minimum if key == "min" else np.maximum
+                ufunc.at(res[key], pos, val)
+        return res
+
+
+    def _hist(self, idx, flat, parts, num):
+        # dense (nodes, channels, num) arrays of the records (or bins)
+        pos = flat.astype(np.int64) * num + idx
+        size = self.shape[0] * self.shape[1] * num
+        return {key: data.reshape(self.shape + (num,))
+                for key, data in self._reduce(pos, parts, size).items()}
+
+
+    def _steps(self, first, size):
+        # offset of `first` and `size` in base bins, None if not on the grid
+        off = (first - self.origin) / BASE
+        step = size / BASE
+        if (abs(off - round(off)) > 1e-6 or abs(step - round(step)) > 1e-6 or
+                round(off) < 0 or round(step) < 1):
+            return None
+        return round(off), round(step)
+
+
+    def bins(self, first, last, size):
+        '''
+        Aggregate the records with first <= time <= last to bins of `size`
+        seconds starting at `first`. Returns a dict of arrays of shape
+        (nodes, channels, bins): 'cnt' and, for records with values, 'sum',
+        'min' (inf if empty) and 'max' (-inf if empty)
+        '''
+        num = math.floor((last - first) / size) + 1 if last >= first else 0
+        if num <= 0:
+            return self._hist(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                              self._parts(slice(0, 0)), 0)
+
+        steps = self._steps(first, size)
+        if steps == None:
+            return self._direct(first, last, size, num)
+        off, step = steps
+
+        level = max(l for l in LEVELS if off % l == 0 and step % l == 0)
+        lo = off // level
+        step //= level
+        if level == LEVELS[0]:
+            a, b = np.searchsorted(self.idx, [lo, lo + num * step])
+            idx, flat, parts = self.idx[a:b], self.flat[a:b], self._parts(slice(a, b))
+        else:
+            bins = self.levels[level]
+            a, b = np.searchsorted(bins["key"], [lo * self.cells, (lo + num * step) * self.cells])
+            idx, flat = np.divmod(bins["key"][a:b], self.cells)
+            parts = {key: bins[key][a:b] for key in self.aggs}
+        res = self._hist((idx - lo) // step, flat, parts, num)
+
+        # the last bin may reach beyond `last`, redo it from its records
+        start = off + (num - 1) * step * level
+        a, b = np.searchsorted(self.idx, [start, start + step * level])
+        keep = a + np.flatnonzero(self.time[a:b] <= last)
+        tail = self._hist(np.zeros(len(keep), dtype=np.int64), self.flat[keep],
+                          self._parts(keep), 1)
+        for key in res:
+            res[key][:, :, -1] = tail[key][:, :, 0]
+        return res
+
+
+    def _direct(self, first, last, size, num):
+        # bin the records directly, for spans not aligned to the base bins
+        a = np.searchsorted(self.idx, math.floor((first - self.origin) / BASE))
+        b = np.searchsorted(self.idx, math.floor((last - self.origin) / BASE), side="right")
+        keep = a + np.flatnonzero((self.time[a:b] >= first) & (self.time[a:b] <= last))
+        idx = np.minimum(np.floor((self.time[keep] - first) / size).astype(np.int64), num - 1)
+        return self._hist(idx, self.flat[keep], self._parts(keep), num)
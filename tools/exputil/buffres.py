@@ -25,7 +25,6 @@ sys.path.append(str(Path(os.path.abspath(__file__)).parent.parent))
 
 import re
 import copy
-import json
 import math
 from datetime import datetime
 from tools.exputil.ana import Ana
@@ -37,35 +36,30 @@ from tools.exputil.llstats import LLStats
 
 
 class Buffres(Ana):
+    '''
+    Analysis state of a dump, served from the event cache (see Evtcache)
 
-    def __init__(self, logfile):
+    The log is only parsed if there is no cache entry for it yet, or if the
+    entry of an analyzer is stale. So re-running plots based on Buffres only
+    costs the plotting.
+    '''
+
+    def __init__(self, logfile, jobs=None):
         super().__init__(logfile)
 
-        self.alive = None
-        self.expstats = None
+        self.alive = Alive(self)
+        self.expstats = Expstats(self)
         self.ifconfigval = None
-        self.llstats = None
-        self.topo = None
-
-        # find buffered data file
-        srcfile = f"{self.plotbase}_raw.json"
-        self.checkpath(srcfile)
-        with open(srcfile, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-            self.t = data["t"]
+        self.llstats = LLStats(self)
+        self.topo = Topo(self)
 
-            if "alive" in data:
-                self.alive = Alive(self)
-                self.alive.readraw(data["alive"])
-                # self.alive.summary()
+        self.router.add(self.alive)
+        self.router.add(self.expstats)
+        self.router.add(self.llstats)
+        self.router.add(self.topo)
 
-            if "llstats" in data:
-                self.llstats = LLStats(self)
-                self.llstats.readraw(data["llstats"])
-                # self.llstats.summary()
+        self.parse_log_cached(jobs)
 
-            if "expstats" in data:
-                self.expstats = Expstats(self)
-                self.expstats.readraw(data["expstats"])
-                # self.expstats.summary()
+        self.expstats.finish()
+        self.llstats.finish()
+        self.topo.finish()
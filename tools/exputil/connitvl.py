@@ -22,14 +22,20 @@ import os
 import re
 import sys
 import copy
+import numpy as np
+from tools.exputil.evtcache import strcodes, strlist
 
 MAX_CONNS = 20
 
 class Connitvl:
 
+    PREFIXES = ["["]
+    VERSION = 1
+
     def __init__(self, ana):
         self.ana = ana
         self.conns = {n: [None for _ in range(MAX_CONNS)] for n in self.ana.desc["used_nodes"]}
+        self.changed = set()    # (node, handle) slots written by update()
 
         self.re_itvl = re.compile(r'\[ ?(?P<handle>\d+)\] '
                                   r'(?P<peer>[0-9a-zA-Z:]+) \[(?P<lladdr>[0-9a-zA-Z:]+)\] '
@@ -49,12 +55,58 @@ class Connitvl:
                 "super": int(m.group("super")),
                 "slat": int(m.group("slat")),
             }
+            self.changed.add((node, handle))
             # print("Hello peer {}".format(self.conns[node][handle]))
 
         m = self.re_unused.search(line)
         if m:
             handle = int(m.group("handle"))
             self.conns[node][handle] = None
+            self.changed.add((node, handle))
+
+
+    def getpart(self):
+        return {"conns": self.conns, "changed": self.changed}
+
+
+    def merge(self, part):
+        for node, handle in part["changed"]:
+            self.conns[node][handle] = part["conns"][node][handle]
+        self.changed |= part["changed"]
+
+
+    def getcols(self):
+        slots = [(n, h, self.conns[n][h]) for n, h in sorted(self.changed)]
+        used = [(n, h, c) for n, h, c in slots if c != None]
+        cols = {
+            "handle": np.array([h for _, h, _ in slots], dtype=np.int64),
+            "used": np.array([c != None for _, _, c in slots], dtype=bool),
+        }
+        cols["node_names"], cols["node"] = strcodes([n for n, _, _ in slots])
+        for key in ("itvl", "super", "slat"):
+            cols[key] = np.array([c[key] for _, _, c in used], dtype=np.int64)
+        for key in ("peer", "role"):
+            cols[f'{key}_names'], cols[key] = strcodes([c[key] for _, _, c in used])
+        return cols
+
+
+    def readcols(self, cols):
+        conns = zip(strlist(cols["peer_names"], cols["peer"]),
+                    strlist(cols["role_names"], cols["role"]),
+                    cols["itvl"].tolist(), cols["super"].tolist(), cols["slat"].tolist())
+        for node, handle, used in zip(strlist(cols["node_names"], cols["node"]),
+                                      cols["handle"].tolist(), cols["used"].tolist()):
+            self.changed.add((node, handle))
+            self.conns[node][handle] = None
+            if used:
+                peer, role, itvl, sup, slat = next(conns)
+                self.conns[node][handle] = {
+                    "peer": peer,
+                    "role": role,
+                    "itvl": itvl,
+                    "super": sup,
+                    "slat": slat,
+                }
 
 
     def summary(self):
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import os
+import json
+import math
+from tools.exputil.dumpreader import Dumpreader
+
+VERSION = 1
+STRIDE = 10                 # time between two indexed offsets, in seconds
+
+
+class Dumpindex:
+    '''
+    Sidecar index of a dump, stored as `<dump>.idx` next to it.
+
+    The index holds the offset of the first log line (end of the experiment
+    description), the byte offset of the first line reaching every STRIDE
+    seconds of log time, the number of log lines per node, and the 'Own
+    Address' lines, as these need to be applied regardless of the window. It allows to
+    parse only a given time window of a log, by mapping the window to the
+    byte range containing it (see range()).
+
+    The index is built on first use by a single pass over the log and is
+    rebuilt whenever the size or mtime of the dump change. Compressed dumps
+    can not be seeked into, so there is no index for them.
+    '''
+
+    def __init__(self, logfile):
+        self.logfile = logfile
+        self.file = f'{logfile}.idx'
+        self.idx = None
+
+
+    def stamp(self):
+        st = os.stat(self.logfile)
+        return [st.st_size, st.st_mtime_ns]
+
+
+    def load(self):
+        if self.idx:
+            return self.idx
+        if os.path.isfile(self.file):
+            try:
+                with open(self.file, "r", encoding="utf-8") as f:
+                    idx = json.load(f)
+                if idx["version"] == VERSION and idx["stamp"] == self.stamp():
+                    self.idx = idx
+                    return self.idx
+            except (ValueError, KeyError):
+                pass
+        self.idx = self.build()
+        tmp = f'{self.file}.{os.getpid()}'
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.idx, f)
+        os.replace(tmp, self.file)
+        return self.idx
+
+
+    def build(self):
+        reader = Dumpreader(self.logfile)
+        idx = {
+            "version": VERSION,
+            "stamp": self.stamp(),
+            "stride": STRIDE,
+            "body": 0,
+            "size": 0,
+            "t_first": 0,
+            "t_last": 0,
+            "offsets": [],
+            "nodes": {},
+            "ownaddr": [],
+        }
+        mm = reader.map()
+        if mm is None:
+            return idx
+
+        with mm:
+            idx["body"] = reader.body(mm)
+            idx["size"] = len(mm)
+            cnt = {}
+            offsets = idx["offsets"]
+            next_t = None
+            pos = idx["body"]
+            for line in iter(mm.readline, b""):
+                evt = reader.parse(line)
+                if evt:
+                    time, node_id, _ = evt
+                    cnt[node_id] = cnt.get(node_id, 0) + 1
+                    if next_t is None:
+                        idx["t_first"] = time
+                        next_t = time
+                    while time >= next_t:
+                        offsets.append(pos)
+                        next_t = idx["t_first"] + len(offsets) * STRIDE
+                    if time > idx["t_last"]:
+                        idx["t_last"] = time
+                    if b"Own Address: " in line:
+                        idx["ownaddr"].append([reader.nodes[node_id],
+                                               evt[2].decode("utf-8")])
+                pos += len(line)
+            idx["nodes"] = {reader.nodes[n]: c for n, c in cnt.items()}
+        return idx
+
+
+    def range(self, first, last):
+        '''
+        Get the (start, end) byte range holding all log lines with a timestamp
+        in [first, last], both given in seconds relative to the first log line
+        and None for an open end
+        '''
+        idx = self.load()
+        offsets = idx["offsets"]
+        start = idx["body"]
+        end = idx["size"]
+        if first != None and first > 0:
+            i = math.floor(first / idx["stride"])
+            if i < len(offsets):
+                start = offsets[i]
+            else:
+                start = end
+        if last != None:
+            # give lines logged slightly out of order one stride of slack
+            i = math.floor(last / idx["stride"]) + 2
+            if i < len(offsets):
+                end = offsets[i]
+        return start, max(start, end)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import io
+import os
+import re
+import sys
+import gzip
+import lzma
+import mmap
+
+# compressed dumps are read as stream, as they can not be memory mapped
+COMPRESSED = [".gz", ".xz", ".zst"]
+
+
+def dumpopen(logfile):
+    '''
+    Open a plain or compressed (.gz, .xz, .zst) dump for binary reading
+    '''
+    ext = os.path.splitext(logfile)[1]
+    if ext == ".gz":
+        return gzip.open(logfile, "rb")
+    if ext == ".xz":
+        return lzma.open(logfile, "rb")
+    if ext == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            sys.exit("Error: reading {} requires the zstandard package".format(logfile))
+        raw = zstandard.ZstdDecompressor().stream_reader(open(logfile, "rb"),
+                                                         closefd=True)
+        return io.BufferedReader(raw)
+    return open(logfile, "rb")
+
+
+class Dumpreader:
+    '''
+    Bytes level reader for .dump files.
+
+    The file is memory mapped and split into lines without decoding it. The
+    `TIME;NODE;` prefix of each body line is parsed by slicing, node names are
+    interned to small integer ids (see `nodes`, known nodes can be passed in
+    to keep their ids), and the remaining output is handed out as raw bytes,
+    so that it is only decoded if somebody actually consumes the line.
+
+    Compressed dumps are decompressed on the fly. They can not be split into
+    byte ranges, instead blocks() streams their body in newline aligned
+    blocks, which can be parsed using lines(data=...).
+    '''
+
+    def __init__(self, logfile, nodes=()):
+        self.logfile = logfile
+        self.compressed = os.path.splitext(logfile)[1] in COMPRESSED
+        self.re_time = re.compile(rb'\d+\.\d+')
+        self.re_node = re.compile(rb'[a-zA-Z0-9-]+')
+        self.nodes = []         # node_id -> node name
+        self.node_ids = {}      # raw node name -> node_id (None if invalid)
+
+        # known nodes (e.g. a NodeRegistry) keep their ids, others are
+        # appended as they show up in the log
+        for name in nodes:
+            self.node_id(name.encode("utf-8"))
+
+
+    def node_id(self, raw):
+        if self.re_node.fullmatch(raw):
+            self.node_ids[raw] = len(self.nodes)
+            self.nodes.append(raw.decode("utf-8"))
+        else:
+            self.node_ids[raw] = None
+        return self.node_ids[raw]
+
+
+    def header(self, f):
+        '''
+        Read the experiment description from `f`
+
+        The description is terminated by a line starting with '----'. If
+        there is anything else than 'exp:' lines in front of it, we do not
+        know the format: in that case the consumed lines are returned, so
+        they can be parsed as part of the body.
+        '''
+        head = []
+        while True:
+            line = f.readline()
+            head.append(line)
+            if line.startswith(b"----"):
+                return b""
+            if not line or (line.strip() and not line.startswith(b"exp:")):
+                return b"".join(head)
+
+
+    def body(self, mm):
+        '''
+        Get the offset of the first log line
+        '''
+        mm.seek(0)
+        if self.header(mm):
+            return 0
+        return mm.tell()
+
+
+    def parse(self, line):
+        '''
+        Split a raw log line into (time, node_id, payload), None if the line
+        does not carry the `TIME;NODE;` prefix
+        '''
+        try:
+            t, node, payload = line.split(b";", 2)
+        except ValueError:
+            return None
+        if not self.re_time.fullmatch(t):
+            return None
+        node_id = self.node_ids.get(node, -1)
+        if node_id == -1:
+            node_id = self.node_id(node)
+        if node_id is None:
+            return None
+        if payload[-1:] == b"\n":
+            payload = payload[:-1]
+        return float(t), node_id, payload
+
+
+    def map(self):
+        with open(self.logfile, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+    def chunks(self, num, start=None, end=None):
+        '''
+        Split the log body, or the given byte range of it, into `num` newline
+        aligned (start, end) byte ranges
+        '''
+        mm = self.map()
+        if mm is None:
+            return []
+        with mm:
+            if start is None:
+                start = self.body(mm)
+            size = len(mm) if end is None else end
+            bounds = [start]
+            for i in range(1, num):
+                pos = max(bounds[-1], start + (size - start) * i // num)
+                pos = mm.find(b"\n", pos)
+                if pos < 0:
+                    break
+                if pos + 1 > bounds[-1]:
+                    bounds.append(pos + 1)
+            bounds.append(size)
+            return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+    def blocks(self, size):
+        '''
+        Generator yielding the log body in newline aligned blocks of roughly
+        `size` bytes, reading the (compressed) dump as stream
+        '''
+        with dumpopen(self.logfile) as f:
+            rest = self.header(f)
+            while True:
+                data = f.read(size)
+                if not data:
+                    break
+                data = rest + data
+                cut = data.rfind(b"\n") + 1
+                rest = data[cut:]
+                if cut > 0:
+                    yield data[:cut]
+            if rest:
+                yield rest
+
+
+    def grep(self, needle, data=None):
+        '''
+        Generator yielding (time, node_id, payload) for all log lines
+        containing `needle`, without touching any other line. Searches the
+        given block of `data` or the whole (uncompressed) dump.
+        '''
+        if data is not None:
+            yield from self.find(needle, data, 0)
+            return
+        mm = self.map()
+        if mm is None:
+            return
+        with mm:
+            yield from self.find(needle, mm, self.body(mm))
+
+
+    def find(self, needle, buf, pos):
+        while True:
+            pos = buf.find(needle, pos)
+            if pos < 0:
+                return
+            start = buf.rfind(b"\n", 0, pos) + 1
+            end = buf.find(b"\n", pos)
+            end = len(buf) if end < 0 else end + 1
+            for seg in buf[start:end].splitlines():
+                if needle in seg:
+                    evt = self.parse(seg)
+                    if evt:
+                        yield evt
+            pos = end
+
+
+    def rawlines(self, start=None, end=None, data=None):
+        if data is not None:
+            yield from io.BytesIO(data)
+        elif self.compressed:
+            with dumpopen(self.logfile) as f:
+                yield from io.BytesIO(self.header(f))
+                yield from f
+        else:
+            mm = self.map()
+            if mm is None:
+                return
+            with mm:
+                mm.seek(self.body(mm) if start is None else start)
+                if end is None or end >= len(mm):
+                    yield from iter(mm.readline, b"")
+                    return
+                while mm.tell() < end:
+                    yield mm.readline()
+
+
+    def lines(self, start=None, end=None, data=None):
+        '''
+        Generator yielding a (time, node_id, payload) tuple for every log line,
+        optionally limited to the byte range [start, end) or to the lines
+        contained in the block of `data`
+        '''
+        parse = self.parse
+        for line in self.rawlines(start, end, data):
+            # stick to universal newlines as used for text files
+            if b"\r" in line:
+                for seg in line.splitlines():
+                    evt = parse(seg)
+                    if evt:
+                        yield evt
+            else:
+                evt = parse(line)
+                if evt:
+                    yield evt
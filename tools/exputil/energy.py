@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import numpy as np
+from tools.exputil.samples import binsums
+
+# current profiles per board: supply voltage [V] and current [mA] with the
+# radio in RX and TX (BLE 1Mbit, 0dBm, DC/DC enabled) and while the radio is
+# off (System ON, RTC running), taken from the nRF52832 and nRF52840 product
+# specifications
+PROFILES = {
+    "nrf52dk": {"voltage": 3.0, "rx": 5.4, "tx": 5.3, "idle": 0.0019},
+    "nrf52840dk": {"voltage": 3.0, "rx": 4.6, "tx": 4.8, "idle": 0.0032},
+}
+PROFILE_DEFAULT = "nrf52dk"
+
+
+class Energy:
+    '''
+    Radio duty cycle and energy estimation from the LLStats PHY counters.
+
+    Each ll,... supstats line reports the time the radio spent in RX and TX
+    during the last `dur` us. Together with the current profile of the nodes
+    board this gives the radio duty cycle and the energy used by the radio
+    in each of these intervals, the rest of the interval is accounted with
+    the idle current. The energy per delivered CoAP packet relates this to
+    the flows acknowledged to the producers (Expstats).
+
+    Works on ana.llstats and ana.expstats unless other LLStats and Expstats
+    are given, `profiles` overrides or extends PROFILES, e.g.
+    {"nrf52dk": {"voltage": 1.8}}. The board of a node is taken from its
+    nodes.yml entry.
+    '''
+
+    def __init__(self, ana, profiles=None, llstats=None, expstats=None):
+        self.ana = ana
+        self.llstats = llstats if llstats != None else ana.llstats
+        self.expstats = expstats if expstats != None else ana.expstats
+        self.config = {"profiles": profiles}
+        self.profiles = {board: dict(p) for board, p in PROFILES.items()}
+        for board, p in (profiles or {}).items():
+            self.profiles.setdefault(board, dict(PROFILES[PROFILE_DEFAULT])).update(p)
+        self._warned = set()
+
+
+    def profile(self, node):
+        board = self.ana.nodecfg.get(node, {}).get("board")
+        if board == None:
+            board = node.rsplit("-", 1)[0]
+        if board not in self.profiles:
+            if board not in self._warned:
+                print(f'Warning: Energy: no current profile for {board}, '
+                      f'using {PROFILE_DEFAULT}')
+                self._warned.add(board)
+            board = PROFILE_DEFAULT
+        return self.profiles[board]
+
+
+    def samples(self, nodes=None, first=None, last=None):
+        '''
+        Get time, node id, duration [s], duty cycle (rx, tx and on) and energy
+        [mJ] of each PHY sample as dict of arrays
+        '''
+        phy = self.llstats.phy.select(nodes, first, last)
+        phy = phy[phy["dur"] > 0]
+        params = np.array([[self.profile(n)[k] for k in ("voltage", "rx", "tx", "idle")]
+                           for n in self.ana.nodes]).reshape(-1, 4)[phy["node"]]
+
+        dur = phy["dur"].astype(np.float64)
+        rx = phy["rx_tim"].astype(np.float64)
+        tx = phy["tx_tim"].astype(np.float64)
+        idle = np.maximum(dur - rx - tx, 0)
+        # mA * us * V = nJ
+        energy = params[:, 0] * (params[:, 1] * rx + params[:, 2] * tx + params[:, 3] * idle) / 1e6
+        return {
+            "time": phy["time"],
+            "node": phy["node"],
+            "dur": dur / 1e6,
+            "rx": rx / dur,
+            "tx": tx / dur,
+            "on": (rx + tx) / dur,
+            "energy": energy,
+        }
+
+
+    def stats(self):
+        '''
+        Per node and overall ("sum") radio duty cycle [%], energy [mJ], average
+        power [mW], delivered packets and energy per delivered packet [mJ] for
+        the experiment runtime
+        '''
+        smp = self.samples(None, self.ana.t["start"], self.ana.t["end"])
+        num = len(self.ana.nodes)
+        dur = np.bincount(smp["node"], weights=smp["dur"], minlength=num)
+        energy = np.bincount(smp["node"], weights=smp["energy"], minlength=num)
+        on = {k: np.bincount(smp["node"], weights=smp[k] * smp["dur"], minlength=num)
+              for k in ("rx", "tx", "on")}
+        cnt = self.expstats.flows_cnt
+
+        res = {}
+        rows = [(n, [i]) for i, n in enumerate(self.ana.nodes)]
+        for n, ids in rows + [("sum", list(range(num)))]:
+            d = dur[ids].sum()
+            if d == 0:
+                continue
+            acked = cnt[n]["ack"] if n in cnt else 0
+            e = float(energy[ids].sum())
+            res[n] = {
+                "duration": float(d),
+                "duty_rx": float(on["rx"][ids].sum() / d * 100),
+                "duty_tx": float(on["tx"][ids].sum() / d * 100),
+                "duty": float(on["on"][ids].sum() / d * 100),
+                "energy": e,
+                # for "sum" this is the mean power of a node
+                "power": e / d,
+                "acked": acked,
+                "energy_per_pkt": e / acked if acked > 0 else None,
+            }
+        return res
+
+
+    def series(self, nodes=None, binsize=15.0, timespan=None):
+        '''
+        Radio duty cycle [%] and mean power per node [mW] per time bin, for
+        the given nodes together
+        '''
+        cfg = self.ana.plotsetup(nodes, binsize, timespan)
+        smp = self.samples(cfg["nodes"], cfg["first"], cfg["last"])
+        bins, dur, _ = binsums(smp["time"], smp["dur"], cfg["first"], cfg["binsize"])
+        _, on, _ = binsums(smp["time"], smp["on"] * smp["dur"], cfg["first"], cfg["binsize"])
+        _, energy, _ = binsums(smp["time"], smp["energy"], cfg["first"], cfg["binsize"])
+
+        duty = np.zeros(len(dur))
+        power = np.zeros(len(dur))
+        np.divide(on * 100, dur, out=duty, where=(dur > 0))
+        np.divide(energy, dur, out=power, where=(dur > 0))
+        return {
+            "binsize": cfg["binsize"],
+            "x": [self.ana.t_norm(t) for t in bins],
+            "duty": duty.tolist(),
+            "power": power.tolist(),
+        }
+
+
+    def overview(self):
+        '''
+        Per run scalars and time series for the overview JSON
+        '''
+        stats = self.stats()
+        res = {"profiles": self.profiles, "pernode": stats, "series": self.series()}
+        if "sum" in stats:
+            for key in ("duty", "energy", "power", "energy_per_pkt"):
+                res[key] = stats["sum"][key]
+        return res
+
+
+    def summary(self):
+        stats = self.stats()
+        self.ana.statwrite("\nEnergy: radio duty cycle and energy per delivered packet")
+        self.ana.statwrite(f'{"node":>15} {"rx[%]":>7} {"tx[%]":>7} {"duty[%]":>7} '
+                           f'{"E[mJ]":>10} {"P[mW]":>7} {"acked":>6} {"E/pkt[mJ]":>10}')
+        for n in self.ana.nsort(stats):
+            s = stats[n]
+            per_pkt = "-" if s["energy_per_pkt"] is None else f'{s["energy_per_pkt"]:.3f}'
+            self.ana.statwrite(f'{n:>15} {s["duty_rx"]:>7.3f} {s["duty_tx"]:>7.3f} '
+                               f'{s["duty"]:>7.3f} {s["energy"]:>10.1f} {s["power"]:>7.3f} '
+                               f'{s["acked"]:>6} {per_pkt:>10}')
+
+
+    def plot_duty_cycle_pn(self, nodes=None, binsize=15.0, timespan=None, ylim=None):
+        '''
+        Time series of the radio duty cycle of each node
+        '''
+        cfg = self.ana.plotsetup(nodes, binsize, timespan)
+        lines = []
+        for n in self.ana.nsort(cfg["nodes"]):
+            if len(self.llstats.phy.node(n)) == 0:
+                continue
+            series = self.series([n], cfg["binsize"], timespan)
+            lines.append({"x": series["x"], "y": series["duty"], "label": n})
+
+        if len(lines) == 0:
+            print("Energy: skipping plot_duty_cycle_pn(), no PHY stats in log")
+            return
+
+        xt = self.ana.plotter.get_ticks([l["x"] for l in lines], None)
+        info = {
+            "title": "Radio duty cycle per node (binsize {}s)".format(binsize),
+            "xlabel": "Experiment runtime [s]",
+            "ylabel": "Radio duty cycle [%]",
+            "suffix": "duty_cycle_pn",
+            "xlim": xt["lim"],
+            "xticks": xt["ticks"],
+            "xtick_lbl": xt["ticks"],
+            "xtick_lbl_rot": {"rotation": 45, "ha": "right"},
+            "ylim": ylim,
+            "binsize": binsize,
+            "plotter": "line",
+        }
+        self.ana.plotter.linechart4(info, lines)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+
+def strcodes(values):
+    '''
+    Map a list of strings to (table, codes), None is mapped to code -1
+    '''
+    table = {}
+    codes = np.fromiter((-1 if v is None else table.setdefault(v, len(table))
+                         for v in values), dtype=np.int32, count=len(values))
+    return np.array(list(table), dtype=str), codes
+
+
+def strlist(table, codes):
+    '''
+    Inverse of strcodes(): get the list of strings back
+    '''
+    table = table.tolist()
+    return [None if c < 0 else table[c] for c in codes.tolist()]
+
+
+class Evtcache:
+    '''
+    Content addressed cache of the parsed events of a dump.
+
+    After a log was parsed, each analyzer exports its parsing state as a set of
+    numpy arrays (getcols()), which is written to one .npz file per analyzer.
+    Strings are stored as integer codes into a table of names (see
+    strcodes()). On later runs the analyzers rebuild their state from these
+    arrays (readcols()) instead of parsing the text log again.
+
+    Cache entries live in DIR_TEMP/evtcache/DIGEST/, where DIGEST is the size
+    and a hash of the dumps content, so moving or copying a dump keeps its
+    cache. To avoid hashing the dump on every run, the digest is remembered
+    per dump path together with its size and mtime. When the content of a
+    dump changes, e.g. it was appended to, the entry of its previous digest is
+    removed, unless another indexed dump still has that content.
+
+    Each analyzer file is stamped with VERSION and the analyzers own VERSION,
+    bumping either one makes the entry stale and the log is parsed again for
+    that analyzer. The stale file is removed when the new one is written.
+
+    The `meta` file holds the time range of the log and the 'Own Address'
+    lines, so that node address fixups are applied exactly as when parsing.
+    '''
+
+    VERSION = 1             # layout of the cache files
+
+    def __init__(self, ana):
+        self.ana = ana
+        self.dir = os.path.join(ana.tmpdir, "evtcache")
+        self.index = os.path.join(self.dir, "index.json")
+        self.digest = None
+
+
+    def key(self):
+        '''
+        Get the content digest of the dump, hashing it only if its size or
+        mtime changed since the digest was computed last
+        '''
+        if self.digest:
+            return self.digest
+
+        path = os.path.realpath(self.ana.logfile)
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+
+        index = {}
+        if os.path.isfile(self.index):
+            try:
+                with open(self.index, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+            except ValueError:
+                index = {}
+        if path in index and index[path][0] == stamp:
+            self.digest = index[path][1]
+            return self.digest
+
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        self.digest = f'{st.st_size:x}-{h.hexdigest()}'
+
+        old = index[path][1] if path in index else None
+        index[path] = [stamp, self.digest]
+        os.makedirs(self.dir, exist_ok=True)
+        tmp = f'{self.index}.{os.getpid()}'
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, self.index)
+
+        # drop the entry of the dump's previous content
+        if old and all(digest != old for _, digest in index.values()):
+            shutil.rmtree(os.path.join(self.dir, old), ignore_errors=True)
+        return self.digest
+
+
+    def name(self, analyzer):
+        # analyzers that keep only part of their state name their own entry
+        return getattr(analyzer, "cachename", type(analyzer).__name__.lower())
+
+
+    def file(self, name, version=0):
+        return os.path.join(self.dir, self.key(),
+                            f'{name}-{self.VERSION}.{version}.npz')
+
+
+    def afile(self, analyzer):
+        return self.file(self.name(analyzer), getattr(analyzer, "VERSION", 0))
+
+
+    def load(self, analyzers):
+        '''
+        Rebuild the state of all analyzers with a valid cache entry
+
+        Returns the list of analyzers that need to be fed by parsing the log.
+        The meta data is only applied if no analyzer is left.
+        '''
+        if not os.path.isfile(self.file("meta")):
+            return analyzers
+        stale = [a for a in analyzers if not os.path.isfile(self.afile(a))]
+        if stale:
+            for analyzer in analyzers:
+                if analyzer not in stale:
+                    self.read(analyzer)
+            return stale
+
+        with np.load(self.file("meta")) as meta:
+            for node, output in zip(*[strlist(meta[f'ownaddr_{c}_names'],
+                                              meta[f'ownaddr_{c}'])
+                                      for c in ("node", "output")]):
+                self.ana.check_ownaddr(node, output)
+            t_first, t_last = meta["t"].tolist()
+
+        for analyzer in analyzers:
+            self.read(analyzer)
+
+        self.ana.t_init(t_first, t_last)
+        return []
+
+
+    def read(self, analyzer):
+        with np.load(self.afile(analyzer)) as cols:
+            analyzer.readcols(cols)
+
+
+    def save(self, analyzers):
+        ownaddr = self.ana.ownaddr
+        meta = {"t": np.array([self.ana.t["prep"], self.ana.t["finish"]])}
+        meta["ownaddr_node_names"], meta["ownaddr_node"] = strcodes([o[0] for o in ownaddr])
+        meta["ownaddr_output_names"], meta["ownaddr_output"] = strcodes([o[1] for o in ownaddr])
+
+        for analyzer in analyzers:
+            self.write(self.afile(analyzer), analyzer.getcols())
+        self.write(self.file("meta"), meta)
+
+
+    def write(self, file, cols):
+        # drop entries of outdated versions
+        base = os.path.dirname(file)
+        os.makedirs(base, exist_ok=True)
+        name = os.path.basename(file).split("-")[0]
+        for old in os.listdir(base):
+            if (old.split("-")[0] == name and old.endswith(".npz")
+                    and old != os.path.basename(file)):
+                os.remove(os.path.join(base, old))
+
+        tmp = f'{file}.{os.getpid()}'
+        with open(tmp, "wb") as f:
+            np.savez(f, **cols)
+        os.replace(tmp, file)
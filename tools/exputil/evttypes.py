@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+'''
+Registry of the expstats event types ('~NAME' lines in the logs).
+
+The types, their codes and their order are those of the _names table in
+lib/riot/expstats/expstats.c and of the enum in its header, TYPES below is
+generated from them. To update it after changing the firmware, or to check
+that it is still in line with it, run:
+
+    python -m tools.exputil.evttypes [--check]
+'''
+
+import os
+import re
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..",
+                   "lib", "riot", "expstats")
+
+# category of a type by the prefix of its name, DROP types are 'drop'
+PREFIXES = {
+    "A_": "app",
+    "AL_": "alarm",
+    "N_": "net",
+    "C_": "ctrl",
+    "H_": "credit",         # L2CAP credits
+    "R_": "rpl",
+    "B_": "rpble",
+    "F_": "nib",
+    "I_": "ip",
+    "G_": "gnrc",
+    "ND_": "nd",
+    "OF": "of",
+}
+DROP = ["N_RX_NPB", "N_TX_NNB", "N_TX_NC", "N_TX_A", "N_TX_M_NNB", "N_TX_M_NC",
+        "N_TX_M_A", "I_D", "G_MD"]
+
+# BEGIN GENERATED TYPES
+TYPES = [
+    ("A_TX", "app"),
+    ("A_TX_F", "app"),
+    ("A_TX_ER", "app"),
+    ("A_TX_RE", "app"),
+    ("A_RX", "app"),
+    ("A_ACK", "app"),
+    ("A_ACK_ER", "app"),
+    ("A_ACK_TO", "app"),
+    ("AL_TX", "alarm"),
+    ("AL_TX_ER", "alarm"),
+    ("AL_RX", "alarm"),
+    ("AL_ACK", "alarm"),
+    ("N_RX", "net"),
+    ("N_RX_ER", "net"),
+    ("N_RX_NPB", "drop"),
+    ("N_TX", "net"),
+    ("N_TX_ER", "net"),
+    ("N_TX_NNB", "drop"),
+    ("N_TX_NC", "drop"),
+    ("N_TX_A", "drop"),
+    ("N_TX_US", "net"),
+    ("N_TX_M", "net"),
+    ("N_TX_M_ER", "net"),
+    ("N_TX_M_NC", "drop"),
+    ("N_TX_M_A", "drop"),
+    ("N_TX_M_NNB", "drop"),
+    ("C_RXER", "ctrl"),
+    ("C_AA", "ctrl"),
+    ("H_CI", "credit"),
+    ("H_CS", "credit"),
+    ("H_CRR", "credit"),
+    ("H_CU", "credit"),
+    ("H_CTX", "credit"),
+    ("H_CHA", "credit"),
+    ("H_CHF", "credit"),
+    ("R_TX", "rpl"),
+    ("R_TX_DIO", "rpl"),
+    ("R_TX_DIO_NB", "rpl"),
+    ("R_TX_DIO_ER", "rpl"),
+    ("R_TX_DAO", "rpl"),
+    ("R_TX_DAONB", "rpl"),
+    ("R_TX_DAO_ACK", "rpl"),
+    ("R_TX_DAO_ACKNB", "rpl"),
+    ("R_TX_DIS", "rpl"),
+    ("R_TX_DISNB", "rpl"),
+    ("R_TX_DISER", "rpl"),
+    ("R_RX", "rpl"),
+    ("R_RX_ER", "rpl"),
+    ("R_RX_DIO", "rpl"),
+    ("R_RX_DAO", "rpl"),
+    ("R_RX_DAO_ACK", "rpl"),
+    ("R_RX_DIS", "rpl"),
+    ("R_E_PTO", "rpl"),
+    ("R_E_PS", "rpl"),
+    ("R_E_PDIS", "rpl"),
+    ("R_E_PR", "rpl"),
+    ("R_E_DAOTX", "rpl"),
+    ("R_E_IC", "rpl"),
+    ("R_E_T", "rpl"),
+    ("B_UNC", "rpble"),
+    ("B_CTX", "rpble"),
+    ("B_PC", "rpble"),
+    ("B_CC", "rpble"),
+    ("B_PL", "rpble"),
+    ("B_CL", "rpble"),
+    ("B_PA", "rpble"),
+    ("B_CA", "rpble"),
+    ("F_A", "nib"),
+    ("F_AD", "nib"),
+    ("F_AE", "nib"),
+    ("F_D", "nib"),
+    ("F_DD", "nib"),
+    ("I_U", "ip"),
+    ("I_D", "drop"),
+    ("I_MUX", "ip"),
+    ("G_MD", "drop"),
+    ("ND_RX_RS", "nd"),
+    ("ND_RX_RA", "nd"),
+    ("ND_RX_NS", "nd"),
+    ("ND_RX_NA", "nd"),
+    ("ND_TX_RS", "nd"),
+    ("ND_TX_RA", "nd"),
+    ("ND_TX_NS", "nd"),
+    ("ND_TX_NA", "nd"),
+    ("OF", "of"),
+]
+# END GENERATED TYPES
+
+NAMES = [name for name, _ in TYPES]
+CODES = {name: code for code, name in enumerate(NAMES)}
+CATEGORIES = dict(TYPES)
+
+_unknown = set()
+
+
+def lookup(name):
+    '''
+    Get the code of a type and the registry's copy of its name, so all
+    events share the same string. Unknown types are reported once and get
+    no code (None).
+    '''
+    code = CODES.get(name)
+    if code == None:
+        if name not in _unknown:
+            _unknown.add(name)
+            print(f'Warning: unknown event type ~{name}, it is not in expstats.c')
+        return None, name
+    return code, NAMES[code]
+
+
+def category(name):
+    '''
+    Get the category of a type, types not in the registry (yet) are
+    categorized by the prefix of their name
+    '''
+    cat = CATEGORIES.get(name)
+    if cat == None:
+        cat = _byprefix(name) or "unknown"
+    return cat
+
+
+def order(names):
+    '''
+    Sort type names by their code, unknown types last. Returns the sorted
+    names and, for each given name, its position in them
+    '''
+    names = list(names)
+    key = sorted(range(len(names)), key=lambda i: (CODES.get(names[i], len(NAMES)), names[i]))
+    pos = [0] * len(names)
+    for p, i in enumerate(key):
+        pos[i] = p
+    return [names[i] for i in key], pos
+
+
+def _byprefix(name):
+    for prefix in sorted(PREFIXES, key=len, reverse=True):
+        if name.startswith(prefix):
+            return PREFIXES[prefix]
+    return None
+
+
+def classify(name):
+    if name in DROP:
+        return "drop"
+    cat = _byprefix(name)
+    if cat != None:
+        return cat
+    sys.exit(f'Error: no category for event type {name}, see evttypes.PREFIXES')
+
+
+def parse(src=SRC):
+    '''
+    Read the types from the firmware: the enum in expstats.h gives the code
+    of each EXPSTATS_ constant, the _names table in expstats.c its name
+    '''
+    with open(os.path.join(src, "include", "expstats.h"), "r", encoding="utf-8") as f:
+        enum = re.search(r'enum\s*{(?P<body>[^}]*)}', f.read())
+    consts = re.findall(r'(EXP[A-Z_]+)\s*,', enum.group("body"))
+    with open(os.path.join(src, "expstats.c"), "r", encoding="utf-8") as f:
+        table = re.search(r'_names\[\]\s*=\s*{(?P<body>.*?)\n};', f.read(), re.S)
+    names = dict(re.findall(r'\[(EXP[A-Z_]+)\]\s*=?\s*"([A-Z_]+)"', table.group("body")))
+
+    types = []
+    for const in consts:
+        if const == "EXPSTATS_NUMOF":
+            break
+        if const not in names:
+            sys.exit(f'Error: {const} has no name in expstats.c')
+        types.append((names[const], classify(names[const])))
+    return types
+
+
+def generate(types):
+    lines = ["TYPES = ["]
+    lines += [f'    ("{name}", "{cat}"),' for name, cat in types]
+    lines += ["]"]
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    types = parse()
+    if "--check" in sys.argv[1:]:
+        if types != TYPES:
+            sys.exit("Error: evttypes.TYPES is out of date, run python -m tools.exputil.evttypes")
+        print(f'evttypes: {len(types)} types, in line with expstats.c')
+    else:
+        with open(__file__, "r", encoding="utf-8") as f:
+            src = f.read()
+        begin = src.index("# BEGIN GENERATED TYPES\n") + len("# BEGIN GENERATED TYPES\n")
+        end = src.index("# END GENERATED TYPES")
+        with open(__file__, "w", encoding="utf-8") as f:
+            f.write(src[:begin] + generate(types) + src[end:])
+        print(f'evttypes: wrote {len(types)} types')
@@ -26,6 +26,9 @@ import json
 import shutil
 from pathlib import Path
 from datetime import datetime
+from tools.exputil.dumpreader import COMPRESSED
+from tools.exputil.noderegistry import nodes_sort
+from tools.exputil.nodedb import Nodedb, Loader
 
 
 SCRIPTBASE = os.path.dirname(os.path.realpath(__file__))
@@ -65,6 +68,9 @@ class Expbase:
         self.checkpath(self.tmpdir)
         self.checkpath(self.plotdir)
 
+        self.nodedb = Nodedb(os.path.join(self.basedir, NODE_FILE),
+                             self.tmpdir, self.nodecfg)
+
 
     def setup_exp(self, expfile):
         self.expname = os.path.splitext(os.path.basename(expfile))[0]
@@ -82,9 +88,13 @@ class Expbase:
 
     def setup_ana(self, logfile):
         self.logfile = logfile
-        self.outname = os.path.splitext(os.path.basename(logfile))[0]
+        # strip .dump and the suffix of compressed dumps, e.g. .dump.gz
+        name = os.path.basename(logfile)
+        if os.path.splitext(name)[1] in COMPRESSED:
+            name = os.path.splitext(name)[0]
+        self.outname = os.path.splitext(name)[0]
 
-        m = re.search(r'.+_\d+-\d+.dump$', logfile)
+        m = re.search(r'.+_\d+-\d+.dump(\.(gz|xz|zst))?$', logfile)
         if m:
             self.expname = self.outname[:-16]
             self.expbase = self.expname.split("_")[0]
@@ -105,7 +115,7 @@ class Expbase:
     def loadyml(self, file):
         try:
             with open(file, "r", encoding="utf-8") as f:
-                return  yaml.load(f, Loader=yaml.BaseLoader)
+                return  yaml.load(f, Loader=Loader)
         except Exception as e:
             sys.exit("Error: unable to load file {}: {}".format(file, e))
 
@@ -138,8 +148,7 @@ class Expbase:
 
 
     def get_nodecfg(self, site):
-        tmp = self.loadyml(os.path.join(self.basedir, NODE_FILE))
-        self.nodecfg.update(tmp[site])
+        self.nodedb.add_site(site)
 
 
     def logfile_finalize(self):
@@ -155,10 +164,7 @@ class Expbase:
 
 
     def nodes_sort(self, name):
-        if "-" in name:
-            return (len(name) * 100) + int(name.split("-")[-1])
-        else:
-            return (len(name) * 10000)
+        return nodes_sort(name)
 
 
     def load_json(self, file):
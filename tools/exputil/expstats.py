@@ -23,9 +23,20 @@ import re
 import sys
 import copy
 import math
+import json
+import hashlib
 import statistics
 import numpy as np
-
+from fractions import Fraction
+from tools.exputil.evtcache import strcodes, strlist
+from tools.exputil.flowtable import Flowtable, TIMES, CAPACITY, parseseq
+from tools.exputil.binpyramid import Binpyramid, BASE
+from tools.exputil.latsketch import Latsketch
+from tools.exputil.seqgaps import Seqgaps, STALL_FACTOR
+from tools.exputil.hopdelay import HOP_TYPES
+from tools.exputil import evttypes
+
+# dict representation of a flow, see Flowtable for how flows are stored
 FLOW = {
     "seq": None,        # ID of the flow -> seq number without direction char (a-bbb)
     "src": None,        # filled by A_TX event
@@ -75,6 +86,18 @@ FLOW_CNT = {
     "drop_nc_ack": 0,
 }
 
+# retention of events, per type, see Expstats.retention()
+RETAIN_KEEP = "keep"        # keep each event
+RETAIN_COUNT = "count"      # count events per node, type and kind only
+RETAIN_DROP = "drop"        # only feed the flows
+
+# methods that look at each single event
+EVT_USERS = ["plot_stats", "plot_stats_pn", "plot_evtcnt_boxes_pn"]
+
+# time after which flows may be folded into aggregates, see Expstats.fold(),
+# well beyond the 25s timeout of gcoap for NON requests
+FLOW_HORIZON = 300
+
 COLORMAP_TYPES = {
     "N_TX": "mediumblue",
     "N_RX": "red",
@@ -88,13 +111,33 @@ COLORMAP_TYPES = {
 
 class Expstats:
 
-    def __init__(self, ana):
+    PREFIXES = ["~"]
+    VERSION = 4
+
+    def __init__(self, ana, retain=None, horizon=None):
         self.ana = ana
 
         self.evt = []
-        self.flows = []
+        self.evt_cnt = {}       # (node, type, kind) -> [count, first, last]
+        self.retain = retain    # see retention(), None to keep all events
+        self.horizon = horizon  # see fold(), None to keep all flows
+        self.config = {"retain": retain, "horizon": horizon}
+        self._retain = {}       # type -> retention, resolved from `retain`
+        if retain != None:
+            tag = hashlib.blake2b(json.dumps([sorted(retain.items()), horizon]).encode("utf-8"),
+                                  digest_size=4).hexdigest()
+            self.cachename = f'expstats_{tag}'
+
+        # aggregates of the flows removed by fold()
+        itvl = self.ana.desc.get("expvars.PROD_ITVL")   # in ms
+        self.folded = {"cnt": {}, "nosrc": 0, "lat": Latsketch(), "lat_sum": Fraction(0),
+                       "gaps": Seqgaps(None if itvl == None else float(itvl) / 1000)}
+        self._t0 = None
+        self._foldmark = CAPACITY
+        self.flows = Flowtable(self, ana.nodes)
         self.flows_cnt = {}
-        self.flows_map = {}
+        self._evtarrays = None  # (number of events, arrays), see evtarrays()
+        self._pyramids = {}     # name -> (key, Binpyramid), see pyramid()
 
         self.credits = {n: {} for n in self.ana.desc["used_nodes"]}
         self.of_evt = []
@@ -103,30 +146,253 @@ class Expstats:
 
 
     def getraw(self):
+        flows = self.flows.todicts()
         return {
             "evt": self.evt,
-            "flows": self.flows,
+            "flows": flows,
             "flows_cnt": self.flows_cnt,
-            "flows_map": self.flows_map,
+            "flows_map": {flow["seq"]: flow for flow in flows},
             "credits": self.credits,
+            "evt_cnt": [list(key) + val for key, val in self.evt_cnt.items()],
         }
 
 
     def readraw(self, raw):
         self.evt = raw["evt"]
-        self.flows = raw["flows"]
+        self.evt_cnt = {tuple(c[:3]): c[3:] for c in raw.get("evt_cnt", [])}
+        self._evtarrays = None
+        self._pyramids = {}
+        self.flows = Flowtable(self, self.ana.nodes)
+        for flow in raw["flows"]:
+            self.flows.fromdict(flow)
         self.flows_cnt = raw["flows_cnt"]
-        self.flows_map = raw["flows_map"]
         self.credits = raw["credits"]
 
 
+    def getpart(self):
+        return {
+            "evt": self.evt,
+            "evt_cnt": self.evt_cnt,
+            "flows": self.flows.getstate(),
+            "folded": self.folded,
+            "of_evt": self.of_evt,
+        }
+
+
+    def merge(self, part):
+        '''
+        Append the state gathered from a subsequent chunk of the log, flows that
+        span the chunk boundary are stitched together by their flow id
+        '''
+        self.evt += part["evt"]
+        for key, (num, first, last) in part["evt_cnt"].items():
+            self._count(key, num, first, last)
+        self.of_evt += part["of_evt"]
+        cols = part["flows"]["cols"]
+        self.flows.merge(part["flows"],
+                         lambda row, o, ids: self._flowstitch(row, cols, o, ids))
+        self._foldmerge(part["folded"], part["flows"]["names"])
+        if self.horizon != None and len(self.flows) > 0:
+            t_new = self.flows.cols["t_new"][:len(self.flows)]
+            if self._t0 == None:
+                self._t0 = np.nanmin(t_new).item()
+            if len(self.flows) >= self._foldmark:
+                self.fold(np.nanmax(t_new).item())
+
+
+    def _foldmerge(self, folded, names):
+        ids = np.array([self.flows.node_id(n) for n in names], dtype=np.int64)
+        for key, cnt in folded["cnt"].items():
+            pn = np.zeros(len(self.flows.names), dtype=np.int64)
+            np.add.at(pn, ids[:len(cnt)], cnt)
+            prev = self.folded["cnt"].get(key)
+            if prev is not None:
+                pn[:len(prev)] += prev
+            self.folded["cnt"][key] = pn
+        self.folded["nosrc"] += folded["nosrc"]
+        self.folded["lat"].merge(folded["lat"])
+        self.folded["lat_sum"] += folded["lat_sum"]
+        self.folded["gaps"].merge(folded["gaps"])
+
+
+    def _flowstitch(self, row, cols, o, ids):
+        # the chunk parser did not know the flows prior state, so check the
+        # first event of each kind against it as update_flow() would have
+        flows = self.flows
+        for key, name in (("src", "SOURCE"), ("dst", "DEST"), ("ack", "ACK")):
+            node = ids[cols[f'{key}0'][o]]
+            if node >= 0 and flows.cols[key][row] >= 0 and flows.cols[key][row] != node:
+                print("Warning: duplicate {} node for {}".format(name, flows.seq(row)))
+
+
+    def getcols(self):
+        cols = {"time": np.array([e["time"] for e in self.evt], dtype=np.float64),
+                "of_time": np.array([e["time"] for e in self.of_evt], dtype=np.float64),
+                "of": np.array([e["of"] for e in self.of_evt], dtype=np.int64)}
+        cols["node_names"], cols["node"] = strcodes([e["node"] for e in self.evt])
+        cols["type_names"], cols["type"] = strcodes([e["type"] for e in self.evt])
+        cols["seq_names"], cols["seq"] = strcodes([e["seq"] for e in self.evt])
+        cols["of_node_names"], cols["of_node"] = strcodes([e["node"] for e in self.of_evt])
+        cnt = list(self.evt_cnt.items())
+        cols["cnt_node_names"], cols["cnt_node"] = strcodes([k[0] for k, _ in cnt])
+        cols["cnt_type_names"], cols["cnt_type"] = strcodes([k[1] for k, _ in cnt])
+        cols["cnt_kind"] = np.array([k[2] for k, _ in cnt], dtype=np.int8)
+        cols["cnt_num"] = np.array([v[0] for _, v in cnt], dtype=np.int64)
+        cols["cnt_time"] = np.array([v[1:] for _, v in cnt], dtype=np.float64).reshape(-1, 2)
+
+        # not all flow events are kept, so the flows can not be rebuilt from
+        # them and are stored as they are
+        if self.retain != None:
+            state = self.flows.getstate()
+            for key, col in state["cols"].items():
+                cols[f'flows_{key}'] = col
+            cols["flows_names"] = np.array(state["names"], dtype=str)
+            cols["flows_extra"] = np.array(json.dumps([[row, key, vals] for (row, key), vals
+                                                       in state["extra"].items()]))
+            folded = self.folded
+            cols["folded"] = np.array(json.dumps({
+                "cnt": {key: cnt.tolist() for key, cnt in folded["cnt"].items()},
+                "nosrc": folded["nosrc"],
+                "lat": folded["lat"].todict(),
+                "lat_sum": [folded["lat_sum"].numerator, folded["lat_sum"].denominator],
+                "gaps": folded["gaps"].todict(),
+            }))
+        return cols
+
+
+    def readcols(self, cols):
+        evts = zip(strlist(cols["node_names"], cols["node"]),
+                   cols["time"].tolist(),
+                   strlist(cols["type_names"], cols["type"]),
+                   strlist(cols["seq_names"], cols["seq"]))
+        for node, time, type, seq in evts:
+            evt = {"node": node, "time": time, "type": type, "seq": seq}
+            if seq != None and self.retain == None:
+                self.update_flow(evt)
+            if self.retain == None:
+                self.evt.append(evt)
+            else:
+                self.store(evt)
+
+        # the cached columns already are the arrays finish() and summary() need
+        if len(self.evt) == len(cols["time"]):
+            node_ids = self.ana.nodes.idarray(cols["node_names"].tolist() + [None])
+            kinds = np.array([1 if ">" in s else 2 for s in cols["seq_names"].tolist()] + [0],
+                             dtype=np.int8)
+            types, pos = evttypes.order(cols["type_names"].tolist())
+            pos = np.array(pos + [0], dtype=np.int32)
+            arrays = (cols["time"], node_ids[cols["node"]], pos[cols["type"]],
+                      kinds[cols["seq"]], types)
+            self._evtarrays = (len(self.evt), arrays)
+
+        for node, time, of in zip(strlist(cols["of_node_names"], cols["of_node"]),
+                                  cols["of_time"].tolist(), cols["of"].tolist()):
+            self.of_evt.append({"node": node, "time": time, "of": of})
+
+        cnt = zip(strlist(cols["cnt_node_names"], cols["cnt_node"]),
+                  strlist(cols["cnt_type_names"], cols["cnt_type"]),
+                  cols["cnt_kind"].tolist(), cols["cnt_num"].tolist(), cols["cnt_time"].tolist())
+        for node, type, kind, num, (first, last) in cnt:
+            self._count((node, type, kind), num, first, last)
+
+        if self.retain != None:
+            state = {
+                "cols": {key[6:]: col for key, col in cols.items() if key.startswith("flows_")
+                         and key not in ("flows_names", "flows_extra")},
+                "names": cols["flows_names"].tolist(),
+                "extra": {(row, key): vals for row, key, vals
+                          in json.loads(cols["flows_extra"].item())},
+            }
+            self.flows.merge(state, lambda row, o, ids: None)
+            folded = json.loads(cols["folded"].item())
+            self._foldmerge({"cnt": {key: np.array(cnt, dtype=np.int64)
+                                     for key, cnt in folded["cnt"].items()},
+                             "nosrc": folded["nosrc"],
+                             "lat": Latsketch.fromdict(folded["lat"]),
+                             "lat_sum": Fraction(*folded["lat_sum"]),
+                             "gaps": Seqgaps.fromdict(folded["gaps"])}, state["names"])
+
+
+    @staticmethod
+    def retention(uses):
+        '''
+        Get the event retention needed for the given uses of an Expstats
+        instance: names of its methods (e.g. "summary", "plot_stats"),
+        "overview" for Ana.write_overview() and "hopdelay" for Hopdelay
+        '''
+        if any(use in EVT_USERS for use in uses):
+            return None
+        if "summary" in uses:
+            retain = {"*": RETAIN_COUNT}
+        else:
+            # finish() takes the experiments start and end from the app events
+            retain = {"A_": RETAIN_COUNT, "*": RETAIN_DROP}
+        if "hopdelay" in uses:
+            retain.update({t: RETAIN_KEEP for t in HOP_TYPES})
+        return retain
+
+
+    def store(self, evt):
+        '''
+        Keep, count or drop an event, according to the retention of its type
+        '''
+        etype = evt["type"]
+        retain = self._retain.get(etype)
+        if retain == None:
+            retain = self._retention(etype)
+
+        if retain == RETAIN_KEEP:
+            self.evt.append(evt)
+        elif retain == RETAIN_COUNT:
+            seq = evt["seq"]
+            kind = 0 if seq == None else (1 if ">" in seq else 2)
+            self._count((evt["node"], etype, kind), 1, evt["time"], evt["time"])
+
+
+    def _retention(self, etype):
+        # resolve the retention of a type: exact match, prefix ('A_') or '*'
+        retain = self._retain.get(etype)
+        if retain == None:
+            prefix = etype[:etype.find("_") + 1]
+            retain = self.retain.get(etype, self.retain.get(prefix, self.retain.get("*", RETAIN_KEEP)))
+            self._retain[etype] = retain
+        return retain
+
+
+    def _count(self, key, num, first, last):
+        cnt = self.evt_cnt.get(key)
+        if cnt == None:
+            self.evt_cnt[key] = [num, first, last]
+        else:
+            cnt[0] += num
+            if first < cnt[1]:
+                cnt[1] = first
+            if last > cnt[2]:
+                cnt[2] = last
+
+
+    def needevents(self, use):
+        if self.retain != None:
+            sys.exit(f'Error: Expstats.{use}() needs all events, they are not retained')
+
+
+    def needtypes(self, use, types):
+        if self.retain != None and any(self._retention(t) != RETAIN_KEEP for t in types):
+            sys.exit(f'Error: {use} needs the {", ".join(types)} events, they are not retained')
+
+
+    def needflows(self, use):
+        if self.horizon != None:
+            sys.exit(f'Error: Expstats.{use}() needs all flows, they are folded after {self.horizon}s')
+
+
     def update(self, time, node, line):
         m = self.re_evt.search(line)
         if m:
             evt = {
                 "node": node,
                 "time": time,
-                "type": m.group("type"),       # type of the event -> e.g. A_TX
+                "type": evttypes.lookup(m.group("type"))[1],   # type of the event -> e.g. A_TX
                 "seq": None,
             }
 
@@ -185,7 +451,10 @@ class Expstats:
                 #         if evt["type"] == "H_CU":
                 #             self.credits[node][chan][-1]["upd-cnt"] += change
 
-            self.evt.append(evt)
+            if self.retain == None:
+                self.evt.append(evt)
+            else:
+                self.store(evt)
 
     def _flowid(self, seq):
         return seq.replace("<", "-").replace(">", "-")
@@ -200,195 +469,209 @@ class Expstats:
             self.ana.statwrite("    {:>14}   Designated next hop: {}".format("", self.ana.topo.topo[flow["path"][-1]]["p"]))
 
 
-    def update_flow(self, evt): #
-        sid = self._flowid(evt["seq"])
-        flow = None
-        if sid in self.flows_map:
-            flow = self.flows_map[sid]
-        else:
-            flow = {
-                "seq": sid,        # ID of the flow -> seq number without direction char (a-bbb)
-                "src": None,        # filled by A_TX event
-                "dst": None,        # filled by A_RX event
-                "ack": None,        # filled by A_ACK event -> MUST be same as src
-                "path": [evt["node"]],         # list of nodes that mark the packets path (by logtime)
-                "events": [],       # list of events regarding this flow
-                "t_tx": [],         # timestamp when pkt was sent ->    on A_TX
-                "t_tx_er": [],      # timestamp when pkt send error occured -> on A_TX_ER
-                "t_tx_re": [],      # timestamp when pkt was resent ->    on A_TX_RE
-                "t_rx": [],         # timestamp when pkt was received -> on A_RX
-                "t_ack": [],        # timestamp when pkt was acked -> on A_ACK
-                "drop_tx": [],      # DROP tuple for packet drops on request path
-                "drop_ack": [],     # DROP tuple for packet drops on reply path
-                "drop_nc_tx": [],   # DROP tuple for packets dropped when not connected, dir TX
-                "drop_nc_ack": [],  # DROP tuple for packets dropped when not connected, dir ACK
-            }
-
-            self.flows.append(flow)
-            self.flows_map[sid] = flow
-
-        flow["events"].append(evt)
-
-        if flow["path"][-1] != evt["node"]:
-            flow["path"].append(evt["node"])
-
-        if evt["type"] == "A_TX_ER":
-            if flow["src"] != None and flow["src"] != evt["node"]:
-                print("Warning: duplicate SOURCE node for {}".format(sid))
-            flow["src"] = evt["node"]
-            flow["t_tx_er"].append(evt["time"])
-
-        if evt["type"] == "A_TX":
-            if flow["src"] != None and flow["src"] != evt["node"]:
-                print("Warning: duplicate SOURCE node for {}".format(sid))
-            flow["src"] = evt["node"]
-            flow["t_tx"].append(evt["time"])
-
-        if evt["type"] == "A_TX_RE":
-            flow["t_tx_re"].append(evt["time"])
-
-        elif evt["type"] == "A_RX":
-            if flow["dst"] and flow["dst"] != evt["node"]:
-                print("Warning: duplicate DEST node for {}".format(sid))
-            flow["dst"] = evt["node"]
-            flow["t_rx"].append(evt["time"])
-
-        elif evt["type"] == "A_ACK":
-            if flow["ack"] and flow["ack"] != evt["node"]:
-                print("Warning: duplicate ACK node for {}".format(sid))
-            flow["ack"] = evt["node"]
-            flow["t_ack"].append(evt["time"])
-
-        elif evt["type"] == "I_D" or evt["type"] == "N_TX_NC":
-            drop = {
-                "node": evt["node"],       # node that dropped the packet
-                "time": evt["time"],          # time when the drop happened
-            }
-
-            if evt["type"] == "I_D":
-                if ">" in evt["seq"]:
-                    flow["drop_tx"].append(drop)
-                else:
-                    flow["drop_ack"].append(drop)
+    def update_flow(self, evt):
+        seq = parseseq(evt["seq"])
+        if seq is None:
+            print("Warning: skipping flow event with malformed seq: {} ~{}:{}".format(
+                  evt["node"], evt["type"], evt["seq"]))
+            return
+        prod, seqno, req = seq
+        flows = self.flows
+        if self.horizon != None:
+            if self._t0 == None:
+                self._t0 = evt["time"]
+            if len(flows) >= self._foldmark:
+                self.fold(evt["time"])
+        row = flows.row(int(prod), int(seqno), evt["time"], (len(prod), len(seqno)))
+
+        etype = evt["type"]
+        if etype == "A_TX" or etype == "A_TX_ER":
+            node = flows.node_id(evt["node"])
+            prev = flows.setnode(row, "src", node)
+            if prev >= 0 and prev != node:
+                print("Warning: duplicate SOURCE node for {}".format(flows.seq(row)))
+            flows.addtime(row, "t_tx" if etype == "A_TX" else "t_tx_er", evt["time"])
+
+        elif etype == "A_TX_RE":
+            flows.addtime(row, "t_tx_re", evt["time"])
+
+        elif etype == "A_RX":
+            node = flows.node_id(evt["node"])
+            prev = flows.setnode(row, "dst", node)
+            if prev >= 0 and prev != node:
+                print("Warning: duplicate DEST node for {}".format(flows.seq(row)))
+            flows.addtime(row, "t_rx", evt["time"])
+
+        elif etype == "A_ACK":
+            node = flows.node_id(evt["node"])
+            prev = flows.setnode(row, "ack", node)
+            if prev >= 0 and prev != node:
+                print("Warning: duplicate ACK node for {}".format(flows.seq(row)))
+            flows.addtime(row, "t_ack", evt["time"])
+
+        elif etype == "I_D" or etype == "N_TX_NC":
+            if etype == "I_D":
+                key = "drop_tx" if req else "drop_ack"
             else:
-                if ">" in evt["seq"]:
-                    flow["drop_nc_tx"].append(drop)
-                else:
-                    flow["drop_nc_ack"].append(drop)
+                key = "drop_nc_tx" if req else "drop_nc_ack"
+            flows.adddrop(row, key, flows.node_id(evt["node"]), evt["time"])
+
+
+    def evtarrays(self):
+        '''
+        Get the event list as arrays: time, node id (see NodeRegistry, -1 for
+        unknown nodes), type code into the returned list of type names (in
+        the order of evttypes), and the kind of sequence number (0: none,
+        1: request '>', 2: response '<')
+        '''
+        if self._evtarrays != None and self._evtarrays[0] == len(self.evt):
+            return self._evtarrays[1]
+
+        num = len(self.evt)
+        types = {}
+        time = np.fromiter((e["time"] for e in self.evt), dtype=np.float64, count=num)
+        node = self.ana.nodes.idarray([e["node"] for e in self.evt])
+        etype = np.fromiter((types.setdefault(e["type"], len(types)) for e in self.evt),
+                            dtype=np.int32, count=num)
+        kind = np.fromiter((0 if e["seq"] == None else (1 if ">" in e["seq"] else 2)
+                            for e in self.evt), dtype=np.int8, count=num)
+        types, pos = evttypes.order(types)
+        etype = np.array(pos, dtype=np.int32)[etype]
+
+        arrays = (time, node, etype, kind, types)
+        self._evtarrays = (num, arrays)
+        return arrays
+
+
+    def pyramid(self, name):
+        '''
+        Get the time bin pyramid of the events ("evt": by node, one channel
+        per type of evtarrays()) or of the flows ("flows": by source node and
+        first TX, channel 0 counts all flows and channel i + 1 those with a
+        TIMES[i] event, valued with its delay to the first TX)
+        '''
+        key = (len(self.evt), len(self.flows), self.ana.t["start"])
+        if name in self._pyramids and self._pyramids[name][0] == key:
+            return self._pyramids[name][1]
+
+        if name == "evt":
+            time, node, etype, _, types = self.evtarrays()
+            args = (time, node, etype, (len(self.ana.nodes), len(types)))
+        else:
+            cols = {k: col[:len(self.flows)] for k, col in self.flows.cols.items()}
+            sent = cols["n_t_tx"] > 0
+            rows = [np.flatnonzero(sent)]
+            for key in TIMES:
+                rows.append(np.flatnonzero(sent & (cols[f'n_{key}'] > 0)))
+            chan = np.concatenate([np.full(len(r), i) for i, r in enumerate(rows)])
+            value = np.concatenate([np.zeros(len(rows[0]))] +
+                                   [cols[key][r] - cols["t_tx"][r] for key, r in zip(TIMES, rows[1:])])
+            rows = np.concatenate(rows)
+            args = (cols["t_tx"][rows], cols["src"][rows], chan,
+                    (len(self.flows.names), len(TIMES) + 1), value)
+
+        # keep t[start] on a bin edge
+        start = self.ana.t["start"]
+        origin = start
+        if len(args[0]) > 0 and args[0].min() < start:
+            origin -= math.ceil((start - args[0].min()) / BASE) * BASE
+        pyramid = Binpyramid(origin, *args)
+        self._pyramids[name] = (key, pyramid)
+        return pyramid
+
+
+    def _plotbins(self, name, cfg):
+        '''
+        Bin the events or flows (see pyramid()) for the nodes, time span and
+        binsize of a plotsetup() config. Returns the bin edges and the bins as
+        arrays of shape (cfg nodes, channels, bins), up to the last non-empty
+        bin
+        '''
+        nodes = self.ana.nodes if name == "evt" else self.flows
+        bins = self.pyramid(name).bins(cfg["first"], cfg["last"], cfg["binsize"])
+        sel = nodes.idarray(cfg["nodes"])
+
+        res = {}
+        for key, data in bins.items():
+            pad = np.zeros((1,) + data.shape[1:], dtype=data.dtype)
+            res[key] = np.concatenate((data, pad))[sel].reshape((len(sel),) + data.shape[1:])
+        used = np.flatnonzero(res["cnt"].sum(axis=(0, 1)))
+        num = used[-1] + 1 if len(used) > 0 else 0
+        res = {key: data[:, :, :num] for key, data in res.items()}
+
+        # sum up the edges as the plots always did, so the labels stay the same
+        edges = np.add.accumulate(np.r_[cfg["first"], np.full(num, cfg["binsize"])])
+        return edges.tolist(), res
+
+
+    def evttotals(self):
+        '''
+        Get the number and the first and last time of the kept and counted
+        events per node, type and kind (see evtarrays()). Returns the arrays
+        cnt, first and last of shape (nodes + 1, types, kinds), the last row
+        holding unknown nodes, and the list of type names.
+        '''
+        time, node, etype, kind, types = self.evtarrays()
+        types = list(types)
+        codes = {t: i for i, t in enumerate(types)}
+        for _, t, _ in self.evt_cnt:
+            codes.setdefault(t, len(codes))
+            if len(types) < len(codes):
+                types.append(t)
+
+        rows = len(self.ana.nodes) + 1
+        shape = (rows, len(types), 3)
+        pos = (node.astype(np.int64) % rows * len(types) + etype) * 3 + kind
+        cnt = np.bincount(pos, minlength=rows * len(types) * 3)
+        first = np.full(len(cnt), np.inf)
+        np.minimum.at(first, pos, time)
+        last = np.full(len(cnt), -np.inf)
+        np.maximum.at(last, pos, time)
+
+        if len(self.evt_cnt) > 0:
+            keys = list(self.evt_cnt)
+            vals = list(self.evt_cnt.values())
+            node = self.ana.nodes.idarray([n for n, _, _ in keys]).astype(np.int64)
+            pos = ((node % rows * len(types) + [codes[t] for _, t, _ in keys]) * 3
+                   + [k for _, _, k in keys])
+            np.add.at(cnt, pos, [num for num, _, _ in vals])
+            np.minimum.at(first, pos, [t for _, t, _ in vals])
+            np.maximum.at(last, pos, [t for _, _, t in vals])
+
+        return cnt.reshape(shape), first.reshape(shape), last.reshape(shape), types
 
 
     def finish(self):
-        if len(self.evt) == 0:
+        if len(self.evt) == 0 and len(self.evt_cnt) == 0:
             return
 
+        cnt, first, last, types = self.evttotals()
+        app = np.array([evttypes.category(t) == "app" for t in types], dtype=bool)
         self.ana.t["start"] = self.ana.t["finish"]
         self.ana.t["end"] = self.ana.t["prep"]
-
-        for e in self.evt:
-            if e["type"].find("A_") == 0:
-                if e["time"] < self.ana.t["start"]:
-                    self.ana.t["start"] = e["time"]
-                if e["time"] > self.ana.t["end"]:
-                    self.ana.t["end"] = e["time"]
+        if cnt[:, app].any():
+            self.ana.t["start"] = min(self.ana.t["start"], first[:, app].min().item())
+            self.ana.t["end"] = max(self.ana.t["end"], last[:, app].max().item())
 
         self.ana.t["duration"] = self.ana.t["end"] - self.ana.t["start"]
 
         # count flow events
-        for n in self.ana.desc["used_nodes"]:
-            self.flows_cnt[n] = {
-                "all": 0,
-                "tx": 0,
-                "tx_re": 0,
-                "tx_er": 0,
-                "rx": 0,
-                "ack": 0,
-                "rate_rx": 0,
-                "rate_ack": 0,
-                "tx_dups": 0,
-                "rx_dups": 0,
-                "tx_re_dups": 0,
-                "ack_dups": 0,
-                "drop_tx": 0,
-                "drop_ack": 0,
-                "drop_nc_tx": 0,
-                "drop_nc_ack": 0,
-            }
-        self.flows_cnt["sum"] = {
-            "all": 0,
-            "tx": 0,
-            "tx_re": 0,
-            "tx_er": 0,
-            "rx": 0,
-            "ack": 0,
-            "rate_rx": 0,
-            "rate_ack": 0,
-            "tx_dups": 0,
-            "rx_dups": 0,
-            "tx_re_dups": 0,
-            "ack_dups": 0,
-            "drop_tx": 0,
-            "drop_ack": 0,
-            "drop_nc_tx": 0,
-            "drop_nc_ack": 0,
-            }
-
-        for flow in self.flows:
-            if flow["src"] == None:
-                print("FLOW is broken {}".format(flow))
-                continue
-
-            if len(flow["t_tx"]) > 0 and len(flow["t_rx"]) > 0:
-                flow["lat_rx"] = flow["t_rx"][0] - flow["t_tx"][0]
-            else:
-                flow["lat_rx"] = 0
-            if len(flow["t_tx"]) > 0 and len(flow["t_ack"]) > 0:
-                flow["lat_ack"] = flow["t_ack"][0] - flow["t_tx"][0]
-            else:
-                flow["lat_ack"] = 0
-
-            self.flows_cnt["sum"]["all"] += 1
-            self.flows_cnt[flow["src"]]["all"] += 1
-
-            self.flows_cnt[flow["src"]]["tx_re"] += len(flow["t_tx_re"])
-            self.flows_cnt["sum"]["tx_re"] += len(flow["t_tx_re"])
-            self.flows_cnt[flow["src"]]["tx_er"] += len(flow["t_tx_er"])
-            self.flows_cnt["sum"]["tx_er"] += len(flow["t_tx_er"])
-
-
-            for feat in ["tx", "rx", "ack"]:
-                numof = len(flow["t_{}".format(feat)])
-
-                if feat == "tx" and numof > 1:
-                    print(f'FLOW BROKEN, multiple TX: {self.ana.logfile}')
-
-                if numof > 0:
-                    self.flows_cnt["sum"][feat] += 1
-                    self.flows_cnt[flow["src"]][feat] += 1
-                if numof > 1:
-                    self.flows_cnt["sum"]["{}_dups".format(feat)] += (numof - 1)
-                    self.flows_cnt[flow["src"]]["{}_dups".format(feat)] += (numof - 1)
-            for field in ["drop_tx", "drop_ack", "drop_nc_tx", "drop_nc_ack"]:
-                if len(flow[field]) > 0:
-                    # if len(flow[field]) > 1:
-                    #     self.ana.warn_blocking("flow {}: dropped multiple times {}".format(field, flow))
-
-                    self.flows_cnt["sum"][field] += 1
-                    self.flows_cnt[flow[field][0]["node"]][field] += 1
-
-
-            # if len(flow["drop_tx"]) > 0:
-            #     for drop in flow["drop_tx"]
-            #     self.flows_cnt["sum"]["drop_tx"] += 1
-            #     self.flows_cnt[flow["src"]]["drop_tx"] += 1
-            # if len(flow["drop_ack"]) > 0:
-            #     self.flows_cnt["sum"]["drop_ack"] += 1
-            #     self.flows_cnt[flow["src"]]["drop_ack"] += 1
-            # if len(flow["drop_nc_tx"]) > 0:
-            #     self.flows_cnt["sum"]["drop_nc_tx"] += 1
-            #     self.flows_cnt[flow["src"]]["drop_nc_tx"] += 1
-            # if len(flow["drop_nc_ack"]) > 0:
-            #     self.flows_cnt["sum"]["drop_nc_ack"] += 1
-            #     self.flows_cnt[flow["src"]]["drop_nc_ack"] += 1
+        for n in self.ana.desc["used_nodes"] + ["sum"]:
+            self.flows_cnt[n] = dict(FLOW_CNT)
+
+        flows = self.flows
+        cols = {key: col[:len(flows)] for key, col in flows.cols.items()}
+        self._flowcheck(cols, range(len(flows)))
+
+        used = self.ana.desc["used_nodes"]
+        sel = flows.idarray(used)
+        for key, pn in self._flowcounters(cols).items():
+            folded = self.folded["cnt"].get(key)
+            if folded is not None:
+                pn[:len(folded)] += folded
+            self.flows_cnt["sum"][key] = int(pn.sum())
+            for n, num in zip(used, np.r_[pn, 0][sel].tolist()):
+                self.flows_cnt[n][key] = num
 
         self.flows_cnt["sum"]["rate_rx"] = self.flows_cnt["sum"]["rx"] / self.flows_cnt["sum"]["tx"] * 100.0
         self.flows_cnt["sum"]["rate_ack"] = self.flows_cnt["sum"]["ack"] / self.flows_cnt["sum"]["tx"] * 100.0
@@ -398,44 +681,120 @@ class Expstats:
                 self.flows_cnt[n]["rate_ack"] = self.flows_cnt[n]["ack"] / self.flows_cnt[n]["tx"] * 100.0
 
 
-    def summary(self):
-        stats = {n: {} for n in self.ana.desc["used_nodes"]}
-        stats["sum"] = {}
-        # stats[node][type] = ['sum', 'data_traffic', 'ctrl_traffic', 'data_req', 'data_resp']
-
-        for n in stats:
-            for t in  ["A_RX", "A_TX", "A_TX_RE", "A_ACK", "A_TX_ER",
-                       "N_RX", "N_TX", "N_TX_NC", "N_TX_A", "I_D", "C_RXER", "N_RX_NPB"]:
-                stats[n][t] = [0, 0, 0, 0, 0]
-        for evt in self.evt:
-            if evt["type"] not in stats["sum"]:
-                for n in stats:
-                    stats[n][evt["type"]] = [0, 0, 0, 0, 0]
-
-            addto = [0]
-            if evt["seq"] != None:
-                addto.append(1)
-                if ">" in evt["seq"]:
-                    addto.append(3)
-                else:
-                    addto.append(4)
+    def _flowcheck(self, cols, rows):
+        # report broken flows and compute the latencies of the given flows
+        valid = cols["src"] >= 0
+        n_tx = cols["n_t_tx"]
+        multi = valid & (n_tx > 1)
+        for i in np.flatnonzero(~valid | multi).tolist():
+            if valid[i]:
+                print(f'FLOW BROKEN, multiple TX: {self.ana.logfile}')
             else:
-                addto.append(2)
+                print("FLOW is broken {}".format(self.flows[rows[i]]))
+
+        for lat, t_to in (("lat_rx", "t_rx"), ("lat_ack", "t_ack")):
+            done = (n_tx > 0) & (cols[f'n_{t_to}'] > 0)
+            cols[lat][:] = np.where(valid, np.where(done, cols[t_to] - cols["t_tx"], 0.0), np.nan)
+
+
+    def _flowcounters(self, cols):
+        # sum up the per flow counters by source node (or dropping node), as
+        # arrays over the node ids of the flow table
+        src = cols["src"]
+        valid = src >= 0
+        counters = {
+            "all": (src, valid),
+            "tx_re": (src, np.where(valid, cols["n_t_tx_re"], 0)),
+            "tx_er": (src, np.where(valid, cols["n_t_tx_er"], 0)),
+        }
+        for feat in ["tx", "rx", "ack"]:
+            cnt = cols[f'n_t_{feat}']
+            counters[feat] = (src, valid & (cnt > 0))
+            counters[f'{feat}_dups'] = (src, np.where(valid & (cnt > 1), cnt - 1, 0))
+        for field in ["drop_tx", "drop_ack", "drop_nc_tx", "drop_nc_ack"]:
+            counters[field] = (cols[f'{field}_node'], valid & (cols[f'n_{field}'] > 0))
+
+        res = {}
+        for key, (nodes, weights) in counters.items():
+            sel = nodes >= 0
+            res[key] = np.bincount(nodes[sel], weights=weights[sel],
+                                   minlength=len(self.flows.names)).astype(np.int64)
+        return res
+
+
+    def _flowgaps(self, cols, gaps):
+        # add the sequence numbers and send times of the given flows to `gaps`
+        names = np.array(self.flows.names + [None], dtype=object)
+        gaps.add(cols["prod"], cols["seqno"], names[cols["src"]], cols["t_tx"],
+                 cols["n_t_tx"] > 0, cols["n_t_tx_er"] > 0, cols["n_t_rx"] > 0)
+
+
+    def seqgaps(self):
+        '''
+        Get the Seqgaps of all flows, folded or not
+        '''
+        gaps = Seqgaps(self.folded["gaps"].itvl)
+        gaps.merge(self.folded["gaps"])
+        self._flowgaps({key: col[:len(self.flows)] for key, col in self.flows.cols.items()}, gaps)
+        return gaps
+
+
+    def fold(self, now):
+        '''
+        Fold the flows first seen more than `horizon` seconds before `now`
+        into the per node counters and latency aggregates that finish() and
+        stats() report, and remove them from the flow table. Flows first seen
+        within the first horizon are kept, as they may continue flows of a
+        preceding chunk of the log.
+        '''
+        flows = self.flows
+        t_new = flows.cols["t_new"][:len(flows)]
+        mask = (t_new < now - self.horizon) & (t_new >= self._t0 + self.horizon)
+        if mask.any():
+            rows = np.flatnonzero(mask)
+            cols = {key: col[:len(flows)][mask] for key, col in flows.cols.items()}
+            self._flowcheck(cols, rows.tolist())
+            self._foldmerge({"cnt": self._flowcounters(cols),
+                             "nosrc": int((cols["src"] < 0).sum()),
+                             "lat": Latsketch(),
+                             "lat_sum": Fraction(0),
+                             "gaps": Seqgaps()}, flows.names)
+            self._flowgaps(cols, self.folded["gaps"])
+            lat = cols["lat_ack"][cols["lat_ack"] > 0]
+            self.folded["lat"].add(lat)
+            self.folded["lat_sum"] += sum(map(Fraction, lat.tolist()), Fraction(0))
+            flows.evict(mask)
+        self._foldmark = len(flows) + max(CAPACITY, len(flows))
 
-            for i in addto:
-                stats["sum"][evt["type"]][i] += 1
-                stats[evt["node"]][evt["type"]][i] += 1
 
+    def summary(self):
+        # count events per node, type and traffic class:
+        # [all, data traffic, ctrl traffic, data requests, data responses]
+        totals, _, last, types = self.evttotals()
+        names = sorted(set(types) | {"A_RX", "A_TX", "A_TX_RE", "A_ACK", "A_TX_ER",
+                                     "N_RX", "N_TX", "N_TX_NC", "N_TX_A", "I_D", "C_RXER", "N_RX_NPB"})
+        num = len(self.ana.nodes) + 1       # last row holds the sum
+        cnt = np.zeros((num, len(names), 5), dtype=np.int64)
+        code = [names.index(t) for t in types]
+        for i, kinds in enumerate(([0, 1, 2], [1, 2], [0], [1], [2])):
+            sel = totals[:, :, kinds].sum(axis=2)
+            cnt[:-1, code, i] = sel[:-1]
+            cnt[-1, code, i] = sel.sum(axis=0)
+
+        stats = {}
+        for n in self.ana.desc["used_nodes"] + ["sum"]:
+            row = cnt[-1 if n == "sum" else self.ana.nodes.id(n)].tolist()
+            stats[n] = {t: row[i] for i, t in enumerate(names)}
 
         self.ana.statwrite("Expstats summary:")
         self.ana.statwrite("Experiement timestamps: {}".format(self.ana.t))
         self.ana.statwrite("Experiement duration: {}s".format(self.ana.t["duration"]))
 
         self.ana.statwrite("\nExpstats: Summary of last link layer packet sent per node:")
-        last = {n: 0.0 for n in self.ana.desc["used_nodes"]}
-        for evt in self.evt:
-            if evt["type"] == "N_TX" and evt["time"] > last[evt["node"]]:
-                last[evt["node"]] = evt["time"]
+        last_tx = np.zeros(num - 1)
+        if "N_TX" in types:
+            last_tx = np.maximum(last_tx, last[:-1, types.index("N_TX")].max(axis=1))
+        last = {n: last_tx[self.ana.nodes.id(n)].item() for n in self.ana.desc["used_nodes"]}
         for n in self.ana.nsort(last):
             self.ana.statwrite("{:>13}  n_tx:{} ({})".format(n, last[n] - self.ana.t["start"], last[n]))
 
@@ -583,23 +942,9 @@ class Expstats:
 
 
         self.ana.statwrite("\nExpstats summary of flows:")
-        unack = []
-        incomp = []
-        drops = []
-        dups = []
-        for flow in self.flows:
-            if flow["dst"] == None:
-                incomp.append(flow)
-            if flow["ack"] == None:
-                unack.append(flow)
-            if len(flow["t_tx"]) > 1 or len(flow["t_rx"]) > 1 or len(flow["t_ack"]) > 1:
-                dups.append(flow)
-            if len(flow["drop_tx"]) > 0 or len(flow["drop_ack"]) > 0:
-                drops.append(flow)
-
-            if flow["src"] == None:
-                self.ana.statwrite("Warning: flow summary: flow without a SRC node")
-                continue
+        nosrc = int((self.flows.cols["src"][:len(self.flows)] < 0).sum()) + self.folded["nosrc"]
+        for _ in range(nosrc):
+            self.ana.statwrite("Warning: flow summary: flow without a SRC node")
 
         self.ana.statwrite("{:>13}  {:>6} {:>6} {:>6} {:>6} {:>6}  {:>7}  {:>7}  {:>6} {:>6} {:>6} {:>7} {:>8} {:>10} {:>11}".format(
               "node", "tx", "tx_re", "tx_er", "rx", "ack", "rate_rx", "rate_ack",
@@ -613,6 +958,28 @@ class Expstats:
                   self.flows_cnt[n]["drop_tx"], self.flows_cnt[n]["drop_ack"],
                   self.flows_cnt[n]["drop_nc_tx"], self.flows_cnt[n]["drop_nc_ack"]))
 
+        self.ana.statwrite("\nExpstats: sequence gaps per producer (stalls: send interval > {}x itvl)".format(STALL_FACTOR))
+        self.ana.statwrite("{:>13}  {:>4} {:>6} {:>7} {:>6} {:>6} {:>8} {:>8} {:>8} {:>7}".format(
+              "node", "id", "sent", "missing", "err", "lost", "itvl", "jit_avg", "jit_std", "stalls"))
+        report = self.seqgaps().report(self.ana.t["start"])
+        for prod, rep in report.items():
+            # jitter is n/a without send intervals or a configured interval
+            jit = rep["jitter"] or {"itvl": None, "mean": None, "std": None}
+            fmt = lambda val, prec: "n/a" if val is None else f'{val:.{prec}f}'
+            self.ana.statwrite("{:>13}: {:>4} {:>6} {:>7} {:>6} {:>6} {:>8} {:>8} {:>8} {:>7}".format(
+                  str(rep["node"]), prod, rep["sent"],
+                  sum(b - a + 1 for a, b in rep["missing"]),
+                  sum(b - a + 1 for a, b in rep["err"]),
+                  sum(b - a + 1 for a, b in rep["lost"]),
+                  fmt(jit["itvl"], 1), fmt(jit["mean"], 2), fmt(jit["std"], 2),
+                  len(rep["stalls"])))
+        for prod, rep in report.items():
+            if len(rep["missing"]) > 0:
+                self.ana.statwrite("{:>13}  missing seq: {}".format(str(rep["node"]), rep["missing"]))
+            for begin, end in rep["stalls"]:
+                self.ana.statwrite("{:>13}  stalled: {:.3f}s - {:.3f}s ({:.3f}s)".format(
+                      str(rep["node"]), begin, end, end - begin))
+
         # self.ana.statwrite("Flows - Duplicated packets")
         # for flow in dups:
         #     print("seq:{} src:{} dst:{} ack:{}".format(flow["seq"], flow["src"], flow["dst"], flow["ack"]))
@@ -647,16 +1014,24 @@ class Expstats:
 
     def stats(self):
 
-        tmp = []
-        for flow in self.flows:
-            if flow["lat_ack"] > 0:
-                tmp.append(flow["lat_ack"])
+        lat = self.flows.cols["lat_ack"][:len(self.flows)]
+        tmp = lat[lat > 0].tolist()
+
+        sketch = Latsketch()
+        sketch.add(tmp)
+        if self.folded["lat"].cnt == 0:
+            avg, low, high = statistics.mean(tmp), min(tmp), max(tmp)
+        else:
+            # as statistics.mean(), from the exact sum of all latencies
+            sketch.merge(self.folded["lat"])
+            total = self.folded["lat_sum"] + sum(map(Fraction, tmp), Fraction(0))
+            avg, low, high = float(total / sketch.cnt), sketch.min, sketch.max
 
         stats = {
-            "latency_avg": statistics.mean(tmp),
-            "latency_min": min(tmp),
-            "latency_max": max(tmp),
-            "latency_all": tmp,
+            "latency_avg": avg,
+            "latency_min": low,
+            "latency_max": high,
+            "latency_sketch": sketch.todict(),
         }
 
         return stats
@@ -731,25 +1106,16 @@ class Expstats:
 
 
     def plot_stats(self, types, nodes=None, binsize=90, timespan=None):
+        self.needevents("plot_stats")
         cfg = self.ana.plotsetup(nodes, binsize, timespan)
-        curbin = cfg["first"]
-
-        cnt = {t: [] for t in types}
-        ticks = []
-        for evt in self.evt:
-            if self.ana.plotter.filter(cfg, evt["node"], evt["time"]):
-                continue
+        edges, bins = self._plotbins("evt", cfg)
+        names = self.evtarrays()[4]
 
-            if evt["time"] >= curbin:
-                ticks.append("{:.0f}".format(self.ana.t_norm(curbin + cfg["binsize"])))
-                for t in cnt:
-                    cnt[t].append(0)
-                curbin += cfg["binsize"]
+        ticks = ["{:.0f}".format(self.ana.t_norm(t)) for t in edges[1:]]
+        cnt = bins["cnt"].sum(axis=0)
+        y = [cnt[names.index(t)].tolist() if t in names else [0] * len(ticks) for t in types]
 
-            if evt["type"] in types:
-                cnt[evt["type"]][-1] += 1
-
-        data = {"x": ticks, "y": [cnt[t] for t in types], "label": types}
+        data = {"x": ticks, "y": y, "label": types}
         suffix = "-".join([a[1:] for a in types]).lower()
 
         info = {"title": "Accumulated # of Events",
@@ -766,25 +1132,16 @@ class Expstats:
 
 
     def plot_stats_pn(self, types, nodes=None, binsize=90, timespan=None):
+        self.needevents("plot_stats_pn")
         cfg = self.ana.plotsetup(nodes, binsize, timespan)
-        curbin = cfg["first"]
-
-        cnt = {n: {t: [] for t in types} for n in cfg["nodes"]}
-        ticks = []
+        edges, bins = self._plotbins("evt", cfg)
+        names = self.evtarrays()[4]
 
-        for evt in self.evt:
-            if self.ana.plotter.filter(cfg, evt["node"], evt["time"]):
-                continue
-
-            if evt["time"] >= curbin:
-                ticks.append("{:.0f}".format(self.ana.t_norm(curbin + cfg["binsize"])))
-                for n in cnt:
-                    for t in cnt[n]:
-                        cnt[n][t].append(0)
-                curbin += cfg["binsize"]
-
-            if evt["type"] in types:
-                cnt[evt["node"]][evt["type"]][-1] += 1
+        ticks = ["{:.0f}".format(self.ana.t_norm(t)) for t in edges[1:]]
+        cnt = {}
+        for i, n in enumerate(cfg["nodes"]):
+            cnt[n] = {t: bins["cnt"][i][names.index(t)].tolist() if t in names else [0] * len(ticks)
+                      for t in types}
 
         data = []
         for n in self.ana.nsort(cnt):
@@ -806,34 +1163,22 @@ class Expstats:
 
 
     def get_flow_pdr(self, rels, nodes=None, binsize=5.0, timespan=None, ylim=[0.5, 1.01]):
+        self.needflows("get_flow_pdr")
         cfg = self.ana.plotsetup(nodes, binsize, timespan)
 
-        lines = []
-        for rel in rels:
-            lines.append({"x": [], "y": [], "label": rel[1]})
+        for row in np.flatnonzero(self.flows.cols["n_t_tx"][:len(self.flows)] == 0).tolist():
+            print("Warning: currupt flow: {}".format(self.flows[row]))
 
-        curbin = [cfg["first"] for _ in range(len(rels))]
-        cnt = [[0, 0] for _ in range(len(rels))]
-        for flow in self.flows:
-            if len(flow["t_tx"]) == 0:
-                print("Warning: currupt flow: {}".format(flow))
-                continue
-            if self.ana.plotter.filter(cfg, flow["src"], flow["t_tx"][0]):
-                continue
-
-            for i, rel in enumerate(rels):
-                if flow["t_tx"][0] >= (curbin[i] + cfg["binsize"]):
-                    lines[i]["x"].append(self.ana.t_norm(curbin[i]))
-                    lines[i]["y"].append(cnt[i][1] / cnt[i][0])
-                    cnt[i] = [0, 0]
-                    curbin[i] += cfg["binsize"]
-                cnt[i][0] += 1
-                cnt[i][1] += 1 if len(flow[rel[0]]) > 0 else 0
+        edges, bins = self._plotbins("flows", cfg)
+        cnt = bins["cnt"].sum(axis=0).tolist()
+        used = [i for i, c in enumerate(cnt[0]) if c > 0]
 
-        for i, rel in enumerate(rels):
-            if cnt[i][0] > 0:
-                lines[i]["x"].append(self.ana.t_norm(curbin[i]))
-                lines[i]["y"].append(cnt[i][1] / cnt[i][0])
+        lines = []
+        for rel in rels:
+            rx = cnt[TIMES.index(rel[0]) + 1]
+            lines.append({"x": [self.ana.t_norm(edges[i]) for i in used],
+                          "y": [rx[i] / cnt[0][i] for i in used],
+                          "label": rel[1]})
 
         return lines, cfg;
 
@@ -865,31 +1210,18 @@ class Expstats:
 
 
     def plot_flow_pdr_pn(self, rel, nodes=None, binsize=5.0, timespan=None, ylim=[0.0, 15.05]):
+        self.needflows("plot_flow_pdr_pn")
         cfg = self.ana.plotsetup(nodes, binsize, timespan)
 
-        data = {n: {"x": [], "y": [], "label": f'{n}'} for n in cfg["nodes"]}
+        edges, bins = self._plotbins("flows", cfg)
+        chan = TIMES.index(rel) + 1
 
-        curbin = cfg["first"]
-        cnt = {n: [0, 0] for n in cfg["nodes"]}
-        for flow in self.flows:
-            if self.ana.plotter.filter(cfg, flow["src"], flow["t_tx"][0]):
-                continue
-
-            if (flow["t_tx"][0] >= curbin + cfg["binsize"]):
-                for n in cnt:
-                    if cnt[n][0] > 0:
-                        data[n]["x"].append(self.ana.t_norm(curbin))
-                        data[n]["y"].append(cnt[n][1] / cnt[n][0])
-                    cnt[n] = [0, 0]
-                curbin += cfg["binsize"]
-            cnt[flow["src"]][0] += 1
-            if len(flow[rel]) > 0:
-                cnt[flow["src"]][1] += 1
-
-        for n in cnt:
-            if cnt[n][0] > 0:
-                data[n]["x"].append(self.ana.t_norm(curbin))
-                data[n]["y"].append(cnt[n][1] / cnt[n][0])
+        data = {}
+        for n, cnt in zip(cfg["nodes"], bins["cnt"].tolist()):
+            used = [i for i, c in enumerate(cnt[0]) if c > 0]
+            data[n] = {"x": [self.ana.t_norm(edges[i]) for i in used],
+                       "y": [cnt[chan][i] / cnt[0][i] for i in used],
+                       "label": f'{n}'}
 
         lines = []
         for i, n in enumerate(self.ana.nsort(data)):
@@ -918,6 +1250,7 @@ class Expstats:
 
 
     def plot_cdf(self, nodes=None, timespan=None, xlim=None):
+        self.needflows("plot_cdf")
         cfg = self.ana.plotsetup(nodes, None, timespan)
 
         data_rx = {"x": [0.0], "y": [0.0], "label": "Packets Received"}
@@ -925,12 +1258,11 @@ class Expstats:
         ttc_rx = []
         ttc_ack = []
 
-        for flow in self.flows:
+        for row in self.flows.timeindex().positions(cfg["nodes"]):
+            flow = self.flows[row]
             if len(flow["t_tx"]) == 0:
                 print("Warning: CDF: currupt flow: {}".format(flow))
                 continue
-            if self.ana.plotter.filter(cfg, flow["src"], None):
-                continue
 
             if len(flow["t_rx"]) > 0:
                 if flow["t_rx"][0] < flow["t_tx"][0]:
@@ -967,6 +1299,7 @@ class Expstats:
 
 
     def plot_cdf_pn(self, nodes=None, styles=None, stat="ack", xlim=None):
+        self.needflows("plot_cdf_pn")
         if not nodes:
             nodes = self.ana.desc["used_nodes"]
 
@@ -978,14 +1311,14 @@ class Expstats:
         for n in nodes:
             ttc[n] = []
 
-        for flow in self.flows:
-            if flow["src"] in nodes:
-                if len(flow["t_tx"]) == 0:
-                    print("Warning: CDF: currupt flow: {}".format(flow))
-                    continue
-                if len(flow[fstat]) > 0:
-                    diff = flow[fstat][0] - flow["t_tx"][0]
-                    ttc[flow["src"]].append(diff)
+        for row in self.flows.timeindex().positions(nodes):
+            flow = self.flows[row]
+            if len(flow["t_tx"]) == 0:
+                print("Warning: CDF: currupt flow: {}".format(flow))
+                continue
+            if len(flow[fstat]) > 0:
+                diff = flow[fstat][0] - flow["t_tx"][0]
+                ttc[flow["src"]].append(diff)
 
         for i, n in enumerate(nodes):
             if styles:
@@ -1013,6 +1346,7 @@ class Expstats:
 
 
     def plot_delay_heatmap(self, stat="ack", nodes=None, excl_nodes=None, range=None, binsize=60, aggr="avg"):
+        self.needflows("plot_delay_heatmap")
         to = "t_{}".format(stat)
         if not nodes:
             nodes = self.ana.desc["used_nodes"]
@@ -1020,41 +1354,28 @@ class Expstats:
             nodes = [n for n in nodes if n not in excl_nodes]
 
 
-        curbin = self.flows[0]["t_tx"][0] + binsize
-
-        pn = {n: [[]] for n in nodes}
-        for flow in self.flows:
-            if len(flow["t_tx"]) == 0:
-                print("Warning: Delay: corrupt flow: {}".format(flow))
-                continue
-
-            if flow["src"] not in nodes:
-                continue
-
-            if flow["t_tx"][0] > curbin:
-                curbin += binsize
-                for n in pn:
-                    pn[n].append([])
-
-            if len(flow[to]) > 0:
-                pn[flow["src"]][-1].append(flow[to][0] - flow["t_tx"][0])
-
-        yticklab = []
-        data = []
-        for n in self.ana.nsort(pn):
-            row = []
-            for delays in pn[n]:
-                if len(delays) > 0:
-                    if aggr == "min":
-                        row.append(min(delays) * 1000)
-                    elif aggr == "max":
-                        row.append(max(delays) * 1000)
-                    else:
-                        row.append(sum(delays) / len(delays) * 1000)
-                else:
-                    row.append(-1.0)
-            data.append(row)
-            yticklab.append("{}".format(n))
+        flows = self.flows
+        for row in np.flatnonzero(flows.cols["n_t_tx"][:len(flows)] == 0).tolist():
+            print("Warning: Delay: corrupt flow: {}".format(flows[row]))
+
+        # bins start at the experiment start, or full binsizes before the first TX
+        t_tx = flows.cols["t_tx"][:len(flows)]
+        cfg = {"nodes": self.ana.nsort(nodes), "binsize": binsize,
+               "first": self.ana.t["start"], "last": np.nanmax(t_tx, initial=-np.inf)}
+        if np.nanmin(t_tx, initial=np.inf) < cfg["first"]:
+            cfg["first"] -= math.ceil((cfg["first"] - np.nanmin(t_tx)) / binsize) * binsize
+        _, bins = self._plotbins("flows", cfg)
+
+        chan = TIMES.index(to) + 1
+        cnt = bins["cnt"][:, chan, :]
+        if aggr == "min":
+            delays = bins["min"][:, chan, :] * 1000
+        elif aggr == "max":
+            delays = bins["max"][:, chan, :] * 1000
+        else:
+            delays = bins["sum"][:, chan, :] / np.maximum(cnt, 1) * 1000
+        data = np.where(cnt > 0, delays, -1.0).tolist()
+        yticklab = ["{}".format(n) for n in cfg["nodes"]]
 
         # calc xticks
         xticks = np.arange(0, len(data[0]) + 1, 600 / binsize).tolist()
@@ -1076,6 +1397,7 @@ class Expstats:
 
 
     def plot_latency_box(self, stat="ack", nodes=None, ylim=0):
+        self.needflows("plot_latency_box")
         tim = "t_{}".format(stat)
         cfg = self.ana.plotsetup(nodes, None, None)
 
@@ -1103,17 +1425,15 @@ class Expstats:
 
 
     def plot_evtcnt_boxes_pn(self, types, nodes=None, binsize=None, timespan=None, fulltime=False, ylim=None):
+        self.needevents("plot_evtcnt_boxes_pn")
         if not nodes or nodes != "sum":
             nodes = self.ana.desc["used_nodes"]
 
         cfg = self._bininit2(binsize, timespan, fulltime, maxbins=400)
 
         pn = {n: {t: [] for t in types} for n in nodes}
-        for e in self.evt:
-            if (e["node"] not in nodes or
-                e["type"] not in types or
-                e["time"] < cfg["first"] or
-                e["time"] > cfg["last"]):
+        for e in self.ana.select(self.evt, nodes, cfg["first"], cfg["last"]):
+            if e["type"] not in types:
                 continue
 
             pn[e["node"]][e["type"]].append(e["time"] - self.ana.t["start"])
@@ -1158,9 +1478,7 @@ class Expstats:
         data = []
         of_pn = {n: [{"time": cfg["first"], "of": 0}] for n in cfg["nodes"]}
 
-        for of_evt in self.of_evt:
-            if self.ana.plotter.filter(cfg, of_evt["node"], of_evt["time"]):
-                continue
+        for of_evt in self.ana.select(self.of_evt, cfg["nodes"], cfg["first"], cfg["last"]):
             of_pn[of_evt["node"]].append(of_evt)
 
         for n in of_pn:
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+import re
+import numpy as np
+from tools.exputil.timeindex import Timeindex
+from tools.exputil.noderegistry import idarray
+
+TIMES = ["t_tx", "t_tx_er", "t_tx_re", "t_rx", "t_ack"]
+DROPS = ["drop_tx", "drop_ack", "drop_nc_tx", "drop_nc_ack"]
+NODES = ["src", "dst", "ack"]
+LATS = ["lat_rx", "lat_ack"]
+
+# columns holding node ids
+NODECOLS = NODES + [f'{key}0' for key in NODES] + [f'{key}_node' for key in DROPS]
+
+# key order of the dict representation of a flow, see Flowtable.todict()
+KEYS = ["seq", "src", "dst", "ack", "path", "events"] + TIMES + DROPS
+
+CAPACITY = 1024
+
+RE_SEQ = re.compile(r'(\d+)([<>])(\d+)')
+RE_FLOWSEQ = re.compile(r'(\d+)-(\d+)')
+
+
+def parseseq(seq):
+    '''
+    Split the sequence number of a flow event, e.g. '3>0042', into the
+    producer id and seq no (as given in the log) and whether it belongs to the
+    request. None if the sequence number is malformed.
+    '''
+    m = RE_SEQ.fullmatch(seq)
+    if m is None:
+        return None
+    return m.group(1), m.group(3), m.group(2) == ">"
+
+
+class Flow:
+    '''
+    Dict like view on a single row of a Flowtable
+    '''
+
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+
+    def __getitem__(self, key):
+        return self.table.get(self.row, key)
+
+
+    def __setitem__(self, key, val):
+        self.table.set(self.row, key, val)
+
+
+    def __repr__(self):
+        return repr(self.table.todict(self.row))
+
+
+class Flowtable:
+    '''
+    Compact store for the CoAP flows of an experiment.
+
+    A flow is identified by the 'a>bbb' (request) and 'a<bbb' (response)
+    sequence numbers of its events, with `a` being the producer id and `bbb`
+    the sequence number. Flows are kept as rows of preallocated numpy columns:
+    producer id and sequence number together with their number of digits in
+    the log, src/dst/ack nodes (as ids into `names`), the time the flow was
+    first seen (t_new), the first timestamp and the number of each kind of
+    event (TIMES) and the first of each kind of drop (DROPS). Any further
+    timestamps or drops of a flow are rare and live in the `extra` side table,
+    keyed by (row, key).
+
+    The events and the path of a flow are not stored, they are taken from the
+    owners event list if needed (see groups()). Iterating the table yields
+    Flow views, which behave like the flow dicts used before.
+    '''
+
+    def __init__(self, owner, names=()):
+        self.owner = owner      # object holding the event list `evt`
+        self.num = 0
+        self.index = {}         # (producer id << 32 | seq no) -> row
+        self.names = []         # node id -> node name
+        self.ids = {}           # node name -> node id
+        self.extra = {}         # (row, key) -> list of further values
+        self._groups = None     # (key, events per row), see groups()
+        for name in names:
+            self.node_id(name)
+
+        self.cols = {}
+        self._alloc(CAPACITY)
+
+
+    def _alloc(self, size):
+        cols = {
+            "prod": np.zeros(size, dtype=np.uint32),
+            "seqno": np.zeros(size, dtype=np.uint32),
+            # digits of the producer id and sequence number, to print them
+            # as given in the log
+            "prod_w": np.zeros(size, dtype=np.uint8),
+            "seqno_w": np.zeros(size, dtype=np.uint8),
+            "t_new": np.full(size, np.nan),
+        }
+        for key in NODES:
+            cols[key] = np.full(size, -1, dtype=np.int32)
+            cols[f'{key}0'] = np.full(size, -1, dtype=np.int32)
+        for key in TIMES:
+            cols[key] = np.full(size, np.nan)
+            cols[f'n_{key}'] = np.zeros(size, dtype=np.int32)
+        for key in DROPS:
+            cols[f'{key}_node'] = np.full(size, -1, dtype=np.int32)
+            cols[f'{key}_time'] = np.full(size, np.nan)
+            cols[f'n_{key}'] = np.zeros(size, dtype=np.int32)
+        for key in LATS:
+            cols[key] = np.full(size, np.nan)
+        self.fills = {key: col[0] for key, col in cols.items()}
+
+        for key, col in self.cols.items():
+            cols[key][:self.num] = col[:self.num]
+        self.cols = cols
+        # shortcuts for the per event path
+        for key, col in cols.items():
+            setattr(self, key, col)
+
+
+    def __len__(self):
+        return self.num
+
+
+    def __iter__(self):
+        for row in range(self.num):
+            yield Flow(self, row)
+
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self.num
+        if not 0 <= row < self.num:
+            raise IndexError("flow index out of range")
+        return Flow(self, row)
+
+
+    def node_id(self, name):
+        node_id = self.ids.get(name)
+        if node_id is None:
+            node_id = len(self.names)
+            self.ids[name] = node_id
+            self.names.append(name)
+        return node_id
+
+
+    def node_name(self, node_id):
+        return None if node_id < 0 else self.names[node_id]
+
+
+    def idarray(self, names, missing=-1):
+        return idarray(self.ids, names, missing)
+
+
+    def row(self, prod, seqno, time=np.nan, digits=(0, 0)):
+        '''
+        Get the row of the given flow, adding it if it is not known yet.
+        `digits` are the number of digits of `prod` and `seqno` in the log.
+        '''
+        key = (prod << 32) | seqno
+        row = self.index.get(key)
+        if row is None:
+            row = self.num
+            if row == len(self.prod):
+                self._alloc(2 * row)
+            self.prod[row] = prod
+            self.seqno[row] = seqno
+            self.prod_w[row], self.seqno_w[row] = digits
+            self.t_new[row] = time
+            self.index[key] = row
+            self.num += 1
+        return row
+
+
+    def evict(self, mask):
+        '''
+        Remove the flows selected by `mask`, the remaining flows keep their order
+        '''
+        keep = np.flatnonzero(~mask[:self.num])
+        rows = np.full(self.num, -1, dtype=np.int64)
+        rows[keep] = np.arange(len(keep))
+        for key, col in self.cols.items():
+            col[:len(keep)] = col[keep]
+            col[len(keep):self.num] = self.fills[key]
+
+        self.extra = {(int(rows[row]), key): vals for (row, key), vals in self.extra.items()
+                      if rows[row] >= 0}
+        self.index = {key: int(rows[row]) for key, row in self.index.items() if rows[row] >= 0}
+        self.num = len(keep)
+        self._groups = None
+
+
+    def timeindex(self):
+        '''
+        Time index of the flows by source node and first t_tx
+        '''
+        names = np.array(self.names + [None], dtype=object)
+        return Timeindex(names[self.src[:self.num]], self.t_tx[:self.num])
+
+
+    def seq(self, row):
+        return f'{self.prod[row]:0{self.prod_w[row]}d}-{self.seqno[row]:0{self.seqno_w[row]}d}'
+
+
+    def setnode(self, row, key, node_id):
+        '''
+        Set the src/dst/ack node of a flow, returns the previous one
+        '''
+        col = self.cols[key]
+        prev = col[row]
+        col[row] = node_id
+        first = self.cols[f'{key}0']
+        if first[row] < 0:
+            first[row] = node_id
+        return prev
+
+
+    def addtime(self, row, key, time):
+        cnt = self.cols[f'n_{key}']
+        if cnt[row] == 0:
+            self.cols[key][row] = time
+        else:
+            self.extra.setdefault((row, key), []).append(time)
+        cnt[row] += 1
+
+
+    def adddrop(self, row, key, node_id, time):
+        cnt = self.cols[f'n_{key}']
+        if cnt[row] == 0:
+            self.cols[f'{key}_node'][row] = node_id
+            self.cols[f'{key}_time'][row] = time
+        else:
+            self.extra.setdefault((row, key), []).append((node_id, time))
+        cnt[row] += 1
+
+
+    def times(self, row, key):
+        if self.cols[f'n_{key}'][row] == 0:
+            return []
+        return [self.cols[key][row].item()] + self.extra.get((row, key), [])
+
+
+    def drops(self, row, key):
+        if self.cols[f'n_{key}'][row] == 0:
+            return []
+        drops = [(int(self.cols[f'{key}_node'][row]), self.cols[f'{key}_time'][row].item())]
+        drops += self.extra.get((row, key), [])
+        return [{"node": self.names[n], "time": t} for n, t in drops]
+
+
+    def get(self, row, key):
+        if key in TIMES:
+            return self.times(row, key)
+        if key in NODES:
+            return self.node_name(self.cols[key][row])
+        if key in DROPS:
+            return self.drops(row, key)
+        if key in LATS:
+            lat = self.cols[key][row]
+            if np.isnan(lat):
+                raise KeyError(key)
+            return lat.item()
+        if key == "seq":
+            return self.seq(row)
+        if key == "events":
+            return self.events(row)
+        if key == "path":
+            return self.path(self.events(row))
+        raise KeyError(key)
+
+
+    def set(self, row, key, val):
+        if key not in LATS:
+            raise KeyError(key)
+        self.cols[key][row] = val
+
+
+    def _evtrow(self, evt):
+        seq = parseseq(evt["seq"])
+        if seq is None:
+            return None
+        return self.index.get((int(seq[0]) << 32) | int(seq[1]))
+
+
+    def groups(self):
+        '''
+        Get the events of each flow, grouped in a single pass over the owners
+        event list. The groups are kept until the events or flows change.
+        '''
+        evt = self.owner.evt
+        key = (id(evt), len(evt), self.num)
+        if self._groups is None or self._groups[0] != key:
+            groups = [[] for _ in range(self.num)]
+            for e in evt:
+                if e["seq"] != None:
+                    row = self._evtrow(e)
+                    if row is not None:
+                        groups[row].append(e)
+            self._groups = (key, groups)
+        return self._groups[1]
+
+
+    def events(self, row):
+        return self.groups()[row]
+
+
+    def path(self, events):
+        path = []
+        for evt in events:
+            if len(path) == 0 or path[-1] != evt["node"]:
+                path.append(evt["node"])
+        return path
+
+
+    def todict(self, row, events=None):
+        if events is None:
+            events = self.events(row)
+        flow = {}
+        for key in KEYS:
+            if key == "events":
+                flow[key] = events
+            elif key == "path":
+                flow[key] = self.path(events)
+            else:
+                flow[key] = self.get(row, key)
+        for key in LATS:
+            if not np.isnan(self.cols[key][row]):
+                flow[key] = self.cols[key][row].item()
+        return flow
+
+
+    def todicts(self):
+        '''
+        Get all flows as list of dicts
+        '''
+        events = self.groups()
+        return [self.todict(row, events[row]) for row in range(self.num)]
+
+
+    def fromdict(self, flow):
+        '''
+        Add a flow given in its dict representation
+        '''
+        m = RE_FLOWSEQ.fullmatch(flow["seq"])
+        if m is None:
+            print("Warning: skipping flow with malformed seq: {}".format(flow["seq"]))
+            return
+        prod, seqno = m.groups()
+        row = self.row(int(prod), int(seqno), digits=(len(prod), len(seqno)))
+        for key in NODES:
+            if flow[key] != None:
+                self.setnode(row, key, self.node_id(flow[key]))
+        for key in TIMES:
+            for time in flow[key]:
+                self.addtime(row, key, time)
+        for key in DROPS:
+            for drop in flow[key]:
+                self.adddrop(row, key, self.node_id(drop["node"]), drop["time"])
+        for key in LATS:
+            if key in flow:
+                self.set(row, key, flow[key])
+
+
+    def getstate(self):
+        return {
+            "cols": {key: col[:self.num] for key, col in self.cols.items()},
+            "names": self.names,
+            "extra": self.extra,
+        }
+
+
+    def merge(self, state, stitch):
+        '''
+        Append the flows of a table given by getstate(). Flows already known
+        are passed to stitch(row, other, ids) and then merged into their row.
+        '''
+        cols = state["cols"]
+        ids = np.array([self.node_id(n) for n in state["names"]] + [-1], dtype=np.int32)
+        num = len(cols["prod"])
+        keys = (cols["prod"].astype(np.uint64) << np.uint64(32)) | cols["seqno"]
+
+        rows = np.full(num, -1, dtype=np.int64)
+        for i, key in enumerate(keys.tolist()):
+            row = self.index.get(key)
+            if row is not None:
+                rows[i] = row
+        known = rows >= 0
+
+        # append all new flows at once, keeping their order
+        new = np.flatnonzero(~known)
+        if len(new) > 0:
+            while len(self.prod) < self.num + len(new):
+                self._alloc(2 * len(self.prod))
+            dest = np.arange(self.num, self.num + len(new))
+            for key, col in cols.items():
+                src = col[new]
+                if key in NODECOLS:
+                    src = ids[src]
+                self.cols[key][dest] = src
+            rows[new] = dest
+            for key, row in zip(keys[new].tolist(), dest.tolist()):
+                self.index[key] = row
+            self.num += len(new)
+            for (orow, key), vals in state["extra"].items():
+                if not known[orow]:
+                    if key in DROPS:
+                        vals = [(int(ids[n]), t) for n, t in vals]
+                    self.extra[(int(rows[orow]), key)] = list(vals)
+
+        for o in np.flatnonzero(known).tolist():
+            row = int(rows[o])
+            stitch(row, o, ids)
+            for key in NODES:
+                node = ids[cols[key][o]]
+                if node >= 0:
+                    self.setnode(row, key, node)
+            for key in TIMES:
+                if cols[f'n_{key}'][o] > 0:
+                    times = [cols[key][o].item()] + state["extra"].get((o, key), [])
+                    for time in times:
+                        self.addtime(row, key, time)
+            for key in DROPS:
+                if cols[f'n_{key}'][o] > 0:
+                    drops = [(int(cols[f'{key}_node'][o]), cols[f'{key}_time'][o].item())]
+                    drops += state["extra"].get((o, key), [])
+                    for node, time in drops:
+                        self.adddrop(row, key, int(ids[node]), time)
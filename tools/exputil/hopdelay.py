@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import math
+import numpy as np
+from tools.exputil.binpyramid import Binpyramid, BASE
+from tools.exputil.flowtable import parseseq
+
+# events marking where a packet is along its path
+HOP_TYPES = ["A_TX", "N_TX", "N_RX", "A_RX", "A_ACK"]
+# event pairs on the same node that make up the time spent in that node
+HOP_ENTER = ["A_TX", "N_RX"]
+HOP_LEAVE = ["N_TX", "A_RX", "A_ACK"]
+
+
+class Hopdelay:
+    '''
+    Split the latency of the CoAP flows into per hop delays.
+
+    The events of each packet, the request 'a>bbb' or the response 'a<bbb' of
+    a flow, are put in time order and each pair of consecutive events forms a
+    segment: N_TX on node a followed by N_RX on node b is the transmission
+    over the link a -> b, a packet entering (A_TX, N_RX) and then leaving
+    (N_TX, A_RX, A_ACK) a node is the time it spent in that node. The
+    segments of a delivered request add up to its t_rx - t_tx. Other pairs,
+    e.g. a retransmission or an N_RX missing from the log, are not
+    attributed.
+
+    Works on the events of the experiments Expstats (ana.expstats), so these
+    must be kept for HOP_TYPES, see Expstats.retention().
+    '''
+
+    def __init__(self, ana):
+        self.ana = ana
+        self._segments = None
+        self._pyramid = None
+
+
+    def segments(self):
+        '''
+        Get the segments of all packets as dict of arrays for "link" (time,
+        src, dst, delay) and "node" (time, node, kind, delay). Time is the
+        start of the segment, nodes are ids (see NodeRegistry), kind is 1 for
+        requests and 2 for responses.
+        '''
+        expstats = self.ana.expstats
+        expstats.needtypes("Hopdelay", HOP_TYPES)
+        if self._segments != None and self._segments[0] == len(expstats.evt):
+            return self._segments[1]
+
+        codes = {t: i for i, t in enumerate(HOP_TYPES)}
+        evts = [(e, parseseq(e["seq"])) for e in expstats.evt
+                if e["seq"] != None and e["type"] in codes]
+        # malformed sequence numbers were already warned about by Expstats
+        evts = [(e, seq) for e, seq in evts if seq is not None]
+        num = len(evts)
+        time = np.fromiter((e["time"] for e, _ in evts), dtype=np.float64, count=num)
+        node = self.ana.nodes.idarray([e["node"] for e, _ in evts])
+        etype = np.fromiter((codes[e["type"]] for e, _ in evts), dtype=np.int64, count=num)
+        key = np.fromiter((self._pktkey(*seq) for _, seq in evts), dtype=np.int64, count=num)
+
+        order = np.lexsort((time, key))
+        time, node, etype, key = time[order], node[order], etype[order], key[order]
+        same = (key[1:] == key[:-1]) & (node[1:] >= 0) & (node[:-1] >= 0)
+        delay = time[1:] - time[:-1]
+
+        link = (same & (node[1:] != node[:-1]) &
+                (etype[:-1] == codes["N_TX"]) & (etype[1:] == codes["N_RX"]))
+        stay = (same & (node[1:] == node[:-1]) &
+                np.isin(etype[:-1], [codes[t] for t in HOP_ENTER]) &
+                np.isin(etype[1:], [codes[t] for t in HOP_LEAVE]))
+
+        segments = {
+            "link": {"time": time[:-1][link], "src": node[:-1][link],
+                     "dst": node[1:][link], "delay": delay[link]},
+            "node": {"time": time[:-1][stay], "node": node[:-1][stay],
+                     "kind": 1 + (key[:-1][stay] & 1), "delay": delay[stay]},
+        }
+        self._segments = (len(expstats.evt), segments)
+        self._pyramid = None
+        return segments
+
+
+    def _pktkey(self, prod, seqno, req):
+        # producer id, seq number and direction of a packet as single int
+        return (int(prod) << 33) | (int(seqno) << 1) | (not req)
+
+
+    def delays(self, by="node"):
+        '''
+        Get the delays per node ("node") or per link ("link"), as dict of
+        node name or (src, dst) names -> array of delays in seconds
+        '''
+        seg = self.segments()[by]
+        names = self.ana.nodes.names
+        if by == "node":
+            group = seg["node"]
+        else:
+            group = seg["src"] * len(names) + seg["dst"]
+
+        order = np.argsort(group, kind="stable")
+        keys, start = np.unique(group[order], return_index=True)
+        res = {}
+        for k, part in zip(keys, np.split(seg["delay"][order], start[1:])):
+            k = int(k)
+            if by == "node":
+                res[names[k]] = part
+            else:
+                res[(names[k // len(names)], names[k % len(names)])] = part
+        return res
+
+
+    def pyramid(self):
+        '''
+        Get the time bin pyramid of the time spent in each node
+        '''
+        seg = self.segments()["node"]
+        if self._pyramid == None:
+            start = self.ana.t["start"]
+            origin = start
+            if len(seg["time"]) > 0 and seg["time"].min() < start:
+                origin -= math.ceil((start - seg["time"].min()) / BASE) * BASE
+            self._pyramid = Binpyramid(origin, seg["time"], seg["node"],
+                                       np.zeros(len(seg["node"]), dtype=np.int64),
+                                       (len(self.ana.nodes), 1), seg["delay"])
+        return self._pyramid
+
+
+    def _quantiles(self, delays):
+        return {
+            "cnt": len(delays),
+            "mean": float(np.mean(delays)) * 1000,
+            "med": float(np.median(delays)) * 1000,
+            "p95": float(np.percentile(delays, 95)) * 1000,
+            "max": float(np.max(delays)) * 1000,
+        }
+
+
+    def stats(self):
+        '''
+        Get count, mean, median, 95th percentile and maximum (in ms) of the
+        delays per node and per link ("src->dst")
+        '''
+        res = {"node": {}, "link": {}}
+        for n, delays in self.delays("node").items():
+            res["node"][n] = self._quantiles(delays)
+        for (src, dst), delays in self.delays("link").items():
+            res["link"][f'{src}->{dst}'] = self._quantiles(delays)
+        return res
+
+
+    def summary(self):
+        stats = self.stats()
+        fmt = "{:<30} {:>8} {:>10} {:>10} {:>10} {:>10}"
+        for by, title in (("node", "time spent in node"), ("link", "link delay")):
+            self.ana.statwrite(f'\nHopdelay: {title} [ms]')
+            self.ana.statwrite(fmt.format(by, "cnt", "mean", "median", "p95", "max"))
+            for name in sorted(stats[by], key=lambda k: -stats[by][k]["mean"]):
+                s = stats[by][name]
+                self.ana.statwrite("{:<30} {:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}".format(
+                    name, s["cnt"], s["mean"], s["med"], s["p95"], s["max"]))
+
+        for by in ("node", "link"):
+            if len(stats[by]) > 0:
+                worst = max(stats[by], key=lambda k: stats[by][k]["mean"])
+                self.ana.statwrite("Hopdelay: slowest {}: {} ({:.3f}ms mean)".format(
+                    by, worst, stats[by][worst]["mean"]))
+
+
+    def plot_hop_box(self, by="node", nodes=None, ylim=0):
+        '''
+        Boxplot of the time spent in each node or of the delay of each link
+        (by="link"), links are selected by their sending node
+        '''
+        cfg = self.ana.plotsetup(nodes, None, None)
+        delays = self.delays(by)
+        if by == "node":
+            keys = [n for n in self.ana.nsort(cfg["nodes"]) if n in delays]
+            labels = keys
+        else:
+            order = self.ana.nsort(cfg["nodes"])
+            keys = sorted((k for k in delays if k[0] in cfg["nodes"]),
+                          key=lambda k: (order.index(k[0]), k[1]))
+            labels = [f'{src}->{dst}' for src, dst in keys]
+
+        if len(keys) == 0:
+            print(f'Hopdelay: skipping plot_hop_box({by}), no segments')
+            return
+
+        info = {
+            "title": "Per hop delay ({})".format(by),
+            "xlabel": "Node" if by == "node" else "Link",
+            "ylabel": "Delay [ms]",
+            "suffix": f'hop_box_{by}',
+            "grid": [False, True],
+            "bar_lbl": labels,
+            "ylim": ylim,
+        }
+        self.ana.plotter.boxplot2(info, [(delays[k] * 1000).tolist() for k in keys])
+
+
+    def plot_hop_delay_pn(self, nodes=None, binsize=15.0, timespan=None, aggr="avg", ylim=None):
+        '''
+        Time series of the time spent in each node, aggr: avg, min or max per
+        bin
+        '''
+        cfg = self.ana.plotsetup(nodes, binsize, timespan)
+        bins = self.pyramid().bins(cfg["first"], cfg["last"], cfg["binsize"])
+        cnt = bins["cnt"][:, 0]
+        if aggr == "avg":
+            val = bins["sum"][:, 0] / np.maximum(cnt, 1)
+        else:
+            val = bins[aggr][:, 0]
+        x = [self.ana.t_norm(cfg["first"] + i * cfg["binsize"]) for i in range(cnt.shape[1])]
+
+        lines = []
+        nodes = self.ana.nsort(cfg["nodes"])
+        for n, i in zip(nodes, self.ana.nodes.idarray(nodes).tolist()):
+            if i < 0 or cnt[i].sum() == 0:
+                continue
+            used = cnt[i] > 0
+            lines.append({
+                "x": [t for t, u in zip(x, used) if u],
+                "y": (val[i][used] * 1000).tolist(),
+                "label": n,
+            })
+
+        if len(lines) == 0:
+            print("Hopdelay: skipping plot_hop_delay_pn(), no segments")
+            return
+
+        xt = self.ana.plotter.get_ticks([l["x"] for l in lines], None)
+        info = {
+            "title": "Time spent in node ({}, binsize {}s)".format(aggr, binsize),
+            "xlabel": "Experiment runtime [s]",
+            "ylabel": "Delay [ms]",
+            "suffix": f'hop_delay_pn_{aggr}',
+            "xlim": xt["lim"],
+            "xticks": xt["ticks"],
+            "xtick_lbl": xt["ticks"],
+            "xtick_lbl_rot": {"rotation": 45, "ha": "right"},
+            "ylim": ylim,
+            "binsize": binsize,
+            "plotter": "line",
+        }
+        self.ana.plotter.linechart4(info, lines)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import re
+from tools.exputil.evtcache import strcodes, strlist
+
+
+class Ipaddr:
+
+    PREFIXES = ["inet6"]
+    VERSION = 1
+
+    def __init__(self, ana):
+        self.ana = ana
+        self.seen = []          # (node, ip) in order of appearance
+
+        self.re_ip = re.compile(r'inet6 addr: (?P<ip>(2001\:)?affe\:\:[\:a-z0-9]+)')
+
+
+    def update(self, time, node, output):
+        # get global IPv6 addresses
+        m = self.re_ip.search(output.lower())
+        if m:
+            self.seen.append((node, m.group("ip")))
+
+
+    def getpart(self):
+        return {"seen": self.seen}
+
+
+    def merge(self, part):
+        self.seen += part["seen"]
+
+
+    def getcols(self):
+        cols = {}
+        cols["node_names"], cols["node"] = strcodes([n for n, _ in self.seen])
+        cols["ip_names"], cols["ip"] = strcodes([ip for _, ip in self.seen])
+        return cols
+
+
+    def readcols(self, cols):
+        self.seen += zip(strlist(cols["node_names"], cols["node"]),
+                         strlist(cols["ip_names"], cols["ip"]))
+
+
+    def finish(self):
+        for node, ip in self.seen:
+            self.addr(node, ip)
+
+
+    def addr(self, node, ip):
+        if not "addr_ip" in self.ana.nodecfg[node]:
+            self.ana.nodedb.setval(node, "addr_ip", ip)
+        elif self.ana.nodecfg[node]["addr_ip"] != ip:
+            print("Warning: IPv6 addr for {} is deviating: {} vs {}".format(
+                  node, self.ana.nodecfg[node]["addr_ip"], ip))
+
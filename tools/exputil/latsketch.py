@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import sys
+import math
+import numpy as np
+
+ALPHA = 0.01                # relative accuracy of the quantiles
+
+
+class Latsketch:
+    '''
+    Mergeable quantile sketch of positive values, e.g. latencies.
+
+    Values are counted in buckets of logarithmically growing width: bucket i
+    holds the values in (gamma^(i-1), gamma^i], with gamma = (1 + alpha) /
+    (1 - alpha). Any quantile is known within a relative error of alpha,
+    while the size of the sketch only depends on the range of the values and
+    not on their number. Sketches of the same alpha merge by adding up their
+    bucket counts, so the quantiles over many runs come from merging the
+    sketches of the single runs.
+    '''
+
+    def __init__(self, alpha=ALPHA):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.buckets = {}       # bucket index -> number of values
+        self.cnt = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[values > 0]
+        if len(values) == 0:
+            return
+        idx = np.ceil(np.log(values) / math.log(self.gamma)).astype(np.int64)
+        for i, n in zip(*np.unique(idx, return_counts=True)):
+            self.buckets[int(i)] = self.buckets.get(int(i), 0) + int(n)
+        self.cnt += len(values)
+        self.min = min(self.min, values.min().item())
+        self.max = max(self.max, values.max().item())
+
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            sys.exit(f'Error: can not merge sketches of alpha {other.alpha} and {self.alpha}')
+        for i, n in other.buckets.items():
+            self.buckets[i] = self.buckets.get(i, 0) + n
+        self.cnt += other.cnt
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+
+    def trim(self, low):
+        '''
+        Drop the values below `low`. This is approximate within the sketch's
+        accuracy: the bucket holding `low` is kept as a whole, so its values
+        down to low / gamma (about 2 * alpha below `low`) are still counted,
+        and the minimum is set to `low`, which is within the same bound of the
+        smallest value kept.
+        '''
+        for i in [i for i in self.buckets if self.gamma ** i < low]:
+            self.cnt -= self.buckets.pop(i)
+        if self.cnt == 0:
+            self.min = math.inf
+            self.max = -math.inf
+        elif self.min < low:
+            self.min = min(low, self.max)
+
+
+    def _value(self, i):
+        # the value representing bucket i, within alpha of all its values
+        return 2 * self.gamma ** i / (self.gamma + 1)
+
+
+    def quantile(self, q):
+        if self.cnt == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        rank = q * (self.cnt - 1)
+        seen = 0
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if seen > rank:
+                return min(max(self._value(i), self.min), self.max)
+        return self.max
+
+
+    def boxstats(self, label=None):
+        '''
+        Box plot statistics for matplotlib's Axes.bxp(), whiskers at min/max.
+        All stats are NaN for an empty sketch, bxp() draws an empty box then.
+        '''
+        if self.cnt == 0:
+            return {"label": label, "whislo": math.nan, "q1": math.nan, "med": math.nan,
+                    "q3": math.nan, "whishi": math.nan, "fliers": []}
+        return {
+            "label": label,
+            "whislo": self.min,
+            "q1": self.quantile(0.25),
+            "med": self.quantile(0.5),
+            "q3": self.quantile(0.75),
+            "whishi": self.max,
+            "fliers": [],
+        }
+
+
+    def todict(self):
+        idx = sorted(self.buckets)
+        return {
+            "alpha": self.alpha,
+            "cnt": self.cnt,
+            "min": self.min if self.cnt > 0 else None,
+            "max": self.max if self.cnt > 0 else None,
+            "index": idx,
+            "count": [self.buckets[i] for i in idx],
+        }
+
+
+    @classmethod
+    def fromdict(cls, raw):
+        sketch = cls(raw["alpha"])
+        sketch.buckets = dict(zip(raw["index"], raw["count"]))
+        sketch.cnt = raw["cnt"]
+        if sketch.cnt > 0:
+            sketch.min = raw["min"]
+            sketch.max = raw["max"]
+        return sketch
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+
+class Linerouter:
+    '''
+    Dispatch log lines only to the analyzers that are able to consume them.
+
+    Each analyzer lists the line prefixes it is interested in (PREFIXES). A
+    line is matched against these prefixes after stripping the shell prompt
+    ('> ') and leading whitespace, so that the analyzers' own regexes are only
+    run on lines that can actually match. Prefixes are grouped by their first
+    character, so routing a line costs a single dict lookup.
+
+    route_raw() does the same for lines read as bytes and decodes a line only
+    if at least one analyzer is interested in it.
+    '''
+
+    def __init__(self):
+        self.routes = {}
+        self.routes_raw = {}
+        self.analyzers = []
+
+
+    def register(self, prefixes, cb):
+        for prefix in prefixes:
+            self.routes.setdefault(prefix[0], []).append((prefix, cb))
+            raw = prefix.encode("utf-8")
+            self.routes_raw.setdefault(raw[:1], []).append((raw, cb))
+
+
+    def add(self, analyzer):
+        self.analyzers.append(analyzer)
+        self.register(analyzer.PREFIXES, analyzer.update)
+
+
+    def supports(self, *methods):
+        '''
+        True if all callbacks belong to analyzers implementing all `methods`
+        '''
+        for routes in self.routes.values():
+            for _, cb in routes:
+                owner = getattr(cb, "__self__", None)
+                if owner not in self.analyzers:
+                    return False
+                if not all(hasattr(owner, m) for m in methods):
+                    return False
+        return True
+
+
+    def route(self, time, node, output):
+        line = output.lstrip("> \t")
+        for prefix, cb in self.routes.get(line[:1], ()):
+            if line.startswith(prefix):
+                cb(time, node, output)
+
+
+    def route_raw(self, time, node, payload):
+        line = payload.lstrip(b"> \t")
+        routes = self.routes_raw.get(line[:1])
+        if routes:
+            output = None
+            for prefix, cb in routes:
+                if line.startswith(prefix):
+                    if output is None:
+                        output = payload.decode("utf-8")
+                    cb(time, node, output)
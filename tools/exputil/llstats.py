@@ -23,11 +23,11 @@ import re
 import sys
 import copy
 import math
-import statistics
 import numpy as np
+from tools.exputil.timeindex import Timeindex
+from tools.exputil.samples import Samples, timebins, binsums
 
 CHAN_NUMOF = 40
-CONN_MAX   = 10
 
 CHANSTAT = {
     "time": 0,
@@ -42,24 +42,42 @@ EVENT = {
     "ok": [-1.0] * CHAN_NUMOF,
 }
 
+# integer fields of the PHY events parsed from the ll,... supstats lines
+PHY_KEYS = ["dur", "rx_cnt", "rx_tim", "tx_cnt", "tx_tim", "rx_cnt_off", "tx_cnt_off"]
+PHY_FIELDS = [(key, np.int32) for key in PHY_KEYS]
+# connection anchors from the ll<conn>,<anchor>(<resched>) lines, the anchor
+# is the raw 32768Hz cputime of the node
+ANCHOR_FIELDS = [("conn", np.int16), ("anchor", np.uint32), ("resched", np.int16)]
+
 CHARMAP = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# bytes.translate() table mapping each CHARMAP character to its value
+CHARVAL = bytes.maketrans(CHARMAP.encode(), bytes(range(len(CHARMAP))))
+
+CAPACITY = 4096     # initial number of channel stats rows
 
 class LLStats:
 
+    PREFIXES = ["ll", "buf"]
+    VERSION = 4
+
     def __init__(self, ana):
         self.ana = ana
 
-        self.events = []
-        self.pn = {n: [] for n in self.ana.desc["used_nodes"]}
+        # channel stats of the ll<conn>,... lines, one row per line: ll[row][0]
+        # holds the tx and ll[row][1] the ok count of each channel, the node is
+        # given by its id in ana.nodes
+        self.ll_num = 0
+        self.ll_cols = {}
+        self._alloc(CAPACITY)
+        self._index = None
+
         self.sums = {"ok": 0, "tx": 0, "rate": 0.0}
         self.sums_pc = {n: {"ok": [0] * CHAN_NUMOF, "tx": [0] * CHAN_NUMOF} for n in self.ana.desc["used_nodes"] + ["sum"]}
-        self.anchors = {n: [[] for _ in range(CONN_MAX)] for n in self.ana.desc["used_nodes"]}
-        self.buf = {n: [] for n in self.ana.desc["used_nodes"]}
-        self.conn_offset = {n: [] for n in self.ana.desc["used_nodes"]}
-
-        self.phy = {n: [] for n in self.ana.desc["used_nodes"]}
-        self.phy_all = []
+        self.anchor = Samples(self.ana.nodes, ANCHOR_FIELDS)
 
+        # free mbufs, from the supstats and the buf<free> lines
+        self.buf = Samples(self.ana.nodes, [("free", np.int32)])
+        self.phy = Samples(self.ana.nodes, PHY_FIELDS)
 
         self.re_txstats = re.compile(r'^>? *ll(?P<conn>\d+),(?P<stats>[0-9a-zA-Z]{80})')
         self.re_supstats = re.compile(r'^>? *ll,(?P<dur>\d+),'
@@ -67,79 +85,147 @@ class LLStats:
                                       r'(?P<tx_cnt>\d+),(?P<tx>\d+),(?P<free>\d+)'
                                       r'(,(?P<rx_cnt_off>\d+),(?P<tx_cnt_off>\d+))?')
         self.re_buf = re.compile(r'^>? *buf(?P<free>\d+)')
+        self.re_anchor = re.compile(r'^>? *ll(?P<conn>\d+),(?P<anchor>\d+)\((?P<resched>\d+)\)')
+
+
+    def _alloc(self, size):
+        cols = {
+            "ll": np.zeros((size, 2, CHAN_NUMOF), dtype=np.uint8),
+            "ll_time": np.zeros(size, dtype=np.float64),
+            "ll_node": np.zeros(size, dtype=np.int32),
+            "ll_conn": np.zeros(size, dtype=np.int16),
+        }
+        for key, col in self.ll_cols.items():
+            cols[key][:self.ll_num] = col[:self.ll_num]
+        self.ll_cols = cols
+        for key, col in cols.items():
+            setattr(self, key, col)
+
+
+    def _extend(self, ll, time, node, conn):
+        num = self.ll_num + len(time)
+        if num > len(self.ll_time):
+            self._alloc(max(num, 2 * len(self.ll_time)))
+        self.ll[self.ll_num:num] = ll
+        self.ll_time[self.ll_num:num] = time
+        self.ll_node[self.ll_num:num] = node
+        self.ll_conn[self.ll_num:num] = conn
+        self.ll_num = num
+
+
+    def rows(self, nodes=None, first=None, last=None):
+        '''
+        Rows of the channel stats of `nodes` (all if None) with
+        first <= time <= last, in their original order
+        '''
+        if self._index is None or self._index[0] != self.ll_num:
+            self._index = (self.ll_num, Timeindex(self.ll_node[:self.ll_num].tolist(),
+                                                  self.ll_time[:self.ll_num]))
+        if nodes is not None:
+            ids = self.ana.nodes.idarray(nodes)
+            nodes = ids[ids >= 0].tolist()
+        return self._index[1].positions(nodes, first, last)
 
 
     def getraw(self):
         return {
-            "events": self.events,
-            "pn": self.pn,
+            "ll": {
+                "time": self.ll_time[:self.ll_num].tolist(),
+                "node": self.ana.nodes.namelist(self.ll_node[:self.ll_num].tolist()),
+                "conn": self.ll_conn[:self.ll_num].tolist(),
+                "stats": self.ll[:self.ll_num].tolist(),
+            },
             "sums": self.sums,
             "sums_pc": self.sums_pc,
-            "anchors": self.anchors,
-            "buf": self.buf,
-            "conn_offset": self.conn_offset,
+            "anchor": self.anchor.todict(),
+            "buf": self.buf.todict(),
         }
 
 
     def readraw(self, raw):
-        self.events = raw["events"]
-        self.pn = raw["pn"]
+        self.ll_num = 0
+        self._extend(np.array(raw["ll"]["stats"], dtype=np.uint8).reshape(-1, 2, CHAN_NUMOF),
+                     raw["ll"]["time"], self.ana.nodes.idarray(raw["ll"]["node"]),
+                     raw["ll"]["conn"])
         self.sums = raw["sums"]
         self.sums_pc = raw["sums_pc"]
-        self.anchors = raw["anchors"]
-        self.buf = raw["buf"]
-        self.conn_offset = raw["conn_offset"]
+        self.anchor = Samples(self.ana.nodes, ANCHOR_FIELDS)
+        self.anchor.fromdict(raw["anchor"])
+        self.buf = Samples(self.ana.nodes, [("free", np.int32)])
+        self.buf.fromdict(raw["buf"])
+
+
+    def getpart(self):
+        return {
+            "ll": {key: col[:self.ll_num] for key, col in self.ll_cols.items()},
+            "buf": self.buf.array(),
+            "phy": self.phy.array(),
+            "anchor": self.anchor.array(),
+        }
+
+
+    def merge(self, part):
+        self._extend(part["ll"]["ll"], part["ll"]["ll_time"],
+                     part["ll"]["ll_node"], part["ll"]["ll_conn"])
+        self.buf.extend(part["buf"])
+        self.phy.extend(part["phy"])
+        self.anchor.extend(part["anchor"])
+
+
+    def getcols(self):
+        cols = {key: col[:self.ll_num] for key, col in self.ll_cols.items()}
+        cols["ll_node_names"] = np.array(self.ana.nodes.names, dtype=str)
+        cols.update(self.phy.getcols("phy_"))
+        cols.update(self.buf.getcols("buf_"))
+        cols.update(self.anchor.getcols("anchor_"))
+        return cols
+
+
+    def readcols(self, cols):
+        ids = self.ana.nodes.idarray(cols["ll_node_names"].tolist())
+        self._extend(cols["ll"], cols["ll_time"], ids[cols["ll_node"]], cols["ll_conn"])
+        self.phy.readcols(cols, "phy_")
+        self.buf.readcols(cols, "buf_")
+        self.anchor.readcols(cols, "anchor_")
 
 
     def update(self, time, node, line):
         m = self.re_txstats.search(line)
         if m:
-            evt = {
-                "time": time,
-                "node": node,
-                "conn": int(m.group("conn")),
-                "tx": [-1.0] * CHAN_NUMOF,
-                "ok": [-1.0] * CHAN_NUMOF,
-            }
-
-            txsum = 0
-            oksum = 0
-            for i, char in enumerate(m.group("stats")):
-                chan = int(i / 2)
-                if not i & 1:
-                    txsum += CHARMAP.find(char)
-                    evt["tx"][chan] = CHARMAP.find(char)
-                else:
-                    oksum += CHARMAP.find(char)
-                    evt["ok"][chan] = CHARMAP.find(char)
-            evt["sum_tx"] = txsum
-            evt["sum_ok"] = oksum
+            row = self.ll_num
+            if row == len(self.ll_time):
+                self._alloc(2 * row)
+            # the stats alternate between the tx and ok count of each channel
+            stats = m.group("stats").encode().translate(CHARVAL)
+            self.ll[row] = np.frombuffer(stats, dtype=np.uint8).reshape(CHAN_NUMOF, 2).T
+            self.ll_time[row] = time
+            self.ll_node[row] = self.ana.nodes.id(node)
+            self.ll_conn[row] = int(m.group("conn"))
+            self.ll_num += 1
+            return
 
-            self.events.append(evt)
-            self.pn[node].append(evt)
+        m = self.re_anchor.search(line)
+        if m:
+            self.anchor.add(time, node, int(m.group("conn")), int(m.group("anchor")),
+                            int(m.group("resched")))
             return
 
         m = self.re_supstats.search(line)
         if m:
-            self.buf[node].append({"time": time, "free": int(m.group("free"))})
-            phy_evt = {
-                "time": time,
-                "node": node,
-                "dur": int(m.group("dur")),
-                "rx_cnt": int(m.group("rx_cnt")),
-                "rx_tim": int(m.group("rx")),
-                "tx_cnt": int(m.group("tx_cnt")),
-                "tx_tim": int(m.group("tx")),
-                "rx_cnt_off": int(m.group("rx_cnt_off")) if m.group("rx_cnt_off") else 0,
-                "tx_cnt_off": int(m.group("tx_cnt_off")) if m.group("tx_cnt_off") else 0,
-            }
-            self.phy[node].append(phy_evt)
-            self.phy_all.append(phy_evt)
+            self.buf.add(time, node, int(m.group("free")))
+            self.phy.add(time, node,
+                         int(m.group("dur")),
+                         int(m.group("rx_cnt")),
+                         int(m.group("rx")),
+                         int(m.group("tx_cnt")),
+                         int(m.group("tx")),
+                         int(m.group("rx_cnt_off")) if m.group("rx_cnt_off") else 0,
+                         int(m.group("tx_cnt_off")) if m.group("tx_cnt_off") else 0)
 
 
         m = self.re_buf.search(line)
         if m:
-            self.buf[node].append({"time": time, "free": int(m.group("free"))})
+            self.buf.add(time, node, int(m.group("free")))
 
 
     def get_rate(self, tx, ok):
@@ -151,21 +237,100 @@ class LLStats:
         return rate
 
 
+    def get_rates(self, tx, ok):
+        '''
+        get_rate() for arrays of tx and ok counts
+        '''
+        rate = np.full(np.shape(tx), -.005)
+        np.divide(ok, tx, out=rate, where=(tx > 0))
+        return np.minimum(rate, 1.0)
+
+
+    def _sumby(self, keys, size, rows):
+        '''
+        Sum up the channel stats of the given rows per key, for keys in
+        range(size). Returns an array of shape (size, 2, CHAN_NUMOF).
+        '''
+        # np.add.at() is slow for the wide rows, so sort the rows by their key
+        # and sum up each run of keys
+        sums = np.zeros((size, 2, CHAN_NUMOF), dtype=np.int64)
+        if len(keys) == 0:
+            return sums
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        sums[keys[starts]] = np.add.reduceat(self.ll[rows[order]], starts, axis=0, dtype=np.int32)
+        return sums
+
+
+    def _binned(self, rows, first, binsize, closed="left"):
+        '''
+        Bin the given channel stats rows by time into bins of `binsize`
+        starting at `first`. A row on an edge goes into the bin starting
+        (closed="left") or ending (closed="right") there. Returns the edges
+        and the bin of each row.
+        '''
+        return timebins(self.ll_time[rows], first, binsize, closed)
+
+
+    def _chanbins(self, nodes, first, last, binsize, chan_num, skip_first=False):
+        '''
+        Sum up the tx and ok counts of the first `chan_num` channels per node
+        and bin, a bin holding the rows with edge < time <= edge + binsize.
+        Returns the nodes in sorted order and the sums of shape (nodes, bins,
+        2, chan_num).
+        '''
+        nodes = self.ana.nsort(dict.fromkeys(nodes))
+        rows = self.rows(nodes, first, last)
+        if skip_first:
+            rows = rows[self.ll_time[rows] != first]
+        _, bins = self._binned(rows, first, binsize, closed="right")
+        rows, bins = rows[bins >= 0], bins[bins >= 0]
+
+        pos = np.zeros(len(self.ana.nodes), dtype=np.int64)
+        ids = self.ana.nodes.idarray(nodes)
+        pos[ids[ids >= 0]] = np.flatnonzero(ids >= 0)
+        num = bins.max() + 1 if len(bins) > 0 else 0
+        sums = self._sumby(pos[self.ll_node[rows]] * num + bins, len(nodes) * num, rows)
+        return nodes, sums[:, :, :chan_num].reshape(len(nodes), num, 2, chan_num)
+
+
+    def _ratebins(self, rows, first, binsize, pull=False):
+        '''
+        Delivery rate of the given rows per bin, up to the last bin holding
+        any transmissions. The bins start at `first`, or with pull=True at the
+        bin of the first row (a row on an edge counting for the bin ending
+        there). Returns the bin starts and the rates.
+        '''
+        if len(rows) == 0:
+            return [], np.empty(0)
+        edges, bins = self._binned(rows, first, binsize)
+        start = 0
+        if pull:
+            start = max(np.searchsorted(edges, self.ll_time[rows[0]], side="left") - 1, 0)
+            bins = np.maximum(bins, start)
+
+        sums = self._sumby(bins, bins.max() + 1, rows).sum(axis=2)
+        num = len(sums) if sums[-1, 0] > 0 else len(sums) - 1
+        rates = self.get_rates(sums[start:num, 0], sums[start:num, 1])
+        return edges[start:num].tolist(), rates
+
+
     def finish(self):
-        for e in self.events:
-            for c in range(CHAN_NUMOF):
-                self.sums_pc[e["node"]]["tx"][c] += e["tx"][c]
-                self.sums_pc[e["node"]]["ok"][c] += e["ok"][c]
-                self.sums_pc["sum"]["tx"][c] += e["tx"][c]
-                self.sums_pc["sum"]["ok"][c] += e["ok"][c]
+        sums = self._sumby(self.ll_node[:self.ll_num], len(self.ana.nodes), np.arange(self.ll_num))
+        total = sums.sum(axis=0)
 
-                self.sums["tx"] += e["tx"][c]
-                self.sums["ok"] += e["ok"][c]
+        for i, n in enumerate(self.ana.nodes):
+            self.sums_pc[n]["tx"] = sums[i, 0].tolist()
+            self.sums_pc[n]["ok"] = sums[i, 1].tolist()
+        self.sums_pc["sum"]["tx"] = total[0].tolist()
+        self.sums_pc["sum"]["ok"] = total[1].tolist()
+        self.sums["tx"] = int(total[0].sum())
+        self.sums["ok"] = int(total[1].sum())
 
         for n in self.sums_pc:
-            self.sums_pc[n]["rate"] = [-1.0] * CHAN_NUMOF
-            for c in range(CHAN_NUMOF):
-                self.sums_pc[n]["rate"][c] = self.get_rate(self.sums_pc[n]["tx"][c], self.sums_pc[n]["ok"][c])
+            self.sums_pc[n]["rate"] = self.get_rates(np.array(self.sums_pc[n]["tx"]),
+                                                     np.array(self.sums_pc[n]["ok"])).tolist()
         self.sums["rate"] = self.get_rate(self.sums["tx"], self.sums["ok"])
 
 
@@ -191,12 +356,13 @@ class LLStats:
 
         self.ana.statwrite("llstats: Buffer state (free mbufs in MSYS pool)")
         self.ana.statwrite("{:>15}  min/avg/max".format("node"))
-        for n in self.ana.nsort(self.buf):
-            if len(self.buf[n]) > 0:
-                self.ana.statwrite("{:>15} {:>3}/{:>3}/{:>3}".format(n,
-                    min([e["free"] for e in self.buf[n]]),
-                    int(sum([e["free"] for e in self.buf[n]]) / len(self.buf[n])),
-                    max([e["free"] for e in self.buf[n]])))
+        cnt = self.buf.count()
+        low = self.buf.reduce("free", np.minimum)
+        high = self.buf.reduce("free", np.maximum)
+        total = self.buf.reduce("free", np.add)
+        for n in self.ana.nsort(cnt):
+            self.ana.statwrite("{:>15} {:>3}/{:>3}/{:>3}".format(n,
+                low[n], int(total[n] / cnt[n]), high[n]))
 
         # sum up the link layer stats
         self.ana.statwrite("\nMaster TX counts per node")
@@ -210,20 +376,18 @@ class LLStats:
             rate = 0.0 if tx_sum == 0 else tx_ok / tx_sum
             self.ana.statwrite(f'{n:>15} {tx_sum:>8} {tx_ok:>8} {(rate * 100):>5.2f}%')
 
-        if len(self.phy_all) == 0:
+        if len(self.phy) == 0:
             return
         print("\nPHY stats - RX/TX on/off counts")
         self.ana.statwrite(f'{" ":>15} '
                            f'{"rx_on":>8} {"rx_off":>8} {"rx_diff":>8} |'
                            f'{"tx_on":>8} {"tx_off":>8} {"tx_diff":>8} | '
                            f'{"sum_on":>8} {"sum_off":>8} {"sum_diff":>8}')
-        for n in self.ana.nsort(self.phy):
-            sums = {"rx_on": 0, "rx_off": 0, "tx_on": 0, "tx_off": 0}
-            for evt in self.phy[n]:
-                sums["rx_on"] += evt["rx_cnt"]
-                sums["tx_on"] += evt["tx_cnt"]
-                sums["rx_off"] += evt["rx_cnt_off"]
-                sums["tx_off"] += evt["tx_cnt_off"]
+        totals = {key: self.phy.reduce(field, np.add) for key, field in
+                  [("rx_on", "rx_cnt"), ("rx_off", "rx_cnt_off"),
+                   ("tx_on", "tx_cnt"), ("tx_off", "tx_cnt_off")]}
+        for n in self.ana.nodes:
+            sums = {key: totals[key].get(n, 0) for key in totals}
             all_on = sums["rx_on"] + sums["tx_on"]
             all_off = sums["rx_off"] + sums["tx_off"]
             self.ana.statwrite(f'{n:>15} '
@@ -235,82 +399,19 @@ class LLStats:
 
 
     def buf_usage_summery(self, exponly=True, bufnum=40, bufsize=264):
-        free = []
         size = bufnum * bufsize
-        for n in self.buf:
-            free.extend([k["free"] * bufsize for k in self.buf[n] if k["time"] >= self.ana.t["start"] and k["time"] <= self.ana.t["end"]])
+        free = self.buf.select(None, self.ana.t["start"], self.ana.t["end"])["free"]
+        free = free.astype(np.int64) * bufsize
 
         return {
-            "min": size - max(free),
-            "max": size - min(free),
-            "avg": size - statistics.mean(free),
-            "med": size - statistics.median(free),
+            "min": size - int(free.max()),
+            "max": size - int(free.min()),
+            "avg": size - int(free.sum()) / len(free),
+            "med": size - float(np.median(free)),
             "size": size,
         }
 
 
-    def plot_anchors(self, tstart=None, tend=None):
-
-        tstart = 0
-        tend = self.ana.t["end"] - self.ana.t["start"]
-
-        data = []
-        xlim = [None, None]
-        ylim = [0.0, None]
-
-        for n in self.anchors:
-            for conn in range(len(self.anchors[n])):
-                if len(self.anchors[n][conn]) == 0:
-                    continue
-                line = {"x": [], "y": [], "label": "{}_conn-{}".format(n, conn)}
-
-                itvl = self.anchors[n][conn][1]["anchor"] - self.anchors[n][conn][0]["anchor"]
-                offset = self.anchors[n][conn][0]["anchor"] % itvl
-                last = 0
-                for i, e in enumerate(self.anchors[n][conn]):
-                    if tstart != None and (e["time"] - self.ana.t["start"]) < tstart:
-                        continue
-                    if tend != None and tend < (e["time"] - self.ana.t["start"]):
-                        continue
-                    if last == 0:
-                        last = e["anchor"]
-                        continue
-                    val = (e["anchor"] - last) * (1 / 32768) * 1000
-                    last = e["anchor"]
-                    line["y"].append(val)
-                    if val > 5000:
-                        print("bad val {} -> line")
-
-                    line["x"].append(e["time"] - self.ana.t["start"])
-                    if xlim[0] == None or xlim[0] > line["x"][-1]:
-                        xlim[0] = line["x"][-1]
-                    if xlim[1] == None or xlim[1] < line["x"][-1]:
-                        xlim[1] = line["x"][-1]
-                    if ylim[0] == None or ylim[0] > line["y"][-1]:
-                        ylim[0] = line["y"][-1]
-                    if ylim[1] == None or ylim[1] < line["y"][-1]:
-                        ylim[1] = line["y"][-1]
-
-                data.append(line)
-
-        if len(data) == 0:
-            print("Warning: not printing anchors: no exp output found")
-            return
-
-        info = {
-            "title": "RAW anchors for connection events",
-            "xlabel": "Experiment Runtime [s]",
-            "ylabel": "RAW connection anchor [ticks]",
-            "suffix": "anchors_raw_mul",
-            "dim": [len(data), 1],
-            "xlim": xlim,
-            "ylim": [0.0, ylim[1] * 1.1],
-            "yticks": np.arange(0, ylim[1] * 1.1, 50)
-        }
-        # self.ana.plotter.linechart3(info, data)
-        self.ana.plotter.step_multi(info, data)
-
-
     def plot_chanrate(self, all_chan=False, binsize=30, nodes=None, excl_nodes=None, timespan=None):
         if not nodes:
             nodes = self.ana.desc["used_nodes"]
@@ -319,21 +420,15 @@ class LLStats:
 
         chan_num = CHAN_NUMOF if all_chan else (CHAN_NUMOF - 3)
         if timespan == None:
-            curbin = self.ana.t["start"]
+            nodes, sums = self._chanbins(nodes, self.ana.t["start"], None, binsize,
+                                         chan_num, skip_first=True)
         else:
-            curbin = self.ana.t["start"] + timespan[0]
+            nodes, sums = self._chanbins(nodes, self.ana.t["start"] + timespan[0],
+                                         self.ana.t["start"] + timespan[1], binsize, chan_num)
 
-        # get ids
-        tx = {n: [] for n in nodes}
-        ok = {n: [] for n in nodes}
         labels = []
-        for n in self.ana.nsort(tx):
-            if n not in nodes:
-                continue
-
+        for n in nodes:
             for c in range(chan_num):
-                tx[n].append([])
-                ok[n].append([])
                 if len(nodes) < 3:
                     labels.append("{} - CH{}".format(n, c))
                 else:
@@ -342,38 +437,9 @@ class LLStats:
                     else:
                         labels.append("")
 
-        xbin = []
-        for e in self.events:
-            if e["node"] not in nodes:
-                continue
-
-            if timespan != None:
-                if e["time"] < (self.ana.t["start"] + timespan[0]) or e["time"] > (self.ana.t["start"] + timespan[1]):
-                    continue
-            elif e["time"] <= self.ana.t["start"]:
-                continue
-
-
-            if e["time"] > curbin:
-                curbin += binsize
-                xbin.append(curbin)
-
-                for n in tx:
-                    for i in range(len(tx[n])):
-                        tx[n][i].append(0)
-                        ok[n][i].append(0)
-
-            for c in range(chan_num):
-                tx[e["node"]][c][-1] += e["tx"][c]
-                ok[e["node"]][c][-1] += e["ok"][c]
-
-        data = []
-        for n in self.ana.nsort(tx):
-            for chan in range(len(tx[n])):        # channels
-                row = []
-                for b in range(len(tx[n][chan])):
-                    row.append(self.get_rate(tx[n][chan][b], ok[n][chan][b]))
-                data.append(row)
+        # one row per node and channel
+        rates = self.get_rates(sums[:, :, 0], sums[:, :, 1])
+        data = rates.transpose(0, 2, 1).reshape(len(nodes) * chan_num, -1).tolist()
 
         xticks = np.arange(0, len(data[0]) + 1, 600 / binsize).tolist()
         xtick_lbl = ["{:.0f}".format(t * binsize) for t in xticks]
@@ -397,7 +463,6 @@ class LLStats:
 
     def get_rateline(self, nodes=None, binsize=5.0, timespan=None, ylim=None):
         cfg = self.ana.plotsetup(nodes, binsize, timespan)
-        curbin = cfg["first"]
 
         line = {
             "x": [],
@@ -405,28 +470,15 @@ class LLStats:
             "label": "Link Layer Delivery Rate",
         }
 
-        curdat = [0, 0]
-        for e in self.events:
-            if self.ana.plotter.filter(cfg, e["node"], e["time"]):
-                continue
-
-            if e["time"] >= (curbin + cfg["binsize"]):
-                line["x"].append(self.ana.t_norm(curbin))
-                line["y"].append(self.get_rate(curdat[0], curdat[1]))
-                curbin += cfg["binsize"]
-                curdat = [0, 0]
-            curdat[0] += e["sum_tx"]
-            curdat[1] += e["sum_ok"]
-
-        if curdat[0] > 0:
-            line["x"].append(self.ana.t_norm(curbin))
-            line["y"].append(self.get_rate(curdat[0], curdat[1]))
-
+        rows = self.rows(cfg["nodes"], cfg["first"], cfg["last"])
+        bins, rates = self._ratebins(rows, cfg["first"], cfg["binsize"])
+        line["x"] = [self.ana.t_norm(t) for t in bins]
+        line["y"] = rates.tolist()
         return line
 
 
     def plot_rateline(self, nodes=None, binsize=5.0, timespan=None, ylim=None):
-        if len(self.events) == 0:
+        if self.ll_num == 0:
             print("llstats: skipping plot_rateliine(), no LL events in log")
             return
 
@@ -455,40 +507,22 @@ class LLStats:
 
 
     def plot_rateline_pn(self, nodes=None, binsize=5.0, timespan=None, ylim=None):
-        if len(self.events) == 0:
+        if self.ll_num == 0:
             print("llstats: skipping plot_rateliine_pn(), no LL events in log")
             return
 
         cfg = self.ana.plotsetup(nodes, binsize, timespan)
 
-        done = set()
         data = {}
         for i, n in enumerate(cfg["nodes"]):
-            curbin = cfg["first"]
-            data[n] = {"x": [], "y": [], "label": n}
-
-            curdat = [0, 0]
-            for e in self.pn[n]:
-                if self.ana.plotter.filter(cfg, None, e["time"]):
-                    continue
-
-                # pull curbin to first entry for the node in question
-                if n not in done:
-                    while e["time"] > (curbin + cfg["binsize"]):
-                        curbin += cfg["binsize"]
-                    done.add(n)
-
-                if e["time"] >= (curbin + cfg["binsize"]):
-                    data[n]["x"].append(self.ana.t_norm(curbin))
-                    data[n]["y"].append(self.get_rate(curdat[0], curdat[1]) + ((len(cfg["nodes"]) - i) * 1.0))
-                    curbin += cfg["binsize"]
-                    curdat = [0, 0]
-                curdat[0] += e["sum_tx"]
-                curdat[1] += e["sum_ok"]
-
-            if curdat[0] > 0:
-                data[n]["x"].append(self.ana.t_norm(curbin))
-                data[n]["y"].append(self.get_rate(curdat[0], curdat[1]) + ((len(cfg["nodes"]) - i) * 1.0))
+            # bins start with the first entry of the node in question
+            rows = self.rows([n], cfg["first"], cfg["last"])
+            bins, rates = self._ratebins(rows, cfg["first"], cfg["binsize"], pull=True)
+            data[n] = {
+                "x": [self.ana.t_norm(t) for t in bins],
+                "y": (rates + (len(cfg["nodes"]) - i) * 1.0).tolist(),
+                "label": n,
+            }
 
         lines = []
         for n in self.ana.nsort(data):
@@ -520,19 +554,12 @@ class LLStats:
             nodes = [n for n in nodes if n not in excl_nodes]
 
         chan_num = CHAN_NUMOF if all_chan else (CHAN_NUMOF - 3)
-        curbin = self.ana.t["start"]
+        nodes, sums = self._chanbins(nodes, self.ana.t["start"], None, binsize,
+                                     chan_num, skip_first=True)
 
-        # get ids
-        tx = {n: [] for n in nodes}
-        ok = {n: [] for n in nodes}
         labels = []
-        for n in self.ana.nsort(tx):
-            if n not in nodes:
-                continue
-
+        for n in nodes:
             for c in range(chan_num):
-                tx[n].append([])
-                ok[n].append([])
                 if len(nodes) < 3:
                     labels.append("{} - CH{}".format(n, c))
                 else:
@@ -541,37 +568,9 @@ class LLStats:
                     else:
                         labels.append("")
 
-        for e in self.events:
-            if e["node"] not in nodes:
-                continue
-            if e["time"] <= self.ana.t["start"]:
-                continue
-            if e["time"] > curbin:
-                curbin += binsize
-
-                for n in tx:
-                    for i in range(len(tx[n])):
-                        tx[n][i].append(0)
-                        ok[n][i].append(0)
-
-            for c in range(chan_num):
-                tx[e["node"]][c][-1] += e["tx"][c]
-                ok[e["node"]][c][-1] += e["ok"][c]
-
-        data = []
-        for n in self.ana.nsort(tx):
-            for chan in range(len(tx[n])):        # channels
-                row = []
-                for b in range(len(tx[n][chan])):
-                    cnt = tx[n][chan][b]
-
-                    if cnt <= 1:
-                        row.append(0.0)
-                    elif cnt == 2:
-                        row.append(10.0)
-                    else:
-                        row.append(20.0)
-                data.append(row)
+        # one row per node and channel: 0.0 for up to 1 tx, 10.0 for 2, 20.0 above
+        cnt = sums[:, :, 0].transpose(0, 2, 1).reshape(len(nodes) * chan_num, -1)
+        data = np.select([cnt <= 1, cnt == 2], [0.0, 10.0], 20.0).tolist()
 
         xticks = np.arange(0, len(data[0]) + 1, 600 / binsize)
         xtick_lbl = ["{:.0f}s".format(t * binsize) for t in xticks]
@@ -589,94 +588,24 @@ class LLStats:
         self.ana.plotter.heatmap(info, [], labels, data)
 
 
-    def plot_conn_offset(self, nodes=None, fulltime=False, ylim=None):
-        if nodes == None:
-            nodes = self.ana.desc["used_nodes"]
-
-        data = []
-
-        styles = ["-", ":", "--"]
-
-        for n in self.conn_offset:
-
-            if n not in nodes:
-                continue
-
-
-            conns = max([len(a["anchors"]) for a in self.conn_offset[n]])
-            if conns < 2:
-                print("not enough conns -> {}".format(conns))
-                continue
-
-            style = styles.pop(0)
-            styles.append(style)
-
-            lines = {}
-            for i in range(conns):
-                for ip in range(i + 1, conns):
-                    lines["{}-{}".format(i, ip)] = {"x": [], "y": [],
-                         "style": style,
-                         "label": "{}: h{} to h{}".format(n, ip, i)}
-
-            # print("conns", conns)
-            # print(lines)
-
-            for offevt in self.conn_offset[n]:
-                if len(offevt["anchors"]) != conns:
-                    continue
-
-                if fulltime == False and (offevt["time"] < self.ana.t["start"] or offevt["time"] > self.ana.t["end"]):
-                    continue
-
-                for i in range(conns):
-                    for ip in range(i + 1, conns):
-                        diff = (offevt["anchors"][ip]["anchor"] - offevt["anchors"][i]["anchor"]) * 1000 / 32768
-                        if diff > 0:
-                            lines["{}-{}".format(i, ip)]["x"].append(offevt["time"] - self.ana.t["start"])
-                            lines["{}-{}".format(i, ip)]["y"].append(diff)
-
-            data.extend([lines[l] for l in lines])
-
-        if len(data) == 0:
-            print("no data")
-            return
-
-        xticks = np.arange(0, data[0]["x"][-1] * 0.01, (data[0]["x"][-1] - 0) / 10)
-        xtick_lbl = ["{:.0f}s".format(t) for t in xticks]
-
-        suff = "".join(["{}".format(n[-1]) for n in nodes])
-
-        info = {
-            "title": "Connection event anchor offset for {}".format(nodes),
-            "xlabel": "Experiment runtime [s]",
-            "ylabel": "Offset between anchors [in ms]",
-            "suffix": "connevt_offset_{}".format(suff),
-            "xticks": xticks,
-            "xtick_lbl": xtick_lbl,
-            "ylim": ylim,
-            "plotter": "line",
-        }
-
-        self.ana.plotter.linechart4(info, data)
-
-
     def plot_bufusage(self, nodes=None, timespan=[None, None], xlim=None):
-        if len(self.events) == 0:
+        if self.ll_num == 0:
             print("llstats: skipping plot_bufusage(), no LL events in log")
             return
 
         cfg = self.ana.plotsetup(nodes, None, timespan)
 
         data = []
-        numof = max([max([e["free"] for e in self.buf[n]]) for n in self.buf])
+        numof = int(self.buf.array()["free"].max())
 
-        for n in self.ana.nsort(self.buf):
+        for n in self.ana.nodes:
             if self.ana.plotter.filter(cfg, n, None):
                 continue
 
+            buf = self.buf.node(n)
             data.append({
-                "x": [e["time"] - self.ana.t["start"] for e in self.buf[n]],
-                "y": [numof - e["free"] for e in self.buf[n]],
+                "x": (buf["time"] - self.ana.t["start"]).tolist(),
+                "y": (numof - buf["free"]).tolist(),
                 "label": n,
             })
 
@@ -707,26 +636,16 @@ class LLStats:
 
         data = []
 
-        for n in self.ana.nsort(self.phy):
+        for n in self.ana.nodes:
             if self.ana.plotter.filter(cfg, n, None):
                 continue
 
-            line = {"x": [], "y": [], "label": f'{n}-{stat}'}
-            for evt in self.phy[n]:
-                # if self.ana.plotter.filter(cfg, None, evt["time"]):
-                #     continue
-                line["x"].append(self.ana.t_norm(evt["time"]))
-                line["y"].append(evt[f'{stat}_tim'] / evt["dur"] * 100)
-            data.append(line)
-
-            # self.phy[node].append({
-            #     "time": time,
-            #     "dur": int(m.group("dur")),
-            #     "rx_cnt": int(m.group("rx_cnt")),
-            #     "rx_tim": int(m.group("rx")),
-            #     "tx_cnt": int(m.group("tx_cnt")),
-            #     "tx_tim": int(m.group("tx")),
-            # })
+            phy = self.phy.node(n)
+            data.append({
+                "x": self.ana.t_norm(phy["time"]).tolist(),
+                "y": (phy[f'{stat}_tim'] / phy["dur"] * 100).tolist(),
+                "label": f'{n}-{stat}',
+            })
 
         xt = self.ana.plotter.get_ticks([l["x"] for l in data], xlim)
         info = {
@@ -748,38 +667,21 @@ class LLStats:
     def plot_phy_usage_sum(self, stat=["rx", "tx", "aggr"], nodes=None, binsize=15.0, timespan=[None, None]):
         cfg = self.ana.plotsetup(nodes, binsize, timespan)
 
+        phy = self.phy.select(cfg["nodes"], cfg["first"], cfg["last"])
         data = []
         for s in stat:
-            data.append({"x": [], "y": [], "label": f'{s.upper()}'})
-
-        curbin = cfg["first"]
-        cnt = [[] for _ in range(len(stat))]
-        for evt in self.phy_all:
-            if self.ana.plotter.filter(cfg, evt["node"], evt["time"]):
-                continue
-
-            if evt["time"] >= curbin + cfg["binsize"]:
-                for i, s in enumerate(stat):
-                    data[i]["x"].append(self.ana.t_norm(curbin))
-                    if len(cnt[i]) > 0:
-                        data[i]["y"].append((sum(cnt[i]) / len(cnt[i])) * 100)
-                    else:
-                        data[i]["y"].append(0.0)
-                    cnt[i] = []
-                curbin += cfg["binsize"]
-
-            for i, s in enumerate(stat):
-                if s == "aggr":
-                    cnt[i].append((evt["rx_tim"] + evt["tx_tim"]) / evt["dur"])
-                else:
-                    cnt[i].append(evt[f'{s}_tim'] / evt["dur"])
-
-        for i, s in enumerate(stat):
-            data[i]["x"].append(self.ana.t_norm(curbin))
-            if len(cnt[i]) > 0:
-                data[i]["y"].append((sum(cnt[i]) / len(cnt[i])) * 100)
+            if s == "aggr":
+                usage = (phy["rx_tim"] + phy["tx_tim"]) / phy["dur"]
             else:
-                data[i]["y"].append(0.0)
+                usage = phy[f'{s}_tim'] / phy["dur"]
+            bins, sums, cnt = binsums(phy["time"], usage, cfg["first"], cfg["binsize"])
+            avg = np.zeros(len(sums))
+            np.divide(sums, cnt, out=avg, where=(cnt > 0))
+            data.append({
+                "x": [self.ana.t_norm(t) for t in bins],
+                "y": (avg * 100).tolist(),
+                "label": f'{s.upper()}',
+            })
 
         xt = self.ana.plotter.get_ticks([l["x"] for l in data], None)
         info = {
@@ -802,16 +704,15 @@ class LLStats:
 
         data = []
 
-        for n in self.ana.nsort(self.phy):
+        for n in self.ana.nodes:
             if self.ana.plotter.filter(cfg, n, None):
                 continue
-            line = {"x": [], "y": [], "label": f'{n}-{stat}'}
-            for evt in self.phy[n]:
-                # if self.ana.plotter.filter(cfg, None, evt["time"]):
-                #     continue
-                line["x"].append(self.ana.t_norm(evt["time"]))
-                line["y"].append(evt[f'{stat}_cnt'] * 1000000 / evt["dur"])
-            data.append(line)
+            phy = self.phy.node(n)
+            data.append({
+                "x": self.ana.t_norm(phy["time"]).tolist(),
+                "y": (phy[f'{stat}_cnt'].astype(np.int64) * 1000000 / phy["dur"]).tolist(),
+                "label": f'{n}-{stat}',
+            })
 
         xt = self.ana.plotter.get_ticks([l["x"] for l in data], xlim)
         info = {
@@ -832,31 +733,20 @@ class LLStats:
     def plot_phy_cnt_sum(self, stat=["rx", "tx", "aggr"], nodes=None, binsize=15.0, timespan=[None, None]):
         cfg = self.ana.plotsetup(nodes, binsize, timespan)
 
+        phy = self.phy.select(cfg["nodes"], cfg["first"], cfg["last"])
         data = []
         for s in stat:
-            data.append({"x": [], "y": [], "label": f'{s.upper()}'})
-
-        curbin = cfg["first"]
-        cnt = [0 for _ in range(len(stat))]
-        for evt in self.phy_all:
-            if self.ana.plotter.filter(cfg, evt["node"], evt["time"]):
-                continue
-
-            if evt["time"] >= curbin + cfg["binsize"]:
-                for i, s in enumerate(stat):
-                    data[i]["x"].append(self.ana.t_norm(curbin))
-                    data[i]["y"].append(cnt[i])
-                    cnt[i] = 0
-                curbin += cfg["binsize"]
-            for i, s in enumerate(stat):
-                if s == "aggr":
-                    cnt[i] += (evt["rx_cnt"] + evt["tx_cnt"]) * 1000000 / evt["dur"]
-                else:
-                    cnt[i] += evt[f'{s}_cnt'] * 1000000 / evt["dur"]
-
-        for i, s in enumerate(stat):
-            data[i]["x"].append(self.ana.t_norm(curbin))
-            data[i]["y"].append(cnt[i])
+            if s == "aggr":
+                evts = phy["rx_cnt"].astype(np.int64) + phy["tx_cnt"]
+            else:
+                evts = phy[f'{s}_cnt'].astype(np.int64)
+            bins, sums, _ = binsums(phy["time"], evts * 1000000 / phy["dur"],
+                                    cfg["first"], cfg["binsize"])
+            data.append({
+                "x": [self.ana.t_norm(t) for t in bins],
+                "y": sums.tolist(),
+                "label": f'{s.upper()}',
+            })
 
         xt = self.ana.plotter.get_ticks([l["x"] for l in data], None)
         info = {
@@ -875,18 +765,14 @@ class LLStats:
 
 
     def plot_phy_verify(self):
-        for n in self.ana.nsort(self.phy):
+        for n in self.ana.nodes:
+            phy = self.phy.node(n)
+            x = self.ana.t_norm(phy["time"]).tolist()
             data = [
-                {"x": [], "y": [], "label": "Diff RX"},
-                {"x": [], "y": [], "label": "Diff TX"},
+                {"x": x, "y": (phy["rx_cnt"] - phy["rx_cnt_off"]).tolist(), "label": "Diff RX"},
+                {"x": x, "y": (phy["tx_cnt"] - phy["tx_cnt_off"]).tolist(), "label": "Diff TX"},
             ]
 
-            for evt in self.phy[n]:
-                data[0]["x"].append(self.ana.t_norm(evt["time"]))
-                data[0]["y"].append(evt["rx_cnt"] - evt["rx_cnt_off"])
-                data[1]["x"].append(self.ana.t_norm(evt["time"]))
-                data[1]["y"].append(evt["tx_cnt"] - evt["tx_cnt_off"])
-
             xt = self.ana.plotter.get_ticks([l["x"] for l in data], None)
             info = {
                 "title": "PHY Count Diff(Node: {})".format(n),
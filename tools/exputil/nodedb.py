@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import os
+import sys
+import yaml
+import pickle
+
+VERSION = 1
+ADDRS = ("addr_mac", "addr_l2", "addr_ip")
+
+# use the C implementation of the YAML parser if available
+Loader = getattr(yaml, "CBaseLoader", yaml.BaseLoader)
+
+
+class Nodedb:
+    '''
+    Node configuration (nodes.yml) with hash indexes for reverse address
+    lookups.
+
+    nodes.yml is compiled once into a pickle in DIR_TEMP, which is rebuilt
+    whenever nodes.yml changes. The configuration of the nodes of the used
+    site(s) is kept in `nodecfg`, and the MAC, L2 and IPv6 addresses of these
+    nodes are indexed. Address changes must go through setval() to keep the
+    indexes in sync.
+    '''
+
+    def __init__(self, file, tmpdir, nodecfg):
+        self.file = file
+        self.cache = os.path.join(tmpdir, f'nodedb-{VERSION}.pickle')
+        self.nodecfg = nodecfg
+        self.index = {key: {} for key in ADDRS}     # addr -> set of nodes
+        self.sites = None
+
+
+    def stamp(self):
+        st = os.stat(self.file)
+        return [st.st_size, st.st_mtime_ns]
+
+
+    def load(self):
+        if self.sites != None:
+            return self.sites
+
+        stamp = self.stamp()
+        try:
+            with open(self.cache, "rb") as f:
+                db = pickle.load(f)
+            if db["stamp"] == stamp:
+                self.sites = db["sites"]
+                return self.sites
+        except (OSError, EOFError, KeyError, pickle.UnpicklingError):
+            pass
+
+        try:
+            with open(self.file, "r", encoding="utf-8") as f:
+                self.sites = yaml.load(f, Loader=Loader)
+        except Exception as e:
+            sys.exit("Error: unable to load file {}: {}".format(self.file, e))
+
+        tmp = f'{self.cache}.{os.getpid()}'
+        with open(tmp, "wb") as f:
+            pickle.dump({"stamp": stamp, "sites": self.sites}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.cache)
+        return self.sites
+
+
+    def add_site(self, site):
+        for node, cfg in self.load()[site].items():
+            self.update(node, cfg)
+
+
+    def update(self, node, cfg):
+        '''
+        Set the configuration of `node`, replacing the given keys
+        '''
+        if node not in self.nodecfg:
+            self.nodecfg[node] = {}
+        for key, val in cfg.items():
+            self.setval(node, key, val)
+
+
+    def setval(self, node, key, val):
+        cfg = self.nodecfg[node]
+        if key in self.index:
+            if key in cfg:
+                nodes = self.index[key][cfg[key]]
+                nodes.discard(node)
+                if len(nodes) == 0:
+                    del self.index[key][cfg[key]]
+            self.index[key].setdefault(val, set()).add(node)
+        cfg[key] = val
+
+
+    def lookup(self, key, addr):
+        '''
+        Get the node using the given address, None if there is none
+        '''
+        nodes = self.index[key].get(addr)
+        if not nodes:
+            return None
+        # same as scanning the sorted node list in case of duplicates
+        return min(nodes)
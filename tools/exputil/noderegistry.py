@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import numpy as np
+
+
+def idarray(ids, names, missing=-1):
+    '''
+    Array of the ids of the given node names in the name -> id map `ids`,
+    `missing` for names not in the map
+    '''
+    return np.fromiter((ids.get(n, missing) for n in names), dtype=np.int32,
+                       count=len(names))
+
+
+def nodes_sort(name):
+    '''
+    Sort key giving the canonical node order, e.g. nrf52dk-2 before nrf52dk-10
+    '''
+    if "-" in name:
+        return (len(name) * 100) + int(name.split("-")[-1])
+    else:
+        return (len(name) * 10000)
+
+
+class NodeRegistry:
+    '''
+    Dense integer ids for the nodes of an experiment.
+
+    Ids are assigned to the used nodes in their canonical order, so per node
+    state can be held in arrays indexed by id, and iterating over the ids
+    yields the nodes in sorted order. The sort keys of the used nodes are
+    computed once, other names (e.g. 'sum' rows) are sorted the same way.
+
+    Analyzers convert between names and ids in bulk with idarray() and
+    namelist(), e.g. when reading cached columns or selecting nodes.
+    '''
+
+    def __init__(self, names):
+        self.names = sorted(set(names), key=nodes_sort)
+        self.ids = {n: i for i, n in enumerate(self.names)}
+        self.keys = {n: nodes_sort(n) for n in self.names}
+
+
+    def __len__(self):
+        return len(self.names)
+
+
+    def __iter__(self):
+        return iter(self.names)
+
+
+    def __contains__(self, name):
+        return name in self.ids
+
+
+    def id(self, name):
+        return self.ids[name]
+
+
+    def name(self, node_id):
+        return self.names[node_id]
+
+
+    def idarray(self, names, missing=-1):
+        return idarray(self.ids, names, missing)
+
+
+    def namelist(self, ids):
+        names = self.names
+        return [names[i] for i in ids]
+
+
+    def sortkey(self, name):
+        key = self.keys.get(name)
+        if key is None:
+            return nodes_sort(name)
+        return key
+
+
+    def sort(self, names):
+        return sorted(names, key=self.sortkey)
@@ -23,10 +23,15 @@ import re
 import sys
 import copy
 import numpy as np
+from tools.exputil.evtcache import strcodes, strlist
 
 STATS = ["TX", "RX", "FW"]
 
 class Procdelay:
+
+    PREFIXES = ["*"]
+    VERSION = 1
+
     def __init__(self, ana):
         self.ana = ana
 
@@ -39,6 +44,31 @@ class Procdelay:
             self.delay[node][m.group("type")].append(int(m.group("time")))
 
 
+    def getpart(self):
+        return {"delay": self.delay}
+
+
+    def merge(self, part):
+        for n in part["delay"]:
+            for t in part["delay"][n]:
+                self.delay[n][t] += part["delay"][n][t]
+
+
+    def getcols(self):
+        vals = [(n, t, d) for n in self.delay for t in self.delay[n] for d in self.delay[n][t]]
+        cols = {"delay": np.array([d for _, _, d in vals], dtype=np.int64)}
+        cols["node_names"], cols["node"] = strcodes([n for n, _, _ in vals])
+        cols["type_names"], cols["type"] = strcodes([t for _, t, _ in vals])
+        return cols
+
+
+    def readcols(self, cols):
+        for n, t, d in zip(strlist(cols["node_names"], cols["node"]),
+                           strlist(cols["type_names"], cols["type"]),
+                           cols["delay"].tolist()):
+            self.delay[n][t].append(d)
+
+
     def finish(self):
         pass
 
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import numpy as np
+from tools.exputil.timeindex import Timeindex
+
+CAPACITY = 1024     # initial number of samples
+
+
+def timebins(time, first, binsize, closed="left"):
+    '''
+    Bin the given times into bins of `binsize` starting at `first`. A time on
+    an edge goes into the bin starting (closed="left") or ending
+    (closed="right") there. Returns the edges and the bin of each time.
+    '''
+    num = int((time.max() - first) // binsize) + 2 if len(time) > 0 else 1
+    # sum up the edges as the plots always did, so the labels stay the same
+    edges = np.add.accumulate(np.r_[first, np.full(num, binsize)])
+    side = "right" if closed == "left" else "left"
+    return edges, np.searchsorted(edges, time, side=side) - 1
+
+
+def binsums(time, vals, first, binsize):
+    '''
+    Sum up `vals` per time bin (see timebins()), for all bins from `first`
+    up to the last bin holding a value. Returns the bin starts, the sums and
+    the number of values per bin.
+    '''
+    edges, bins = timebins(time, first, binsize)
+    num = max(bins.max() + 1 if len(bins) > 0 else 0, 1)
+    # bincount() adds up the values in their order, same as a running sum
+    sums = np.bincount(bins, weights=vals, minlength=num)
+    cnt = np.bincount(bins, minlength=num)
+    return edges[:num].tolist(), sums, cnt
+
+
+class Samples:
+    '''
+    Time stamped samples of the nodes in a growable numpy structured array.
+
+    Each sample holds its time, its node (as id into the NodeRegistry) and
+    the given `fields`. The samples are kept in the order they were added,
+    per node access goes through a time index on the samples, so there are
+    no per node copies.
+    '''
+
+    def __init__(self, nodes, fields):
+        self.nodes = nodes
+        self.dtype = np.dtype([("time", np.float64), ("node", np.int32)] + list(fields))
+        self.num = 0
+        self.data = np.zeros(CAPACITY, dtype=self.dtype)
+        self._index = None
+
+
+    def __len__(self):
+        return self.num
+
+
+    def _alloc(self, size):
+        data = np.zeros(size, dtype=self.dtype)
+        data[:self.num] = self.data[:self.num]
+        self.data = data
+
+
+    def add(self, time, node, *vals):
+        if self.num == len(self.data):
+            self._alloc(2 * self.num)
+        self.data[self.num] = (time, self.nodes.id(node)) + vals
+        self.num += 1
+
+
+    def extend(self, data):
+        num = self.num + len(data)
+        if num > len(self.data):
+            self._alloc(max(num, 2 * len(self.data)))
+        self.data[self.num:num] = data
+        self.num = num
+
+
+    def array(self):
+        return self.data[:self.num]
+
+
+    def index(self):
+        if self._index is None or self._index[0] != self.num:
+            self._index = (self.num, Timeindex(self.data["node"][:self.num].tolist(),
+                                               self.data["time"][:self.num]))
+        return self._index[1]
+
+
+    def select(self, nodes=None, first=None, last=None):
+        '''
+        Samples of `nodes` (all if None) with first <= time <= last, in the
+        order they were added
+        '''
+        if nodes is not None:
+            ids = self.nodes.idarray(nodes)
+            nodes = ids[ids >= 0].tolist()
+        return self.data[self.index().positions(nodes, first, last)]
+
+
+    def node(self, name):
+        return self.select([name])
+
+
+    def reduce(self, field, ufunc):
+        '''
+        Reduce `field` per node with the given ufunc (e.g. np.minimum), returns
+        a dict node -> value for the nodes having samples
+        '''
+        index = self.index()
+        spans = sorted((a, self.nodes.name(n)) for n, (a, b) in index.span.items() if b > a)
+        if len(spans) == 0:
+            return {}
+        vals = self.data[field][:self.num][index.order]
+        if vals.dtype.kind in "iu":
+            vals = vals.astype(np.int64)
+        res = ufunc.reduceat(vals, [a for a, _ in spans])
+        return dict(zip([n for _, n in spans], res.tolist()))
+
+
+    def count(self):
+        '''
+        Number of samples per node, for the nodes having samples
+        '''
+        return {self.nodes.name(n): int(b - a) for n, (a, b) in self.index().span.items() if b > a}
+
+
+    def getcols(self, prefix):
+        cols = {f'{prefix}{key}': self.data[key][:self.num] for key in self.dtype.names}
+        cols[f'{prefix}node_names'] = np.array(self.nodes.names, dtype=str)
+        return cols
+
+
+    def readcols(self, cols, prefix):
+        data = np.zeros(len(cols[f'{prefix}time']), dtype=self.dtype)
+        for key in self.dtype.names:
+            data[key] = cols[f'{prefix}{key}']
+        ids = self.nodes.idarray(cols[f'{prefix}node_names'].tolist())
+        data["node"] = ids[data["node"]]
+        self.extend(data)
+
+
+    def todict(self):
+        res = {key: self.data[key][:self.num].tolist() for key in self.dtype.names}
+        res["node"] = self.nodes.namelist(res["node"])
+        return res
+
+
+    def fromdict(self, samples):
+        data = np.zeros(len(samples["time"]), dtype=self.dtype)
+        for key in self.dtype.names:
+            if key == "node":
+                data[key] = self.nodes.idarray(samples[key])
+            else:
+                data[key] = samples[key]
+        self.extend(data)
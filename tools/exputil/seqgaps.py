@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import math
+import numpy as np
+from tools.exputil.latsketch import Latsketch
+
+STALL_FACTOR = 2.0          # a send gap of this many intervals is a stall
+STALL_MIN = 0.05            # stall candidates if the interval is unknown [s]
+
+
+def ranges(values):
+    '''
+    Compact a sorted array of integers to a list of [first, last] ranges
+    '''
+    if len(values) == 0:
+        return []
+    cut = np.flatnonzero(np.diff(values) > 1)
+    first = values[np.r_[0, cut + 1]]
+    last = values[np.r_[cut, len(values) - 1]]
+    return np.stack((first, last), axis=1).tolist()
+
+
+def union(a, b):
+    # union of two lists of [first, last] ranges, adjacent ranges are joined
+    res = []
+    for first, last in sorted(a + b):
+        if len(res) > 0 and first <= res[-1][1] + 1:
+            res[-1][1] = max(res[-1][1], last)
+        else:
+            res.append([first, last])
+    return res
+
+
+class Seqgaps:
+    '''
+    Sequence gaps and send timing of the producers.
+
+    Each producer sends consecutive sequence numbers, one every `itvl`
+    seconds plus some jitter. Per producer (by its id, the 'a' in 'a>bbb')
+    this keeps:
+    - runs: [first seq, last seq, first t_tx, last t_tx] of each block of
+      consecutively sent (A_TX) sequence numbers
+    - err: ranges of sequence numbers with a send error (A_TX_ER)
+    - lost: ranges of sequence numbers sent but never received (A_RX)
+    - the send intervals within the runs, as count, sum, sum of squares and
+      a Latsketch
+    - stalls: [t_tx before, t_tx after, seq before] of each send interval
+      longer than STALL_FACTOR * itvl
+
+    Everything is kept as ranges, so the size depends on the number of gaps
+    and not on the number of flows, and states of different parts of a log
+    merge. If `itvl` is not known, the mean send interval is used instead.
+    As it is only known in the end, all send intervals longer than STALL_MIN
+    are kept as candidates for stalls and report() picks the stalls among
+    them, so the result does not depend on how the flows were added.
+    '''
+
+    def __init__(self, itvl=None):
+        self.itvl = itvl
+        self.prod = {}          # producer id -> state, see _state()
+
+
+    def _state(self, prod, node):
+        state = self.prod.get(prod)
+        if state is None:
+            state = {"node": node, "runs": [], "err": [], "lost": [],
+                     "cnt": 0, "sum": 0.0, "sq": 0.0, "sketch": Latsketch(),
+                     "stalls": []}
+            self.prod[prod] = state
+        elif state["node"] is None:
+            state["node"] = node
+        return state
+
+
+    def _intervals(self, state, dt, t_before, seq_before):
+        state["cnt"] += len(dt)
+        state["sum"] += float(dt.sum())
+        state["sq"] += float((dt ** 2).sum())
+        state["sketch"].add(dt)
+        long = dt > (STALL_MIN if self.itvl is None else STALL_FACTOR * self.itvl)
+        state["stalls"] += np.stack((t_before[long], t_before[long] + dt[long],
+                                     seq_before[long]), axis=1).tolist()
+
+
+    def add(self, prod, seqno, node, t_tx, sent, err, rcvd):
+        '''
+        Add flows given as arrays: producer id, sequence number, name of the
+        source node (or None), first t_tx and whether each flow was sent,
+        had a send error and was received
+        '''
+        prod = np.asarray(prod, dtype=np.int64)
+        seqno = np.asarray(seqno, dtype=np.int64)
+        order = np.lexsort((seqno, prod))
+        prod, seqno, t_tx = prod[order], seqno[order], np.asarray(t_tx)[order]
+        sent, err, rcvd = sent[order], err[order], rcvd[order]
+        node = [node[i] for i in order.tolist()]
+
+        bounds = np.flatnonzero(np.diff(prod)) + 1
+        for a, b in zip(np.r_[0, bounds], np.r_[bounds, len(prod)]):
+            if a == b:
+                continue
+            state = self._state(int(prod[a]), next((n for n in node[a:b] if n is not None), None))
+            seq = seqno[a:b][sent[a:b]]
+            t = t_tx[a:b][sent[a:b]]
+
+            # runs of consecutive sequence numbers and the intervals within them
+            cut = np.flatnonzero(np.diff(seq) != 1)
+            first = np.r_[0, cut + 1]
+            last = np.r_[cut, len(seq) - 1]
+            if len(seq) > 0:
+                runs = np.stack((seq[first], seq[last], t[first], t[last]), axis=1)
+                state["runs"] = self._join(state, state["runs"] + runs.tolist())
+            inner = np.ones(max(len(seq) - 1, 0), dtype=bool)
+            inner[cut] = False
+            dt = np.diff(t)[inner]
+            self._intervals(state, dt, t[:-1][inner], seq[:-1][inner])
+
+            state["err"] = union(state["err"], ranges(seqno[a:b][err[a:b]]))
+            state["lost"] = union(state["lost"], ranges(seqno[a:b][sent[a:b] & ~rcvd[a:b]]))
+
+
+    def _join(self, state, runs):
+        # sort runs and join the ones continuing each other, the interval
+        # between them is a send interval as any other
+        res = []
+        for run in sorted(runs):
+            prev = res[-1] if len(res) > 0 else None
+            if prev is not None and run[0] == prev[1] + 1:
+                dt = np.array([run[2] - prev[3]])
+                self._intervals(state, dt, np.array([prev[3]]), np.array([prev[1]]))
+                prev[1], prev[3] = run[1], run[3]
+            else:
+                res.append(list(run))
+        return res
+
+
+    def merge(self, other):
+        for prod, o in other.prod.items():
+            state = self._state(prod, o["node"])
+            for key in ("cnt", "sum", "sq"):
+                state[key] += o[key]
+            state["sketch"].merge(o["sketch"])
+            state["stalls"] += o["stalls"]
+            state["err"] = union(state["err"], o["err"])
+            state["lost"] = union(state["lost"], o["lost"])
+            state["runs"] = self._join(state, state["runs"] + o["runs"])
+
+
+    def report(self, t_ref=0):
+        '''
+        Get per producer: sequence numbers sent and the missing (never sent
+        or not logged), errored and lost ones as ranges, the jitter of the
+        send intervals against `itvl` in ms and the stalls as [begin, end]
+        relative to `t_ref`. If `itvl` is not known, the jitter only holds the
+        mean interval ("itvl") and its standard deviation, the deviations
+        from the interval are None.
+        '''
+        res = {}
+        for prod in sorted(self.prod):
+            state = self.prod[prod]
+            runs = state["runs"]
+            missing = [[int(a[1]) + 1, int(b[0]) - 1] for a, b in zip(runs, runs[1:])
+                       if b[0] > a[1] + 1]
+            itvl = self.itvl
+            if itvl is None and state["cnt"] > 0:
+                itvl = state["sum"] / state["cnt"]
+            jitter = None
+            if state["cnt"] > 0:
+                mean = state["sum"] / state["cnt"]
+                var = max(state["sq"] / state["cnt"] - mean ** 2, 0.0)
+                jitter = {"itvl": itvl * 1000, "std": math.sqrt(var) * 1000}
+                # against the mean interval itself, these would always be ~0
+                dev = {
+                    "mean": mean,
+                    "min": state["sketch"].min,
+                    "p5": state["sketch"].quantile(0.05),
+                    "p95": state["sketch"].quantile(0.95),
+                    "max": state["sketch"].max,
+                }
+                for key, val in dev.items():
+                    jitter[key] = None if self.itvl is None else (val - itvl) * 1000
+            stalls = [] if itvl is None else sorted(
+                [s[0] - t_ref, s[1] - t_ref] for s in state["stalls"]
+                if s[1] - s[0] > STALL_FACTOR * itvl)
+            res[prod] = {
+                "node": state["node"],
+                "first": int(runs[0][0]) if len(runs) > 0 else None,
+                "last": int(runs[-1][1]) if len(runs) > 0 else None,
+                "sent": sum(int(r[1] - r[0]) + 1 for r in runs),
+                "missing": missing,
+                "err": state["err"],
+                "lost": state["lost"],
+                "jitter": jitter,
+                "stalls": stalls,
+            }
+        return res
+
+
+    def todict(self):
+        return {
+            "itvl": self.itvl,
+            "prod": {str(prod): dict(state, sketch=state["sketch"].todict())
+                     for prod, state in self.prod.items()},
+        }
+
+
+    @classmethod
+    def fromdict(cls, raw):
+        gaps = cls(raw["itvl"])
+        for prod, state in raw["prod"].items():
+            gaps.prod[int(prod)] = dict(state, sketch=Latsketch.fromdict(state["sketch"]))
+        return gaps
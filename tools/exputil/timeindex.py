@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2019 Hauke Petersen <hauke.petersen@fu-berlin.de>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA
+
+import numpy as np
+
+
+class Timeindex:
+    '''
+    Per node, time sorted index of a set of records.
+
+    The records are given by their node and their time. They are sorted by
+    node and, within a node, by time, so a range query bisects the times of
+    each requested node and only touches the records it returns. Queries
+    yield the positions of the matching records in their original order, so
+    code walking them sees the same sequence as a filtered scan over all
+    records.
+    '''
+
+    def __init__(self, node, time):
+        codes = {}
+        time = np.asarray(time, dtype=np.float64)
+        node = np.fromiter((codes.setdefault(n, len(codes)) for n in node),
+                           dtype=np.int64, count=len(time))
+        self.order = np.lexsort((time, node))
+        self.time = time[self.order]
+        bounds = np.searchsorted(node[self.order], np.arange(len(codes) + 1))
+        self.span = {n: (bounds[c], bounds[c + 1]) for n, c in codes.items()}
+
+
+    @classmethod
+    def fromrecords(cls, records, node="node", time="time"):
+        '''
+        Index a list of dicts, node=None puts all records into one group
+        '''
+        nodes = [None] * len(records) if node is None else [r[node] for r in records]
+        return cls(nodes, [r[time] for r in records])
+
+
+    def positions(self, nodes=None, first=None, last=None):
+        '''
+        Positions of the records of `nodes` (all if None) with
+        first <= time <= last, an open end if first or last is None
+        '''
+        parts = []
+        for n in (self.span if nodes is None else dict.fromkeys(nodes)):
+            if n not in self.span:
+                continue
+            a, b = self.span[n]
+            t = self.time[a:b]
+            lo = 0 if first is None else np.searchsorted(t, first, side="left")
+            hi = len(t) if last is None else np.searchsorted(t, last, side="right")
+            parts.append(self.order[a + lo:a + hi])
+
+        if len(parts) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts))
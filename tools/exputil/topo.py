@@ -22,11 +22,16 @@ import re
 import os
 import sys
 import statistics
+import numpy as np
+from tools.exputil.evtcache import strcodes, strlist
 
 MAX_CONNS = 20
 
 class Topo:
 
+    PREFIXES = ["ble:"]
+    VERSION = 1
+
     def __init__(self, ana):
         self.ana = ana
 
@@ -57,7 +62,12 @@ class Topo:
             "handle": handle,
         })
 
-        if evt == self.evt_map["conn"]:
+
+    def apply(self, evt):
+        node = evt["node"]
+        peer = evt["peer"]
+
+        if evt["type"] == self.evt_map["conn"]:
             self.topo[node]["c"].add(peer)
             self.topo[peer]["p"].add(node)
 
@@ -69,8 +79,8 @@ class Topo:
         # elif "conn" in evt:
         #     self.conns[node][handle] = {"peer": peer, "role": "M"}
 
-        if evt == self.evt_map["close"]:
-            self.topo[peer]["lost"].append(float(time))
+        if evt["type"] == self.evt_map["close"]:
+            self.topo[peer]["lost"].append(float(evt["t"]))
             self.topo[node]["c"].remove(peer)
             self.topo[peer]["p"].remove(node)
             self.topo[peer]["hops"] = -1
@@ -105,7 +115,52 @@ class Topo:
             self.parse_meshconn(time, m.group("evt"), node, peer, int(m.group("handle")))
 
 
+    def getpart(self):
+        return {"conn_evt": self.conn_evt, "meshconn": self.meshconn}
+
+
+    def merge(self, part):
+        self.conn_evt += part["conn_evt"]
+        self.meshconn += part["meshconn"]
+
+
+    def getcols(self):
+        cols = {
+            "t": np.array([e["t"] for e in self.conn_evt], dtype=np.float64),
+            "handle": np.array([e["handle"] for e in self.conn_evt], dtype=np.int64),
+            "mesh_time": np.array([e["time"] for e in self.meshconn], dtype=np.float64),
+            "mesh_handle": np.array([e["handle"] for e in self.meshconn], dtype=np.int64),
+        }
+        for key in ("type", "node", "peer"):
+            cols[f'{key}_names'], cols[key] = strcodes([e[key] for e in self.conn_evt])
+        for key in ("evt", "node", "peer"):
+            cols[f'mesh_{key}_names'], cols[f'mesh_{key}'] = strcodes([e[key] for e in self.meshconn])
+        return cols
+
+
+    def readcols(self, cols):
+        evts = zip(cols["t"].tolist(),
+                   strlist(cols["type_names"], cols["type"]),
+                   strlist(cols["node_names"], cols["node"]),
+                   strlist(cols["peer_names"], cols["peer"]),
+                   cols["handle"].tolist())
+        for time, evt, node, peer, handle in evts:
+            self.evt(time, evt, node, peer, handle)
+
+        evts = zip(cols["mesh_time"].tolist(),
+                   strlist(cols["mesh_evt_names"], cols["mesh_evt"]),
+                   strlist(cols["mesh_node_names"], cols["mesh_node"]),
+                   strlist(cols["mesh_peer_names"], cols["mesh_peer"]),
+                   cols["mesh_handle"].tolist())
+        for time, evt, node, peer, handle in evts:
+            self.parse_meshconn(time, evt, node, peer, handle)
+
+
     def finish(self):
+        # replay all connection events in order to get the final topology
+        for evt in self.conn_evt:
+            self.apply(evt)
+
         # update hop count for final topology
         tmp = [n for n in self.topo if len(self.topo[n]["p"]) == 0 and len(self.topo[n]["c"]) > 0]
         for n in tmp:
@@ -132,6 +187,10 @@ class Topo:
         self.print_topo()
 
         hopcnt = [self.topo[n]["hops"] for n in self.topo if self.topo[n]["hops"] > 0]
+        if len(hopcnt) == 0:
+            # e.g. a time window not including the connection setup
+            self.ana.statwrite("\nHopcnt: no topology information\n")
+            return
         self.ana.statwrite(f'\nHopcnt max    {max(hopcnt):>7}')
         self.ana.statwrite(f'Hopcnt avg    {sum(hopcnt) / len(hopcnt):>7.3f}')
         self.ana.statwrite(f'Hopcnt mean   {statistics.mean(hopcnt):>7.3f}')
@@ -216,9 +275,7 @@ class Topo:
         ]
         topo = {n: None for n in self.ana.desc["used_nodes"]}
 
-        for evt in self.conn_evt:
-            if self.ana.plotter.filter(cfg, None, evt["t"]):
-                continue
+        for evt in self.ana.select(self.conn_evt, None, cfg["first"], cfg["last"], time="t"):
 
             if evt["type"] == self.evt_map["conn"]:
                 topo[evt["peer"]] = evt["node"]
@@ -277,9 +334,7 @@ class Topo:
         ]
         hops = {n: 0.0 for n in self.ana.desc["used_nodes"]}
 
-        for evt in self.meshconn:
-            if self.ana.plotter.filter(cfg, None, evt["time"]):
-                continue
+        for evt in self.ana.select(self.meshconn, None, cfg["first"], cfg["last"]):
 
             node = evt["node"]
             peer = evt["peer"]
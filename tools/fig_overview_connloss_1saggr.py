@@ -32,7 +32,7 @@ import numpy as np
 from datetime import datetime
 from tools.exputil.ana import Ana
 from tools.exputil.topo import Topo
-from tools.exputil.expstats import Expstats
+from tools.exputil.expstats import Expstats, FLOW_HORIZON
 from tools.exputil.llstats import LLStats
 from tools.exputil.alive import Alive
 from tools.exputil.ifconfigval import Ifconfigval
@@ -122,11 +122,15 @@ class Results(Ana):
     def __init__(self, logfile):
         super().__init__(logfile)
 
-        self.expstats = Expstats(self)
+        self.expstats = Expstats(self, Expstats.retention(["overview"]), FLOW_HORIZON)
         self.llstats = LLStats(self)
         self.topo = Topo(self)
 
-        self.parse_log(self.update)
+        self.router.add(self.expstats)
+        self.router.add(self.llstats)
+        self.router.add(self.topo)
+
+        self.parse_log_cached()
 
         self.expstats.finish()
         self.llstats.finish()
@@ -135,12 +139,6 @@ class Results(Ana):
         self.write_overview(self.llstats, self.expstats, self.topo)
 
 
-    def update(self, time, node, line):
-        self.expstats.update(time, node, line)
-        self.llstats.update(time, node, line)
-        self.topo.update(time, node, line)
-
-
 class Fig(Expbase):
     def __init__(self):
         super().__init__()
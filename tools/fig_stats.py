@@ -32,12 +32,13 @@ import numpy as np
 from datetime import datetime
 from tools.exputil.ana import Ana
 from tools.exputil.topo import Topo
-from tools.exputil.expstats import Expstats
+from tools.exputil.expstats import Expstats, FLOW_HORIZON
 from tools.exputil.llstats import LLStats
 from tools.exputil.alive import Alive
 from tools.exputil.ifconfigval import Ifconfigval
 from tools.exputil.plotter import Plotter
 from tools.exputil.expbase import Expbase
+from tools.exputil.latsketch import Latsketch
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -372,11 +373,15 @@ class Results(Ana):
     def __init__(self, logfile):
         super().__init__(logfile)
 
-        self.expstats = Expstats(self)
+        self.expstats = Expstats(self, Expstats.retention(["overview"]), FLOW_HORIZON)
         self.llstats = LLStats(self)
         self.topo = Topo(self)
 
-        self.parse_log(self.update)
+        self.router.add(self.expstats)
+        self.router.add(self.llstats)
+        self.router.add(self.topo)
+
+        self.parse_log_cached()
 
         self.expstats.finish()
         self.llstats.finish()
@@ -385,12 +390,6 @@ class Results(Ana):
         self.write_overview(self.llstats, self.expstats, self.topo)
 
 
-    def update(self, time, node, line):
-        self.expstats.update(time, node, line)
-        self.llstats.update(time, node, line)
-        self.topo.update(time, node, line)
-
-
 
 class Fig(Expbase):
     def __init__(self):
@@ -458,7 +457,7 @@ class Fig(Expbase):
             if pitvl not in data:
                 data[pitvl] = {}
             if citvl not in data[pitvl]:
-                data[pitvl][citvl] = {"reconns": [], "pdr_app": [], "pdr_ll": [], "latency": []}
+                data[pitvl][citvl] = {"reconns": [], "pdr_app": [], "pdr_ll": [], "latency": Latsketch()}
 
             if self.raw[cfg]["pdr_ll"] < 0:
                 sys.exit(f'INPUT error: {cfg} has broken ll_pdr: {self.raw[cfg]["pdr_ll"]}')
@@ -466,15 +465,24 @@ class Fig(Expbase):
             data[pitvl][citvl]["reconns"].append(self.raw[cfg]["reconns"])
             data[pitvl][citvl]["pdr_app"].append(self.raw[cfg]["pdr_app"])
             data[pitvl][citvl]["pdr_ll"].append(self.raw[cfg]["pdr_ll"])
-            # copy latencies, filter out too small values that were caused by iotlab tooling and
-            # are not valid
-            data[pitvl][citvl]["latency"] += [lat for lat in self.raw[cfg]["latency"]["latency_all"] if lat >= 0.01]
+            # merge latencies, overviews written before the sketch hold the raw values
+            lat = self.raw[cfg]["latency"]
+            if "latency_sketch" in lat:
+                data[pitvl][citvl]["latency"].merge(Latsketch.fromdict(lat["latency_sketch"]))
+            else:
+                data[pitvl][citvl]["latency"].add(lat["latency_all"])
 
             # for s in ("avg", "min", "max"):
                 # data[pitvl][citvl]["latency"].append(self.raw[cfg]["latency"][f'latency_{s}'])
             # data[pitvl][citvl]["latency"].append(self.raw[cfg]["latency"]["latency_avg"])
 
 
+        # filter out too small latencies that were caused by iotlab tooling and
+        # are not valid
+        for pitvl in data:
+            for citvl in data[pitvl]:
+                data[pitvl][citvl]["latency"].trim(0.01)
+
         # verify data
         for pitvl in data:
             print("#### PITVL", pitvl)
@@ -500,11 +508,11 @@ class Fig(Expbase):
                 y_reconns.append(data[pitvl][citvl]["reconns"])
                 y_pdr_app.append(data[pitvl][citvl]["pdr_app"])
                 y_pdr_ll.append(data[pitvl][citvl]["pdr_ll"])
-                y_lat.append(data[pitvl][citvl]["latency"])
+                y_lat.append(data[pitvl][citvl]["latency"].boxstats())
 
             ax[0][col].boxplot([[vv - 100 for vv in v] for v in y_pdr_ll], whis=[0, 100])
             ax[1][col].boxplot([[vv - 100 for vv in v] for v in y_pdr_app], whis=[0, 100])
-            latp = ax[2][col].boxplot(y_lat, whis=[0, 100]) # flierprops={"markersize": 2})
+            latp = ax[2][col].bxp(y_lat) # flierprops={"markersize": 2})
             latplot.append(latp)
             ax[3][col].boxplot(y_reconns, whis=[0, 100])
 
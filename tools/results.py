@@ -23,27 +23,35 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(os.path.abspath(__file__)).parent.parent))
 
-import re
 import math
+import io
 import copy
 import argparse
+import contextlib
 import json
+import numpy as np
 from datetime import datetime
 from tools.exputil.ana import Ana
 from tools.exputil.topo import Topo
 from tools.exputil.expstats import Expstats
+from tools.exputil.hopdelay import Hopdelay
+from tools.exputil.energy import Energy
+from tools.exputil.anchors import Anchors
 from tools.exputil.alive import Alive
 from tools.exputil.connitvl import Connitvl
+from tools.exputil.ipaddr import Ipaddr
 # from tools.exputil.ifconfigval import Ifconfigval
 from tools.exputil.llstats import LLStats
 
 
 class Results(Ana):
-    def __init__(self, logfile):
+    def __init__(self, logfile, jobs=None, window=None, follow=None):
         super().__init__(logfile)
 
-        self.ips = {}
+        if window:
+            self.set_window(*window)
 
+        self.ipaddr = Ipaddr(self)
         self.alive = Alive(self)
         self.connitvl = Connitvl(self)
         # self.ifconfigval = Ifconfigval(self)
@@ -51,16 +59,29 @@ class Results(Ana):
         self.expstats = Expstats(self)
         self.topo = Topo(self)
         self.llstats = LLStats(self)
-
-        self.parse_log(self.on_logline)
-
-
+        self.hopdelay = Hopdelay(self)
+        self.energy = Energy(self)
+        self.anchors = Anchors(self)
+
+        self.router.add(self.alive)
+        self.router.add(self.connitvl)
+        self.router.add(self.expstats)
+        self.router.add(self.topo)
+        self.router.add(self.llstats)
+        self.router.add(self.ipaddr)
+
+        if follow:
+            self.parse_log_follow(self.snapshot, follow)
+        else:
+            self.parse_log_cached(jobs)
+
+        self.ipaddr.finish()
         self.expstats.finish()
         self.llstats.finish()
         self.topo.finish()
 
         # export overview
-        self.write_overview(self.llstats, self.expstats, self.topo)
+        self.write_overview(self.llstats, self.expstats, self.topo, self.energy)
 
         print("\nRESULTS")
         self.llstats.summary()
@@ -68,6 +89,9 @@ class Results(Ana):
         self.connitvl.summary()
         # self.ifconfigval.summary()
         self.expstats.summary()
+        self.hopdelay.summary()
+        self.energy.summary()
+        self.anchors.summary()
         self.topo.summary()
 
         print("\nRESULTS")
@@ -87,23 +111,35 @@ class Results(Ana):
 
 
 
-    def on_logline(self, time, node, output):
-        self.alive.update(time, node, output)
-        self.connitvl.update(time, node, output)
-        # self.ifconfigval.update(time, node, output)
-        self.expstats.update(time, node, output)
-        self.topo.update(time, node, output)
-        self.llstats.update(time, node, output)
+    def reset(self):
+        super().reset()
+        # not routed, but they cache results of the replaced analyzers
+        self.hopdelay = self.spawn(self.hopdelay)
+        self.energy = self.spawn(self.energy)
+        self.anchors = self.spawn(self.anchors)
+
+
+    def snapshot(self):
+        '''
+        Write the overview of the log parsed so far. The overview is computed
+        on copies of the analyzers, so they can be fed further afterwards.
+        '''
+        t = dict(self.t)
+        with contextlib.redirect_stdout(io.StringIO()):
+            tmp = {}
+            for name in ("ipaddr", "expstats", "llstats", "topo"):
+                analyzer = getattr(self, name)
+                tmp[name] = self.spawn(analyzer)
+                tmp[name].merge(copy.deepcopy(analyzer.getpart()))
+                tmp[name].finish()
 
-        # get global IPv6 addresses
-        m = re.search(r'inet6 addr: (?P<ip>(2001\:)?affe\:\:[\:a-z0-9]+)', output.lower())
-        if m:
-            if not "addr_ip" in self.nodecfg[node]:
-                self.nodecfg[node]["addr_ip"] = m.group("ip")
-                self.ips[m.group("ip")] = node
-            elif self.nodecfg[node]["addr_ip"] != m.group("ip"):
-                print("Warning: IPv6 addr for {} is deviating: {} vs {}".format(
-                      node, self.nodecfg[node]["addr_ip"], m.group("ip")))
+        # flows of a partial log may have no latency yet (NaN)
+        flows = tmp["expstats"].flows
+        if (np.nan_to_num(flows.cols["lat_ack"][:len(flows)]) > 0).any():
+            energy = Energy(self, llstats=tmp["llstats"], expstats=tmp["expstats"],
+                            **self.energy.config)
+            self.write_overview(tmp["llstats"], tmp["expstats"], tmp["topo"], energy)
+        self.t = t
 
 
     def plotme(self):
@@ -135,6 +171,7 @@ class Results(Ana):
         self.llstats.plot_rateline(binsize=10, ylim=[.0, 1.01])
         self.llstats.plot_rateline_pn(binsize=5)
         self.llstats.plot_bufusage()
+        self.energy.plot_duty_cycle_pn()
 
 
         self.expstats.plot_flow_pdr([["t_rx", "Pkts received by Consumer"],
@@ -142,6 +179,9 @@ class Results(Ana):
         self.expstats.plot_flow_pdr_pn("t_ack")
 
         self.expstats.plot_latency_box()
+        self.hopdelay.plot_hop_box()
+        self.hopdelay.plot_hop_box(by="link")
+        self.hopdelay.plot_hop_delay_pn()
         # self.expstats.plot_cdf(xlim=[0, 1])
         self.expstats.plot_cdf()
         # self.expstats.plot_cdf_pn(styles=styles, stat="rx", xlim=[0, 1])
@@ -153,7 +193,7 @@ class Results(Ana):
         # self.expstats.plot_cdf_pn(prod, styles=styles, stat="ack", xlim=[0, 1])
         # self.expstats.plot_cdf_pn(prod, styles=styles, stat="ack")
 
-        if len(self.llstats.events) > 0:
+        if self.llstats.ll_num > 0:
             # self.llstats.plot_chanrate(binsize=15)
             self.llstats.plot_chanrate(binsize=15, timespan=[0, 3600])
 
@@ -174,8 +214,9 @@ class Results(Ana):
 
         # self.expstats.plot_evtcnt_boxes_pn(["N_RX", "N_TX"], ylim=(0, 450))
         # self.expstats.plot_evtcnt_boxes_pn(["A_TX", "A_RX", "A_ACK"], fulltime=True, ylim=(0, 450))
-        # self.llstats.plot_anchor_offset()
-        # self.llstats.plot_anchors()
+        # self.anchors.plot_conn_offset()
+        # self.anchors.plot_anchors()
+        # self.anchors.plot_collision_prob()
 
         # nodesel = ["nrf52dk-2", "nrf52dk-10", "nrf52840dk-9"]
         # self.llstats.plot_chanrate(nodes=nodesel + ["nrf52840dk-7"], binsize=5)
@@ -215,12 +256,20 @@ class Results(Ana):
 
 
 def main(args):
-    res = Results(args.logfile)
+    res = Results(args.logfile, args.jobs, args.window, args.follow)
     res.plotme()
 
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
     p.add_argument("logfile", default="", help="output dump")
+    p.add_argument("-j", "--jobs", type=int, default=None,
+                   help="number of parser processes (default: one per core)")
+    p.add_argument("-w", "--window", type=float, nargs=2, metavar=("FIRST", "LAST"),
+                   help="only analyze the given time window, in seconds "
+                        "relative to the first log line")
+    p.add_argument("-f", "--follow", type=float, metavar="INTERVAL",
+                   help="follow the log of a running experiment, writing the "
+                        "overview every INTERVAL seconds")
     args = p.parse_args()
     main(args)